@@ -5,24 +5,30 @@ Folder ID: 1MuoISucvfQBf21_b0TwUBZlBfmdVfFgO
 """
 
 import os
+import sys
 import json
+from google.auth.transport.requests import AuthorizedSession
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
-import io
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from drive_download import stream_download, stream_colors
 
 # Configuration
 SERVICE_ACCOUNT_FILE = '/home/sam/mcp-servers/gdrive-service-account.json'
 FOLDER_ID = '1MuoISucvfQBf21_b0TwUBZlBfmdVfFgO'
 DOWNLOAD_DIR = '/home/sam/chatbot-platform/mbh/commission-automator/brand_assets'
 SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
+DRIVE_FILES_URL = 'https://www.googleapis.com/drive/v3/files'
+COLOR_SCAN_LIMIT = 5 * 1024 * 1024  # only the first 5 MB of a file is searched for colours
 
 def setup_drive_service():
-    """Initialize Google Drive API service"""
+    """Initialize Google Drive API service, plus an HTTP session for streaming file content"""
     credentials = service_account.Credentials.from_service_account_file(
         SERVICE_ACCOUNT_FILE, scopes=SCOPES)
     service = build('drive', 'v3', credentials=credentials)
-    return service
+    session = AuthorizedSession(credentials)
+    return service, session
 
 def list_folder_contents(service, folder_id):
     """List all files in a folder"""
@@ -30,61 +36,36 @@ def list_folder_contents(service, folder_id):
     results = service.files().list(
         q=query,
         pageSize=100,
-        fields="files(id, name, mimeType, size, webViewLink, webContentLink, description, fileExtension)"
+        fields="files(id, name, mimeType, size, md5Checksum, webViewLink, webContentLink, description, fileExtension)"
     ).execute()
 
     return results.get('files', [])
 
-def download_file(service, file_id, file_name, download_path):
-    """Download a file from Google Drive"""
+def download_file(session, file_id, file_name, download_path, size=0, md5=''):
+    """Stream a file from Google Drive to disk, resuming a previous partial download"""
     try:
-        request = service.files().get_media(fileId=file_id)
-        fh = io.BytesIO()
-        downloader = MediaIoBaseDownload(fh, request)
-
-        done = False
-        while done is False:
-            status, done = downloader.next_chunk()
-            print(f"  Downloading {file_name}: {int(status.progress() * 100)}%")
-
-        # Write to file
-        with open(download_path, 'wb') as f:
-            f.write(fh.getvalue())
-
+        stream_download(session, f"{DRIVE_FILES_URL}/{file_id}", download_path, {'alt': 'media'},
+                        expected_size=size, md5=md5)
         print(f"  ✓ Downloaded: {download_path}")
         return True
     except Exception as e:
         print(f"  ✗ Failed to download {file_name}: {e}")
         return False
 
-def extract_colors_from_text(content):
-    """Extract hex color codes from text content"""
-    import re
-    hex_pattern = r'#[0-9A-Fa-f]{6}\b|#[0-9A-Fa-f]{3}\b'
-    colors = re.findall(hex_pattern, content)
-    return list(set(colors))  # Remove duplicates
-
-def analyze_file_for_colors(service, file_id, file_name):
-    """Try to extract color information from files"""
+def analyze_file_for_colors(session, file_id, mime_type):
+    """Try to extract color information from files, reading at most COLOR_SCAN_LIMIT bytes"""
     colors = []
 
     # If it's a Google Doc, Sheet, or text file, try to read content
     try:
         # For Google Docs
-        if 'google-apps.document' in file_name:
-            request = service.files().export_media(fileId=file_id, mimeType='text/plain')
+        if 'google-apps.document' in mime_type:
+            colors = stream_colors(session, f"{DRIVE_FILES_URL}/{file_id}/export",
+                                   {'mimeType': 'text/plain'}, limit=COLOR_SCAN_LIMIT)
         # For text files
         else:
-            request = service.files().get_media(fileId=file_id)
-
-        fh = io.BytesIO()
-        downloader = MediaIoBaseDownload(fh, request)
-        done = False
-        while done is False:
-            status, done = downloader.next_chunk()
-
-        content = fh.getvalue().decode('utf-8', errors='ignore')
-        colors = extract_colors_from_text(content)
+            colors = stream_colors(session, f"{DRIVE_FILES_URL}/{file_id}", {'alt': 'media'},
+                                   limit=COLOR_SCAN_LIMIT)
     except:
         pass
 
@@ -97,7 +78,7 @@ def main():
 
     # Setup
     print(f"\n1. Initializing Google Drive service...")
-    service = setup_drive_service()
+    service, session = setup_drive_service()
     print("   ✓ Connected to Google Drive")
 
     # Create download directory
@@ -155,7 +136,7 @@ def main():
 
         # Try to extract colors from text-based files
         if file['mimeType'] in ['text/plain', 'application/vnd.google-apps.document']:
-            colors = analyze_file_for_colors(service, file['id'], file['mimeType'])
+            colors = analyze_file_for_colors(session, file['id'], file['mimeType'])
             all_colors.extend(colors)
 
     # Print summary
@@ -195,7 +176,8 @@ def main():
             continue
 
         download_path = os.path.join(DOWNLOAD_DIR, file_name)
-        download_file(service, file_id, file_name, download_path)
+        download_file(session, file_id, file_name, download_path,
+                      int(file.get('size', 0) or 0), file.get('md5Checksum', ''))
 
     # Save metadata to JSON
     metadata_path = os.path.join(DOWNLOAD_DIR, 'brand_assets_metadata.json')
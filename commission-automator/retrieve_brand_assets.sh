@@ -15,7 +15,7 @@ echo ""
 if [ ! -d "venv" ]; then
     echo "Creating virtual environment..."
     python3 -m venv venv
-    venv/bin/pip install google-auth google-auth-oauthlib google-auth-httplib2 google-api-python-client
+    venv/bin/pip install google-auth google-auth-oauthlib google-auth-httplib2 google-api-python-client requests
 fi
 
 # First, check access
@@ -69,25 +69,50 @@ log "=========================================="
 # Trap errors and send notification
 trap 'ERROR_MSG="Script failed at line $LINENO"; ERROR_LOG=$(tail -50 "$LOG_FILE"); send_error_notification "$ERROR_MSG" "$ERROR_LOG"; exit 1' ERR
 
-# Step 0: Sync files from Google Drive
-log "Step 0: Syncing files from Google Drive..."
-if ! "$SYNC_SCRIPT" "$PROCESS_MONTH" >> "$LOG_FILE" 2>&1; then
-    ERROR_MSG="Google Drive sync failed for $PROCESS_MONTH"
-    ERROR_LOG=$(tail -50 "$LOG_FILE")
-    send_error_notification "$ERROR_MSG" "$ERROR_LOG"
-    exit 1
-fi
-log "✓ Files synced from Drive"
-
-# Step 1: Extract commissions
-log "Step 1: Extracting commission data..."
-if ! $PYTHON "$SRC_DIR/extract_commissions.py" --month "$PROCESS_MONTH" >> "$LOG_FILE" 2>&1; then
-    ERROR_MSG="Commission extraction failed for $PROCESS_MONTH"
-    ERROR_LOG=$(tail -50 "$LOG_FILE")
-    send_error_notification "$ERROR_MSG" "$ERROR_LOG"
-    exit 1
+# Steps 0 and 1 can run as a pipeline (PIPELINED_SYNC=1): statements are extracted
+# as soon as they finish downloading instead of after the whole sync. Statements unchanged
+# since the last run reuse their saved results; FULL_EXTRACTION=1 re-extracts them all
+if [ "${PIPELINED_SYNC:-0}" = "1" ]; then
+    log "Step 0+1: Syncing from Google Drive and extracting statements as they arrive..."
+    if [ "${FULL_EXTRACTION:-0}" = "1" ]; then
+        PIPELINE_ARGS="--full"
+    else
+        PIPELINE_ARGS=""
+    fi
+    if ! $PYTHON "$SRC_DIR/pipeline.py" --month "$PROCESS_MONTH" $PIPELINE_ARGS >> "$LOG_FILE" 2>&1; then
+        ERROR_MSG="Drive sync / commission extraction failed for $PROCESS_MONTH"
+        ERROR_LOG=$(tail -50 "$LOG_FILE")
+        send_error_notification "$ERROR_MSG" "$ERROR_LOG"
+        exit 1
+    fi
+    log "✓ Files synced and commission extraction completed"
+else
+    # Step 0: Sync files from Google Drive
+    log "Step 0: Syncing files from Google Drive..."
+    if ! "$SYNC_SCRIPT" "$PROCESS_MONTH" >> "$LOG_FILE" 2>&1; then
+        ERROR_MSG="Google Drive sync failed for $PROCESS_MONTH"
+        ERROR_LOG=$(tail -50 "$LOG_FILE")
+        send_error_notification "$ERROR_MSG" "$ERROR_LOG"
+        exit 1
+    fi
+    log "✓ Files synced from Drive"
+
+    # Step 1: Extract commissions (skipped when the sync brought no new or changed statements;
+    # set FULL_EXTRACTION=1 to force it)
+    log "Step 1: Extracting commission data..."
+    if [ "${FULL_EXTRACTION:-0}" = "1" ]; then
+        EXTRACT_ARGS=""
+    else
+        EXTRACT_ARGS="--if-changed"
+    fi
+    if ! $PYTHON "$SRC_DIR/extract_commissions.py" --month "$PROCESS_MONTH" $EXTRACT_ARGS >> "$LOG_FILE" 2>&1; then
+        ERROR_MSG="Commission extraction failed for $PROCESS_MONTH"
+        ERROR_LOG=$(tail -50 "$LOG_FILE")
+        send_error_notification "$ERROR_MSG" "$ERROR_LOG"
+        exit 1
+    fi
+    log "✓ Commission extraction completed"
 fi
-log "✓ Commission extraction completed"
 
 # Step 2: Generate state summary
 log "Step 2: Generating state summary..."
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Entry Memory Benchmark
+Bytes per commission entry as plain dicts versus CommissionEntry records, on a
+synthetic month.
+
+Entries are loaded the way refresh() loads an unchanged month from
+extraction_state.json, so every string starts out as a separate object, the
+same as for freshly parsed text. Three numbers are reported per entry:
+
+    held       memory the month's entries take once loaded
+    writing    peak extra memory while all_commission_data.json is written
+               (dicts: the old {**item, ...} copy of every entry; records: one row at a time)
+    pickled    size sent back from a pipeline worker
+
+Usage:
+    python bench_entries.py                     # 100k entries
+    python bench_entries.py --entries 500000
+"""
+
+import json
+import os
+import pickle
+import random
+import tracemalloc
+from typing import Dict, List
+
+from commission_entry import CommissionEntry
+
+DEFAULT_ENTRIES = 100_000
+CARRIERS = ['Allied', 'Beam', 'Guardian', 'American Heritage Life Insurance Co', 'Choice Builder', 'Cal Choice',
+            'VSP Vision']
+STATES = ['WA', 'OR', 'ID', 'CA', 'AK', 'MT', 'NV', 'AZ', 'TX', 'HI']
+WORDS = ['Timber', 'Consulting', 'Group', 'Riverside', 'Dental', 'Partners', 'Northwest', 'Family', 'Medical',
+         'Holdings', 'Cascade', 'Insurance', 'Services', 'Pacific', 'Auto', 'Network', 'Summit', 'Builders']
+
+
+def month_state_json(count: int, seed: int = 7) -> str:
+    """extraction_state.json entries for a synthetic month"""
+    rng = random.Random(seed)
+    entries = []
+    for n in range(count):
+        name = f"{' '.join(rng.sample(WORDS, rng.randint(2, 4)))} {rng.choice(['LLC', 'Inc', 'PLLC', 'Co'])} {n}"
+        entries.append({'carrier': rng.choice(CARRIERS), 'group_name': name,
+                        'commission': round(rng.uniform(5, 2500), 2), 'state': rng.choice(STATES),
+                        'match_confidence': rng.randint(60, 100)})
+    return json.dumps(entries)
+
+
+def _write_dicts(entries: List[Dict], review_keys: set):
+    # save_results before CommissionEntry: every entry copied, then dumped in one go
+    all_data = [{**item, 'confidence': item.get('match_confidence', 100),
+                 'needs_review': (item['carrier'], item['group_name'], item['commission']) in review_keys}
+                for item in entries]
+    with open(os.devnull, 'w') as f:
+        json.dump(all_data, f, indent=2, default=str)
+
+
+def _write_records(entries: List[CommissionEntry], review_keys: set):
+    with open(os.devnull, 'w') as f:
+        for item in entries:
+            row = item.to_dict()
+            row['confidence'] = item.get('match_confidence', 100)
+            row['needs_review'] = (item.carrier, item.group_name, item.commission) in review_keys
+            f.write(json.dumps(row, indent=2, default=str))
+
+
+def measure(text: str, compact: bool) -> Dict[str, float]:
+    tracemalloc.start()
+    loaded = json.loads(text)
+    entries = [CommissionEntry.from_dict(entry) for entry in loaded] if compact else loaded
+    del loaded
+    held = tracemalloc.get_traced_memory()[0]
+
+    tracemalloc.reset_peak()
+    (_write_records if compact else _write_dicts)(entries, set())
+    writing = tracemalloc.get_traced_memory()[1] - held
+    tracemalloc.stop()
+
+    pickled = len(pickle.dumps(entries))
+    count = len(entries)
+    return {'held': held / count, 'writing': writing / count, 'pickled': pickled / count}
+
+
+def main(argv=None):
+    """Command line entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Bytes per commission entry: dicts vs CommissionEntry')
+    parser.add_argument('--entries', type=int, default=DEFAULT_ENTRIES, help=f'Entries in the month '
+                                                                              f'(default: {DEFAULT_ENTRIES:,})')
+    args = parser.parse_args(argv)
+
+    text = month_state_json(args.entries)
+    before = measure(text, compact=False)
+    after = measure(text, compact=True)
+
+    print(f"{args.entries:,} entries, bytes per entry")
+    print(f"{'':<10}{'dicts':>10}{'records':>10}{'saved':>8}")
+    print("-" * 38)
+    for name in ('held', 'writing', 'pickled'):
+        print(f"{name:<10}{before[name]:>10,.0f}{after[name]:>10,.0f}{1 - after[name] / before[name]:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
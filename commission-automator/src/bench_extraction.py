@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Extraction Benchmark
+Measures each carrier extractor on synthetic statements and checks it against
+a stored baseline.
+
+Every layout from synthetic_statements.py is generated at the requested size
+and extracted in its own process. Results are checked against the entries the
+generator wrote, and the run reports pages/sec, entries/sec and peak RSS. The
+run fails if any layout extracts the wrong entries, or if it is slower or
+bigger than the baseline by more than --tolerance.
+
+Usage:
+    python bench_extraction.py                          # 50 pages per layout
+    python bench_extraction.py --pages 1000 --layout beam
+    python bench_extraction.py --save-baseline          # record this machine's numbers
+"""
+
+import json
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from synthetic_statements import LAYOUTS, MAX_PAGES, generate, write_master_contacts
+
+BASELINE_FILE = Path(__file__).resolve().parent.parent / 'bench_baseline.json'
+DEFAULT_PAGES = 50
+DEFAULT_TOLERANCE = 0.25
+
+
+def _extract(layout: str, pdf_path: str, master_csv: str, repeat: int) -> Dict:
+    """Runs in a fresh process so peak RSS belongs to this layout alone"""
+    from extract_commissions import CommissionExtractor
+    from generate_report import parse_bank_deposits
+
+    pdf_path = Path(pdf_path)
+    extractor = CommissionExtractor(str(pdf_path.parent), master_csv, str(pdf_path.parent / 'out'),
+                                    str(pdf_path.parent / 'logs'), configure_logging=False)
+    best, entries = None, []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        if layout == 'us_bank':
+            deposits = parse_bank_deposits(pdf_path)
+            entries = [{'group_name': name, 'commission': sum(amounts)} for name, amounts in deposits.items()]
+        else:
+            entries, _ = extractor.extract_file(pdf_path)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    return {
+        'seconds': best,
+        'entries': sorted((entry['group_name'], round(entry['commission'], 2)) for entry in entries),
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def run_benchmark(layouts: List[str], pages: int, repeat: int, work_dir: Path) -> Dict[str, Dict]:
+    """Generate and extract every layout; returns metrics per layout"""
+    statements = [generate(layout, work_dir / layout, pages) for layout in layouts]
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for statement in statements:
+        master_csv = statement.path.parent / 'master contacts.csv'
+        write_master_contacts(master_csv, [statement])
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            measured = pool.submit(_extract, statement.layout, str(statement.path), str(master_csv), repeat).result()
+
+        expected = sorted((entry['group_name'], round(entry['commission'], 2)) for entry in statement.expected)
+        results[statement.layout] = {
+            'pages': statement.pages,
+            'entries': len(measured['entries']),
+            'correct': [list(entry) for entry in measured['entries']] == [list(entry) for entry in expected],
+            'seconds': round(measured['seconds'], 4),
+            'pages_per_sec': round(statement.pages / measured['seconds'], 2),
+            'entries_per_sec': round(len(measured['entries']) / measured['seconds'], 2),
+            'peak_rss_mb': round(measured['peak_rss_mb'], 1),
+        }
+    return results
+
+
+def regressions(results: Dict[str, Dict], baseline: Dict, tolerance: float) -> Dict[str, List[str]]:
+    """Layouts slower or bigger than the baseline by more than tolerance"""
+    found = {}
+    for layout, result in results.items():
+        base = baseline.get('layouts', {}).get(layout)
+        if not base or base.get('pages') != result['pages']:
+            continue
+        problems = []
+        if result['pages_per_sec'] < base['pages_per_sec'] * (1 - tolerance):
+            problems.append(f"{result['pages_per_sec']:.1f} pages/s vs {base['pages_per_sec']:.1f}")
+        if result['peak_rss_mb'] > base['peak_rss_mb'] * (1 + tolerance):
+            problems.append(f"{result['peak_rss_mb']:.0f} MB vs {base['peak_rss_mb']:.0f} MB")
+        if problems:
+            found[layout] = problems
+    return found
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the carrier extractors on synthetic statements')
+    parser.add_argument('--layout', choices=list(LAYOUTS), action='append',
+                        help='Layout to benchmark (repeatable; default: all)')
+    parser.add_argument('--pages', type=int, default=DEFAULT_PAGES, help=f'Pages per statement (1-{MAX_PAGES})')
+    parser.add_argument('--repeat', type=int, default=3, help='Extractions per layout; the fastest counts')
+    parser.add_argument('--baseline', type=str, default=str(BASELINE_FILE), help='Baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help='Write this run as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f'Allowed slowdown / RSS growth vs the baseline (default: {DEFAULT_TOLERANCE})')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args(argv)
+
+    if not 1 <= args.pages <= MAX_PAGES:
+        print(f"ERROR: --pages must be between 1 and {MAX_PAGES}")
+        sys.exit(1)
+
+    layouts = args.layout or list(LAYOUTS)
+    with tempfile.TemporaryDirectory(prefix='bench_extraction_') as work_dir:
+        results = run_benchmark(layouts, args.pages, args.repeat, Path(work_dir))
+
+    baseline_path = Path(args.baseline)
+    baseline = {}
+    if baseline_path.exists() and not args.save_baseline:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+    slow = regressions(results, baseline, args.tolerance)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'Layout':<20} {'Pages':>6} {'Entries':>8} {'Pages/s':>9} {'Entries/s':>10} {'Peak RSS':>9}  Result")
+        print("-" * 80)
+        for layout, result in results.items():
+            status = 'ok'
+            if not result['correct']:
+                status = 'FAIL wrong entries'
+            elif layout in slow:
+                status = 'FAIL ' + '; '.join(slow[layout])
+            print(f"{layout:<20} {result['pages']:>6} {result['entries']:>8} {result['pages_per_sec']:>9.1f} "
+                  f"{result['entries_per_sec']:>10.1f} {result['peak_rss_mb']:>7.0f}MB  {status}")
+        print("-" * 80)
+
+    if args.save_baseline:
+        # Keep baselines for layouts not run this time
+        saved = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+        saved.setdefault('layouts', {}).update(results)
+        tmp_path = baseline_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(saved, indent=2))
+        tmp_path.replace(baseline_path)
+        print(f"✓ Saved baseline to {baseline_path}")
+
+    wrong = [layout for layout, result in results.items() if not result['correct']]
+    if wrong or slow:
+        print(f"✗ {len(wrong)} layout(s) extracted wrong entries, {len(slow)} regressed past the baseline")
+        sys.exit(1)
+    if not baseline and not args.save_baseline:
+        print(f"No baseline at {baseline_path}; run with --save-baseline to record one")
+
+
+if __name__ == "__main__":
+    main()
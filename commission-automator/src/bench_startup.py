@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Startup Time Benchmark
+Checks each entry point imports within its startup budget.
+
+Runs `python -X importtime -c "import <module>"` for every script, reads the
+module's cumulative import time from the report and fails if it is over budget
+or if any heavy dependency (pdfplumber, anthropic, ...) was imported eagerly
+instead of through lazy_imports.
+
+Usage:
+    python bench_startup.py                 # table, exit 1 on any failure
+    python bench_startup.py --runs 5 --scale 2
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from lazy_imports import HEAVY_MODULES
+
+SRC_DIR = Path(__file__).resolve().parent
+
+# Entry point -> import budget in milliseconds
+STARTUP_BUDGETS_MS = {
+    'extract_commissions': 150,
+    'generate_report': 100,
+    'generate_state_summary': 50,
+    'draft_report': 100,
+    'worker': 200,
+    'pipeline': 300,
+    'drive_sync': 300,
+    'drive_watch': 300,
+    'processing_service': 200,
+    'interactive_processor': 300,
+}
+
+# Entry points that need requests at startup (every run talks to Drive)
+EAGER_ALLOWED = {
+    'drive_sync': {'requests'},
+    'drive_watch': {'requests'},
+    'pipeline': {'requests'},
+}
+
+
+def import_profile(module: str, python: str = sys.executable) -> Dict[str, int]:
+    """Cumulative import time in microseconds for every module imported by `import module`"""
+    result = subprocess.run([python, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=SRC_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, total, name = line[len('import time:'):].split('|')
+        cumulative[name.strip()] = int(total)
+    return cumulative
+
+
+def measure(module: str, runs: int = 3) -> Tuple[float, List[str]]:
+    """Best-of-N import time in ms, and heavy modules that were imported eagerly"""
+    best, eager = None, []
+    for _ in range(runs):
+        profile = import_profile(module)
+        if module not in profile:
+            raise RuntimeError(f"import {module} did not appear in the -X importtime report")
+        ms = profile[module] / 1000
+        best = ms if best is None else min(best, ms)
+        eager = [name for name in HEAVY_MODULES if name in profile]
+    return best, eager
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Check entry point import times against their budgets')
+    parser.add_argument('modules', nargs='*', help='Entry points to check (default: all)')
+    parser.add_argument('--runs', type=int, default=3, help='Imports per entry point; the fastest counts')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Multiply every budget (e.g. 2 on a slow machine)')
+    args = parser.parse_args(argv)
+
+    modules = args.modules or list(STARTUP_BUDGETS_MS)
+    unknown = [name for name in modules if name not in STARTUP_BUDGETS_MS]
+    if unknown:
+        print(f"ERROR: No startup budget for: {', '.join(unknown)}")
+        sys.exit(1)
+
+    failures = 0
+    print(f"{'Entry point':<24} {'Import':>9} {'Budget':>9}  Result")
+    print("-" * 60)
+    for module in modules:
+        budget = STARTUP_BUDGETS_MS[module] * args.scale
+        try:
+            ms, eager = measure(module, args.runs)
+        except RuntimeError as e:
+            print(f"{module:<24} {'-':>9} {budget:>7.0f}ms  ERROR {e}")
+            failures += 1
+            continue
+
+        eager = [name for name in eager if name not in EAGER_ALLOWED.get(module, set())]
+        problems = []
+        if ms > budget:
+            problems.append('over budget')
+        if eager:
+            problems.append(f"eager import of {', '.join(eager)}")
+        failures += bool(problems)
+        print(f"{module:<24} {ms:>7.1f}ms {budget:>7.0f}ms  {'FAIL ' + '; '.join(problems) if problems else 'ok'}")
+
+    print("-" * 60)
+    if failures:
+        print(f"✗ {failures} entry point(s) failed their startup budget")
+        sys.exit(1)
+    print(f"✓ All {len(modules)} entry points within budget")
+
+
+if __name__ == "__main__":
+    main()
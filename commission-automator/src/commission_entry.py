@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Commission Entry
+One extracted commission line, stored compactly.
+
+A month can have 100k+ lines. As plain dicts, every line carries its own
+hash table with the five field names. CommissionEntry keeps the values in
+__slots__ instead. Carrier and state names are interned, so the thousands of
+lines from one carrier share a single string. Entries still behave like the
+dicts they replace: entry['state'], entry.get('match_confidence', 100),
+dict(entry) and {**entry} all work, and a field that hasn't been set yet (state
+before matching) is missing, not None.
+
+bench_entries.py measures the saving.
+"""
+
+import sys
+from typing import Dict, Iterator, Optional
+
+FIELDS = ('carrier', 'group_name', 'commission', 'state', 'match_confidence')
+
+
+class CommissionEntry:
+    """carrier, group_name, commission, then state and match_confidence once matched"""
+    __slots__ = FIELDS
+
+    def __init__(self, carrier: str, group_name: str, commission: float,
+                 state: Optional[str] = None, match_confidence: Optional[int] = None):
+        self.carrier = sys.intern(carrier)
+        self.group_name = group_name
+        self.commission = commission
+        self.state = sys.intern(state) if state is not None else None
+        self.match_confidence = match_confidence
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'CommissionEntry':
+        """From a saved or Claude-extracted dict; unknown keys are dropped"""
+        return cls(data['carrier'], data['group_name'], data['commission'],
+                   data.get('state'), data.get('match_confidence'))
+
+    def to_dict(self) -> Dict:
+        return {field: getattr(self, field) for field in self.keys()}
+
+    def __reduce__(self):
+        # Pickled as a plain tuple for the pipeline workers, not a slot-state dict per entry
+        return CommissionEntry, tuple(getattr(self, field) for field in FIELDS)
+
+    def __repr__(self):
+        return f"CommissionEntry({self.to_dict()!r})"
+
+    def __eq__(self, other):
+        if isinstance(other, CommissionEntry):
+            return all(getattr(self, field) == getattr(other, field) for field in FIELDS)
+        return NotImplemented
+
+    __hash__ = None
+
+    # Dict-style access, for the code that grew up with dict entries
+    def keys(self) -> Iterator[str]:
+        return (field for field in FIELDS if getattr(self, field) is not None)
+
+    def __iter__(self):
+        return self.keys()
+
+    def __contains__(self, key) -> bool:
+        return key in FIELDS and getattr(self, key) is not None
+
+    def __getitem__(self, key: str):
+        value = getattr(self, key, None) if key in FIELDS else None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value):
+        if key not in FIELDS:
+            raise KeyError(f"CommissionEntry has no field {key!r}")
+        if key in ('carrier', 'state') and value is not None:
+            value = sys.intern(value)
+        setattr(self, key, value)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Master Contacts Index
+The master contacts CSV compiled into a binary file that every process maps
+read-only, instead of parsing the CSV again.
+
+The index holds each card name, its match key (the lower-cased, ASCII-only,
+token-sorted form that fuzzywuzzy's token_sort_ratio compares), token postings
+(which names contain each key token), and a state column. Several processes
+can map the file at once and share one copy in the page cache; a pipeline
+worker only reads the header when it starts.
+
+Matching scores the precomputed keys with fuzz.ratio. That gives the same
+scores and the same winner as process.extractOne(..., scorer=token_sort_ratio)
+over the card names, without re-processing every name for every query. When
+the query's key equals a card name's key, the postings find that name without
+a scan.
+
+The index is written next to the CSV as .<csv name>.idx. It is rebuilt when
+the CSV's content hash changes; if only the CSV's mtime changed, the hash is
+checked once and the index is kept with the new mtime recorded. Rewrites are
+atomic, so a process that already has the old index mapped keeps a valid view.
+
+Usage:
+    python contacts_index.py "mbh master contacts list.csv"            # compile (if stale) and show stats
+    python contacts_index.py "mbh master contacts list.csv" --match "Timber Consulting Group"
+"""
+
+import bisect
+import csv
+import hashlib
+import io
+import logging
+import mmap
+import os
+import struct
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from lazy_imports import lazy_import
+
+fuzz = lazy_import('fuzzywuzzy.fuzz')
+process = lazy_import('fuzzywuzzy.process')
+utils = lazy_import('fuzzywuzzy.utils')
+
+MAGIC = b'MBHCIDX1'
+VERSION = 1
+SECTIONS = ['names', 'name_offsets', 'keys', 'key_offsets', 'state_ids', 'states', 'state_offsets',
+            'tokens', 'token_offsets', 'posting_offsets', 'postings']
+# magic, version, names, max key length, CSV size, CSV mtime, CSV sha256, then (offset, length) per section
+HEADER = struct.Struct(f'<8sIIIQq32s{2 * len(SECTIONS)}Q')
+
+# fuzz.ratio rounds to a whole percent, so two different keys only score 100
+# when their combined length is at least this
+_ROUNDS_TO_100 = 200
+
+logger = logging.getLogger(__name__)
+
+
+def match_key(name: str) -> str:
+    """The string token_sort_ratio actually compares for a card name"""
+    return ' '.join(sorted(utils.full_process(name, force_ascii=True).split()))
+
+
+def query_key(query: str) -> str:
+    """The same for a query, which extractOne runs through its processor first"""
+    return match_key(utils.full_process(query))
+
+
+def index_path_for(csv_path: Path) -> Path:
+    csv_path = Path(csv_path)
+    return csv_path.with_name(f".{csv_path.name}.idx")
+
+
+def read_contacts(text: str) -> Dict[str, str]:
+    """Card name -> state, as load_master_contacts always read it (first position, last state wins)"""
+    contacts = {}
+    for row in csv.DictReader(io.StringIO(text)):
+        card_name = (row.get('Card Name') or '').strip()
+        state = (row.get('State') or '').strip()
+        if card_name:
+            contacts[card_name] = state
+    return contacts
+
+
+def _u32(values) -> bytes:
+    return struct.pack(f'<{len(values)}I', *values)
+
+
+def _blob(strings: List[str]) -> Tuple[bytes, bytes]:
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = [0]
+    for item in encoded:
+        offsets.append(offsets[-1] + len(item))
+    return b''.join(encoded), _u32(offsets)
+
+
+def build_index(csv_bytes: bytes, csv_size: int = 0, csv_mtime_ns: int = 0) -> bytes:
+    """Compile CSV content into index bytes"""
+    contacts = read_contacts(csv_bytes.decode('utf-8'))
+    names = list(contacts)
+    keys = [match_key(name) for name in names]
+    states = sorted(set(contacts.values()))
+    state_ids = {state: n for n, state in enumerate(states)}
+
+    postings: Dict[str, List[int]] = {}
+    for n, key in enumerate(keys):
+        for token in set(key.split()):
+            postings.setdefault(token, []).append(n)
+    tokens = sorted(postings)
+    posting_offsets = [0]
+    for token in tokens:
+        posting_offsets.append(posting_offsets[-1] + len(postings[token]))
+
+    sections = {}
+    sections['names'], sections['name_offsets'] = _blob(names)
+    sections['keys'], sections['key_offsets'] = _blob(keys)
+    sections['state_ids'] = struct.pack(f'<{len(names)}H', *(state_ids[contacts[name]] for name in names))
+    sections['states'], sections['state_offsets'] = _blob(states)
+    sections['tokens'], sections['token_offsets'] = _blob(tokens)
+    sections['posting_offsets'] = _u32(posting_offsets)
+    sections['postings'] = _u32([n for token in tokens for n in postings[token]])
+
+    body, table, offset = [], [], HEADER.size
+    for name in SECTIONS:
+        data = sections[name]
+        padding = -offset % 8           # keep every array aligned for memoryview.cast()
+        body.append(b'\0' * padding + data)
+        offset += padding
+        table.extend([offset, len(data)])
+        offset += len(data)
+    header = HEADER.pack(MAGIC, VERSION, len(names), max(map(len, keys), default=0), csv_size, csv_mtime_ns,
+                         hashlib.sha256(csv_bytes).digest(), *table)
+    return header + b''.join(body)
+
+
+class _Strings:
+    """Strings stored as a UTF-8 blob plus offsets, decoded on access"""
+
+    def __init__(self, blob: memoryview, offsets: memoryview):
+        self.blob, self.offsets = blob, offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, n: int) -> str:
+        return str(self.blob[self.offsets[n]:self.offsets[n + 1]], 'utf-8')
+
+
+class ContactsIndex(Mapping):
+    """Read-only view of a compiled index; also a card name -> state mapping"""
+
+    def __init__(self, data, path: Optional[Path] = None):
+        self._data = data                   # mmap or bytes
+        self.path = path
+        view = memoryview(data)
+        header = HEADER.unpack_from(view)
+        magic, version, self.count, self.max_key_len, self.csv_size, self.csv_mtime_ns, self.csv_sha256 = header[:7]
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a version {VERSION} contacts index")
+        table = header[7:]
+        sections = {name: view[table[2 * n]:table[2 * n] + table[2 * n + 1]] for n, name in enumerate(SECTIONS)}
+
+        self.names = _Strings(sections['names'], sections['name_offsets'].cast('I'))
+        self.match_keys = _Strings(sections['keys'], sections['key_offsets'].cast('I'))
+        self._state_ids = sections['state_ids'].cast('H')
+        self._states = _Strings(sections['states'], sections['state_offsets'].cast('I'))
+        self.tokens = _Strings(sections['tokens'], sections['token_offsets'].cast('I'))
+        self._posting_offsets = sections['posting_offsets'].cast('I')
+        self._postings = sections['postings'].cast('I')
+
+        self._choices = None
+        self._positions = None
+
+    @classmethod
+    def open(cls, path: Path) -> 'ContactsIndex':
+        with open(path, 'rb') as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), Path(path))
+
+    def state(self, n: int) -> str:
+        return self._states[self._state_ids[n]]
+
+    def postings(self, token: str) -> memoryview:
+        """Positions of the names whose key contains token"""
+        n = bisect.bisect_left(self.tokens, token)
+        if n == len(self.tokens) or self.tokens[n] != token:
+            return self._postings[0:0]
+        return self._postings[self._posting_offsets[n]:self._posting_offsets[n + 1]]
+
+    def _exact(self, key: str) -> Optional[int]:
+        """First name whose key equals key, found through the postings"""
+        lists = sorted((self.postings(token) for token in set(key.split())), key=len)
+        if not lists or not len(lists[0]):
+            return None
+        candidates = set(lists[0])
+        for postings in lists[1:]:
+            candidates.intersection_update(postings)
+        return next((n for n in sorted(candidates) if self.match_keys[n] == key), None)
+
+    def _key_choices(self) -> Dict[int, str]:
+        # Built once per process; extractOne needs str objects to score
+        if self._choices is None:
+            self._choices = {n: self.match_keys[n] for n in range(self.count)}
+        return self._choices
+
+    def match(self, query: str) -> Optional[Tuple[str, str, int]]:
+        """Best card name for query: (name, state, score), as extractOne with token_sort_ratio would pick"""
+        if not self.count:
+            return None
+        key = query_key(query)
+        if key and len(key) + self.max_key_len < _ROUNDS_TO_100:
+            # Only an identical key can score 100 here, so the first one found is the winner
+            n = self._exact(key)
+            if n is not None:
+                return self.names[n], self.state(n), 100
+        _, score, n = process.extractOne(key, self._key_choices(), processor=None, scorer=fuzz.ratio)
+        return self.names[n], self.state(n), score
+
+    def best_matches(self, query: str, limit: int) -> List[Tuple[str, str, int]]:
+        """Top matches for query, best first, as process.extract with token_sort_ratio would list them"""
+        matches = process.extractBests(query_key(query), self._key_choices(), processor=None, scorer=fuzz.ratio,
+                                       limit=limit)
+        return [(self.names[n], self.state(n), score) for _, score, n in matches]
+
+    # Mapping interface: card name -> state
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return (self.names[n] for n in range(self.count))
+
+    def __getitem__(self, name: str) -> str:
+        if self._positions is None:
+            self._positions = {self.names[n]: n for n in range(self.count)}
+        return self.state(self._positions[name])
+
+
+def _write_atomic(path: Path, data: bytes):
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _restamp(index: ContactsIndex, index_path: Path, csv_size: int, csv_mtime_ns: int) -> ContactsIndex:
+    """The same index with a new CSV size and mtime in its header, replaced atomically"""
+    header = list(HEADER.unpack_from(index._data))
+    header[4:6] = [csv_size, csv_mtime_ns]
+    try:
+        _write_atomic(index_path, HEADER.pack(*header) + index._data[HEADER.size:])
+    except OSError as e:
+        logger.warning(f"Could not update contacts index {index_path}: {e}")
+        return index
+    return ContactsIndex.open(index_path)
+
+
+def load_index(csv_path: Path) -> ContactsIndex:
+    """The compiled index for csv_path, rebuilding it first if the CSV's content changed"""
+    csv_path = Path(csv_path)
+    index_path = index_path_for(csv_path)
+    stat = csv_path.stat()
+
+    index = None
+    if index_path.exists():
+        try:
+            index = ContactsIndex.open(index_path)
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"Rebuilding unreadable contacts index {index_path}: {e}")
+        if index is not None and (index.csv_size, index.csv_mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+            return index
+
+    csv_bytes = csv_path.read_bytes()
+    if index is not None and index.csv_sha256 == hashlib.sha256(csv_bytes).digest():
+        # Touched or re-downloaded with the same content: record the new size and mtime, so later
+        # runs take the fast path again instead of re-hashing the CSV
+        return _restamp(index, index_path, stat.st_size, stat.st_mtime_ns)
+
+    data = build_index(csv_bytes, stat.st_size, stat.st_mtime_ns)
+    try:
+        _write_atomic(index_path, data)
+    except OSError as e:
+        logger.warning(f"Could not write contacts index {index_path} ({e}); using it from memory")
+        return ContactsIndex(data)
+    logger.info(f"Compiled {csv_path.name} into {index_path}")
+    return ContactsIndex.open(index_path)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Compile the master contacts CSV into a memory-mapped index')
+    parser.add_argument('csv', help='Master contacts CSV')
+    parser.add_argument('--match', type=str, action='append', help='Look up a group name (repeatable)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    started = time.perf_counter()
+    index = load_index(Path(args.csv))
+    opened = time.perf_counter() - started
+    print(f"{index.path or 'in memory'}: {len(index)} names, {len(index.tokens)} tokens, "
+          f"{len(index._postings)} postings, {len(index._states)} states ({opened * 1000:.1f} ms to open)")
+    for query in args.match or []:
+        result = index.match(query)
+        print(f"  {query!r} -> {result[0]!r} ({result[1] or 'no state'}, score {result[2]})" if result
+              else f"  {query!r} -> no match")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Draft Report
+Keeps state totals and bank reconciliation current while review is still in progress
+"""
+
+import csv
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from generate_report import ReportGenerator, bank_totals_by_carrier, reconcile_carrier
+
+
+class DraftReport:
+    """
+    Running totals for a month, updated by delta as entries are confirmed
+
+    High-confidence entries are added up front; each review answer adds one
+    more entry, touching only its state total and its carrier's reconciliation
+    row. When the last answer arrives the final outputs are already computed.
+    """
+
+    def __init__(self, bank_deposits: Optional[Dict[str, List[float]]] = None):
+        self.entries = []
+        self.state_totals = defaultdict(float)
+        self.carrier_totals = defaultdict(float)
+        self.grand_total = 0.0
+        self.pending = 0.0  # commission still waiting on a review answer
+
+        self.bank_totals = {}
+        self.reconciliation = {}
+        self.set_bank_deposits(bank_deposits or {})
+
+    def set_bank_deposits(self, bank_deposits: Dict[str, List[float]]):
+        """Attach parsed bank deposits and reconcile every carrier seen so far"""
+        self.bank_totals = bank_totals_by_carrier(bank_deposits)
+        for carrier in set(self.carrier_totals) | set(self.bank_totals):
+            self._reconcile(carrier)
+
+    def add_pending(self, commission: float):
+        """Record commission that is waiting on review"""
+        self.pending += commission
+
+    def add_entry(self, entry: Dict, was_pending: bool = False) -> Dict:
+        """
+        Apply one confirmed entry as a delta
+
+        Returns:
+            dict: the changed state total and reconciliation row, for the client
+        """
+        state = entry.get('state') or 'NO STATE'
+        commission = float(entry['commission'])
+
+        self.entries.append(entry)
+        self.state_totals[state] += commission
+        self.carrier_totals[entry['carrier']] += commission
+        self.grand_total += commission
+        if was_pending:
+            self.pending -= commission
+
+        return {
+            'state': state,
+            'state_total': round(self.state_totals[state], 2),
+            'reconciliation': self._reconcile(entry['carrier']),
+            'grand_total': round(self.grand_total, 2),
+            'pending': round(self.pending, 2)
+        }
+
+    def _reconcile(self, carrier: str) -> Dict:
+        record = reconcile_carrier(carrier, self.carrier_totals.get(carrier, 0.0),
+                                   self.bank_totals.get(carrier, 0.0))
+        self.reconciliation[carrier] = record
+        return record
+
+    def state_summary(self) -> List[Dict]:
+        """State rows in the same shape as state_summary.csv"""
+        rows = []
+        for state, total in sorted(self.state_totals.items(), key=lambda x: x[1], reverse=True):
+            percentage = (total / self.grand_total * 100) if self.grand_total > 0 else 0
+            rows.append({
+                'State': state,
+                'Total Commission': f"{total:.2f}",
+                'Percentage of Total': f"{percentage:.2f}%"
+            })
+        return rows
+
+    def reconciliation_rows(self) -> List[Dict]:
+        """Reconciliation rows sorted by carrier, as in reconciliation.csv"""
+        return [self.reconciliation[carrier] for carrier in sorted(self.reconciliation)]
+
+    def render_html(self, needs_review: Optional[List[Dict]] = None) -> str:
+        """Render the email report body from the current totals"""
+        generator = ReportGenerator(configure_logging=False)
+        generator.state_summary = self.state_summary()
+        generator.reconciliation = self.reconciliation_rows()
+        generator.needs_review = needs_review or []
+        return generator.generate_html_report()
+
+    def write(self, output_dir: Path, needs_review: Optional[List[Dict]] = None) -> Path:
+        """
+        Write commission_output.csv, state_summary.csv, reconciliation.csv and report.html
+
+        Returns:
+            Path: the HTML report
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        with open(output_dir / 'commission_output.csv', 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['carrier', 'group_name', 'commission', 'state'])
+            writer.writeheader()
+            for entry in self.entries:
+                writer.writerow({
+                    'carrier': entry['carrier'],
+                    'group_name': entry['group_name'],
+                    'commission': f"{float(entry['commission']):.2f}",
+                    'state': entry.get('state', '')
+                })
+
+        with open(output_dir / 'state_summary.csv', 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['State', 'Total Commission', 'Percentage of Total'])
+            for row in self.state_summary():
+                writer.writerow([row['State'], row['Total Commission'], row['Percentage of Total']])
+            writer.writerow([''])
+            writer.writerow(['GRAND TOTAL', f"{self.grand_total:.2f}", '100.00%'])
+
+        with open(output_dir / 'reconciliation.csv', 'w', newline='') as f:
+            fieldnames = ['carrier', 'commission_total', 'bank_total', 'variance', 'status']
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(self.reconciliation_rows())
+
+        report_path = output_dir / 'report.html'
+        with open(report_path, 'w') as f:
+            f.write(self.render_html(needs_review))
+
+        return report_path
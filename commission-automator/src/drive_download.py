@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Streaming Drive Downloads
+Writes downloads chunk by chunk to a temp file, resumes interrupted transfers
+with a byte Range request and renames into place only once complete.
+
+Also scans a download for hex colour codes without holding it in memory.
+"""
+
+import codecs
+import hashlib
+import os
+import re
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+import requests
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+DEFAULT_RETRIES = 3
+DEFAULT_SCAN_LIMIT = 5 * 1024 * 1024
+
+HEX_COLOR_PATTERN = re.compile(r'#[0-9A-Fa-f]{6}\b|#[0-9A-Fa-f]{3}\b')
+LONGEST_COLOR = len('#ffffff')
+
+
+class DownloadError(Exception):
+    """A download that couldn't be completed or didn't match its checksum"""
+
+
+def part_path(dest_path: Path) -> Path:
+    """Where an in-progress download is kept (hidden, next to the destination)"""
+    return dest_path.with_name(f".{dest_path.name}.part")
+
+
+def _file_md5(path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stream_download(session: requests.Session, url: str, dest_path: Path, params: Optional[Dict] = None,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE, expected_size: int = 0, md5: str = '',
+                    retries: int = DEFAULT_RETRIES,
+                    on_chunk: Optional[Callable[[bytes], None]] = None) -> int:
+    """
+    Download url to dest_path without buffering it in memory; returns the file size
+
+    A partial download left by an earlier failure (or a dropped connection
+    during this one) is continued from where it stopped. If the server ignores
+    the Range header the download starts over. When md5 is given the finished
+    file is checked before it replaces dest_path.
+
+    on_chunk sees every chunk written, but only for bytes fetched in this call.
+    """
+    dest_path = Path(dest_path)
+    temp_path = part_path(dest_path)
+    dest_path.parent.mkdir(parents=True, exist_ok=True)
+
+    if expected_size and temp_path.exists() and temp_path.stat().st_size >= expected_size:
+        temp_path.unlink()
+
+    attempt = 0
+    while True:
+        offset = temp_path.stat().st_size if temp_path.exists() else 0
+        headers = {'Range': f"bytes={offset}-"} if offset else {}
+        try:
+            with session.get(url, params=params, headers=headers, stream=True, timeout=60) as response:
+                if response.status_code == 416:
+                    # Nothing left to fetch past what we already have
+                    break
+                response.raise_for_status()
+                mode = 'ab' if offset and response.status_code == 206 else 'wb'
+                with open(temp_path, mode) as f:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+                        if on_chunk:
+                            on_chunk(chunk)
+            break
+        except (requests.ConnectionError, requests.Timeout,
+                requests.exceptions.ChunkedEncodingError) as e:
+            attempt += 1
+            if attempt > retries:
+                raise DownloadError(f"Download of {dest_path.name} failed after {retries} retries: {e}")
+            time.sleep(min(2 ** attempt * 0.1, 5))
+
+    size = temp_path.stat().st_size
+    if expected_size and size != expected_size:
+        raise DownloadError(f"{dest_path.name}: got {size} bytes, expected {expected_size}")
+    if md5 and _file_md5(temp_path) != md5:
+        temp_path.unlink()
+        raise DownloadError(f"{dest_path.name}: checksum mismatch, discarded partial download")
+
+    os.replace(temp_path, dest_path)
+    return size
+
+
+class ColorScanner:
+    """Collects hex colour codes from text fed in arbitrary chunks"""
+
+    def __init__(self, limit: int = DEFAULT_SCAN_LIMIT):
+        self.limit = limit
+        self.scanned = 0
+        self.colors = set()
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+        self._tail = ''
+
+    @property
+    def full(self) -> bool:
+        return self.scanned >= self.limit
+
+    def feed(self, chunk: bytes):
+        if self.full:
+            return
+        chunk = chunk[:self.limit - self.scanned]
+        self.scanned += len(chunk)
+
+        text = self._tail + self._decoder.decode(chunk)
+        # A match that starts within the last few characters may continue in the
+        # next chunk (and needs the following character for its word boundary)
+        cut = max(0, len(text) - LONGEST_COLOR)
+        for match in HEX_COLOR_PATTERN.finditer(text):
+            if match.start() < cut:
+                self.colors.add(match.group())
+        self._tail = text[cut:]
+
+    def finish(self) -> List[str]:
+        text = self._tail + self._decoder.decode(b'', final=True)
+        self.colors.update(HEX_COLOR_PATTERN.findall(text))
+        self._tail = ''
+        return sorted(self.colors)
+
+
+def scan_colors(chunks: Iterable[bytes], limit: int = DEFAULT_SCAN_LIMIT) -> List[str]:
+    """Hex colour codes in the first `limit` bytes of a chunk stream"""
+    scanner = ColorScanner(limit)
+    for chunk in chunks:
+        scanner.feed(chunk)
+        if scanner.full:
+            break
+    return scanner.finish()
+
+
+def stream_colors(session: requests.Session, url: str, params: Optional[Dict] = None,
+                  limit: int = DEFAULT_SCAN_LIMIT, chunk_size: int = 64 * 1024) -> List[str]:
+    """Scan a remote file for hex colour codes, reading at most `limit` bytes of it"""
+    with session.get(url, params=params, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        return scan_colors(response.iter_content(chunk_size=chunk_size), limit)
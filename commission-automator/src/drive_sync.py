@@ -0,0 +1,522 @@
+#!/usr/bin/env python3
+"""
+Google Drive Sync
+Downloads a month's commission statements, bank statement and the master CSV
+from the shared Drive, several files at a time over pooled HTTP connections.
+
+A manifest of what was last downloaded (Drive id, md5Checksum, modifiedTime,
+size) lets repeat syncs fetch only new or changed files. Each run writes
+<month>/sync_changes.json listing what changed, for the extraction step.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from drive_download import DEFAULT_CHUNK_SIZE, stream_download
+
+# Configuration
+SERVICE_ACCOUNT_FILE = '/home/sam/mcp-servers/gdrive-service-account.json'
+SCOPES = ['https://www.googleapis.com/auth/drive']
+SHARED_DRIVE_ID = '0AJ_IbKcKhFkyUk9PVA'
+BASE_DIR = '/home/sam/commission_automator/data/mbh'
+DRIVE_API_BASE = 'https://www.googleapis.com'
+
+FOLDER_MIME = 'application/vnd.google-apps.folder'
+TREE_FIELDS = 'nextPageToken, files(id, name, mimeType, size, md5Checksum, modifiedTime, parents)'
+CHANGE_FIELDS = ('nextPageToken, newStartPageToken, changes(fileId, removed, '
+                 'file(id, name, mimeType, size, md5Checksum, modifiedTime, parents, trashed))')
+PAGE_SIZE = 1000
+PARENT_BATCH = 40           # folders per files.list query when walking a tree
+MANIFEST_NAME = '.sync_manifest.json'
+CHANGES_NAME = 'sync_changes.json'
+DEFAULT_WORKERS = 8
+
+
+@dataclass
+class DownloadTask:
+    """One Drive file to fetch"""
+    file_id: str
+    name: str
+    dest_dir: Path
+    size: int = 0
+    md5: str = ''
+    modified_time: str = ''
+
+    @property
+    def dest_path(self) -> Path:
+        return self.dest_dir / self.name
+
+    def manifest_entry(self) -> Dict:
+        return {'id': self.file_id, 'md5Checksum': self.md5, 'modifiedTime': self.modified_time,
+                'size': self.size, 'status': 'present'}
+
+
+@dataclass
+class DriveNode:
+    """A file or folder in a listed Drive tree"""
+    id: str
+    name: str
+    mime_type: str = FOLDER_MIME
+    size: int = 0
+    md5: str = ''
+    modified_time: str = ''
+    children: List['DriveNode'] = field(default_factory=list)
+
+    @property
+    def is_folder(self) -> bool:
+        return self.mime_type == FOLDER_MIME
+
+    def child(self, name: str) -> Optional['DriveNode']:
+        return next((node for node in self.children if node.name == name), None)
+
+    def files(self, prefix: Path = Path()) -> List[Tuple[Path, 'DriveNode']]:
+        """(relative folder, node) for every file in this subtree"""
+        found = []
+        for node in self.children:
+            if node.is_folder:
+                found += node.files(prefix / node.name)
+            else:
+                found.append((prefix, node))
+        return found
+
+
+@dataclass
+class SyncSummary:
+    """What a sync run did"""
+    downloaded: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+    failed: List[str] = field(default_factory=list)
+
+    def report(self) -> str:
+        mb = self.bytes / (1024 * 1024)
+        rate = mb / self.seconds if self.seconds else 0
+        line = f"Downloaded {self.downloaded} files ({mb:.1f} MB) in {self.seconds:.1f}s ({rate:.1f} MB/s)"
+        if self.failed:
+            line += f", {len(self.failed)} failed: {', '.join(self.failed)}"
+        return line
+
+
+@dataclass
+class SyncChanges:
+    """How the Drive compares with the last sync, by path relative to the data directory"""
+    new: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+
+    def statements_changed(self, month: str) -> List[str]:
+        """Commission statements that were added, modified or removed"""
+        prefix = f"{month}/commission_statements/"
+        return [path for path in self.new + self.changed + self.deleted if path.startswith(prefix)]
+
+    def save(self, path: Path, month: str):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({
+                'month': month,
+                'synced_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'new': self.new,
+                'changed': self.changed,
+                'unchanged': self.unchanged,
+                'deleted': self.deleted,
+                'statements_changed': self.statements_changed(month),
+            }, f, indent=2)
+
+
+class SyncManifest:
+    """What each local file was when it was downloaded, keyed by relative path"""
+
+    def __init__(self, base_dir: Path):
+        self.base_dir = Path(base_dir)
+        self.path = self.base_dir / MANIFEST_NAME
+        self.entries = {}
+        if self.path.exists():
+            with open(self.path) as f:
+                self.entries = json.load(f)
+
+    def relative(self, path: Path) -> str:
+        return path.relative_to(self.base_dir).as_posix()
+
+    def is_current(self, task: DownloadTask) -> bool:
+        """True if the local copy is the same version as the Drive file"""
+        entry = self.entries.get(self.relative(task.dest_path))
+        if not entry or entry.get('status') != 'present' or entry.get('id') != task.file_id:
+            return False
+        if not task.dest_path.exists() or task.dest_path.stat().st_size != task.size:
+            return False
+        if task.md5:
+            return entry.get('md5Checksum') == task.md5
+        # Google-native files have no checksum
+        return entry.get('modifiedTime') == task.modified_time
+
+    def compare(self, tasks: List[DownloadTask], scopes: List[str]) -> SyncChanges:
+        """Classify remote files against the manifest; scopes limit where deletions are looked for"""
+        changes = SyncChanges()
+        remote = set()
+        for task in tasks:
+            relative = self.relative(task.dest_path)
+            remote.add(relative)
+            if self.is_current(task):
+                changes.unchanged.append(relative)
+            elif relative in self.entries and self.entries[relative].get('status') == 'present':
+                changes.changed.append(relative)
+            else:
+                changes.new.append(relative)
+
+        for relative, entry in self.entries.items():
+            if entry.get('status') == 'present' and relative not in remote and \
+                    any(relative.startswith(scope) for scope in scopes):
+                changes.deleted.append(relative)
+        return changes
+
+    def record(self, task: DownloadTask):
+        self.entries[self.relative(task.dest_path)] = task.manifest_entry()
+
+    def mark_deleted(self, relative: str):
+        self.entries[relative] = {**self.entries.get(relative, {}), 'status': 'deleted',
+                                  'deletedAt': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+    def save(self):
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+class DriveClient:
+    """
+    Drive v3 REST client safe to share between download threads
+
+    Each thread gets its own HTTP session (requests sessions aren't thread-safe)
+    with a keep-alive connection pool, so repeated requests skip the TLS handshake.
+    Pass api_base to point at a local fake Drive server; credentials are only
+    loaded for the real API.
+    """
+
+    def __init__(self, api_base: str = DRIVE_API_BASE, credentials_file: str = SERVICE_ACCOUNT_FILE,
+                 pool_size: int = DEFAULT_WORKERS):
+        self.api_base = api_base.rstrip('/')
+        self.pool_size = pool_size
+        self.requests_made = 0
+        self._local = threading.local()
+
+        self.credentials = None
+        if self.api_base == DRIVE_API_BASE:
+            from google.oauth2 import service_account
+            self.credentials = service_account.Credentials.from_service_account_file(
+                credentials_file, scopes=SCOPES)
+
+    @property
+    def session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            if self.credentials:
+                from google.auth.transport.requests import AuthorizedSession
+                session = AuthorizedSession(self.credentials)
+            else:
+                session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self._local.session = session
+        return session
+
+    def list(self, query: str, fields: str, page_size: int = PAGE_SIZE, page_token: Optional[str] = None) -> Dict:
+        """One files.list call"""
+        params = {
+            'q': query,
+            'fields': fields,
+            'pageSize': page_size,
+            'supportsAllDrives': 'true',
+            'includeItemsFromAllDrives': 'true',
+        }
+        if page_token:
+            params['pageToken'] = page_token
+
+        response = self.session.get(f"{self.api_base}/drive/v3/files", params=params, timeout=60)
+        response.raise_for_status()
+        self.requests_made += 1
+        return response.json()
+
+    def list_all(self, query: str, fields: str = TREE_FIELDS) -> List[Dict]:
+        """Every result of a query, following nextPageToken"""
+        results, page_token = [], None
+        while True:
+            page = self.list(query, fields, page_token=page_token)
+            results += page.get('files', [])
+            page_token = page.get('nextPageToken')
+            if not page_token:
+                return results
+
+    def start_page_token(self, drive_id: str) -> str:
+        """Token marking 'now' in the shared drive's change feed"""
+        response = self.session.get(f"{self.api_base}/drive/v3/changes/startPageToken",
+                                    params={'driveId': drive_id, 'supportsAllDrives': 'true'}, timeout=60)
+        response.raise_for_status()
+        self.requests_made += 1
+        return response.json()['startPageToken']
+
+    def changes(self, page_token: str, drive_id: str) -> Tuple[List[Dict], str]:
+        """Every change since page_token, and the token to poll from next time"""
+        changes = []
+        while True:
+            params = {
+                'pageToken': page_token,
+                'driveId': drive_id,
+                'pageSize': PAGE_SIZE,
+                'fields': CHANGE_FIELDS,
+                'supportsAllDrives': 'true',
+                'includeItemsFromAllDrives': 'true',
+            }
+            response = self.session.get(f"{self.api_base}/drive/v3/changes", params=params, timeout=60)
+            response.raise_for_status()
+            self.requests_made += 1
+            page = response.json()
+            changes += page.get('changes', [])
+            if 'nextPageToken' in page:
+                page_token = page['nextPageToken']
+            else:
+                return changes, page['newStartPageToken']
+
+    def walk(self, roots: List[DriveNode]) -> List[DriveNode]:
+        """
+        Fill in the complete subtree under each root folder
+
+        Lists a whole level of the tree at a time, batching sibling folders into
+        one query ('a' in parents or 'b' in parents ...), so the number of
+        requests grows with the tree's depth rather than its folder count.
+        """
+        by_id = {root.id: root for root in roots}
+        level = list(roots)
+        while level:
+            next_level = []
+            for start in range(0, len(level), PARENT_BATCH):
+                batch = level[start:start + PARENT_BATCH]
+                parents = ' or '.join(f"'{node.id}' in parents" for node in batch)
+                for item in self.list_all(f"({parents}) and trashed=false"):
+                    node = DriveNode(item['id'], item['name'], item.get('mimeType', ''),
+                                     int(item.get('size', 0) or 0), item.get('md5Checksum', ''),
+                                     item.get('modifiedTime', ''))
+                    for parent_id in item.get('parents', []):
+                        if parent_id in by_id:
+                            by_id[parent_id].children.append(node)
+                    if node.is_folder and node.id not in by_id:
+                        by_id[node.id] = node
+                        next_level.append(node)
+            level = next_level
+
+        for node in by_id.values():
+            node.children.sort(key=lambda child: child.name)
+        return roots
+
+    def download(self, file_id: str, dest_path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 size: int = 0, md5: str = '') -> int:
+        """Stream a file's content to disk, resuming if interrupted; returns its size"""
+        url = f"{self.api_base}/drive/v3/files/{file_id}"
+        params = {'alt': 'media', 'supportsAllDrives': 'true'}
+        return stream_download(self.session, url, dest_path, params, chunk_size,
+                               expected_size=size, md5=md5)
+
+
+class DriveSync:
+    """Plans a month's downloads and runs them on a bounded thread pool"""
+
+    def __init__(self, client: DriveClient, base_dir: str = BASE_DIR, drive_id: str = SHARED_DRIVE_ID,
+                 workers: int = DEFAULT_WORKERS, chunk_size: int = DEFAULT_CHUNK_SIZE, full: bool = False,
+                 prune: bool = False):
+        self.client = client
+        self.base_dir = Path(base_dir)
+        self.drive_id = drive_id
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.full = full
+        self.prune = prune
+        self.manifest = SyncManifest(self.base_dir)
+        self.changes = None
+        self.folders: Dict[str, Path] = {}     # Drive folder id -> local directory, from the last plan
+        self._print_lock = threading.Lock()
+
+    def _log(self, message: str):
+        with self._print_lock:
+            print(message, flush=True)
+
+    def _map_folders(self, folder: DriveNode, dest_dir: Path):
+        self.folders[folder.id] = dest_dir
+        for child in folder.children:
+            if child.is_folder:
+                self._map_folders(child, dest_dir / child.name)
+
+    def _tasks_for(self, files: List[Tuple[Path, DriveNode]], dest_dir: Path,
+                   suffix: str = '') -> List[DownloadTask]:
+        return [
+            DownloadTask(node.id, node.name, dest_dir / folder, node.size, node.md5, node.modified_time)
+            for folder, node in files
+            if node.name.endswith(suffix)
+        ]
+
+    def plan_month(self, month: str) -> Optional[List[DownloadTask]]:
+        """Everything to download for a month, or None if the month folder doesn't exist"""
+        drive_root = DriveNode(self.drive_id, '')
+        drive_root.children = [
+            DriveNode(item['id'], item['name'])
+            for item in self.client.list_all(
+                f"'{self.drive_id}' in parents and mimeType='{FOLDER_MIME}' and trashed=false "
+                f"and (name='{month}' or name='master_data')")
+        ]
+        month_folder = drive_root.child(month)
+        if not month_folder:
+            return None
+
+        self._log(f"Found month folder: {month}")
+        master_folder = drive_root.child('master_data')
+        self.client.walk([month_folder] + ([master_folder] if master_folder else []))
+        tasks = []
+        self.folders = {month_folder.id: self.base_dir / month}
+
+        # Master CSV first (top level only) - extraction can't start without it
+        if master_folder:
+            top_level = [(folder, node) for folder, node in master_folder.files() if folder == Path()]
+            tasks += self._tasks_for(top_level, self.base_dir / 'master_data', suffix='.csv')
+            self.folders[master_folder.id] = self.base_dir / 'master_data'
+
+        # Commission statements, with any subfolders (like MyAccess) at any depth
+        comm_folder = month_folder.child('commission_statements')
+        if comm_folder:
+            tasks += self._tasks_for(comm_folder.files(), self.base_dir / month / 'commission_statements')
+            self._map_folders(comm_folder, self.base_dir / month / 'commission_statements')
+
+        # Bank statement
+        bank_folder = month_folder.child('bank_statement')
+        if bank_folder:
+            tasks += self._tasks_for(bank_folder.files(), self.base_dir / month / 'bank_statement')
+            self._map_folders(bank_folder, self.base_dir / month / 'bank_statement')
+
+        self._log(f"Listed {len(tasks)} files in {self.client.requests_made} Drive requests")
+        return tasks
+
+    def _download(self, task: DownloadTask) -> int:
+        written = self.client.download(task.file_id, task.dest_path, self.chunk_size, task.size, task.md5)
+        self._log(f"  ✓ Downloaded: {task.dest_path.relative_to(self.base_dir)}")
+        return written
+
+    def run(self, tasks: List[DownloadTask],
+            on_file: Optional[Callable[[Path], None]] = None) -> SyncSummary:
+        """Download every task, at most `workers` at a time, calling on_file as each one lands"""
+        summary = SyncSummary()
+        started = time.time()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self._download, task): task for task in tasks}
+            for future in as_completed(futures):
+                task = futures[future]
+                try:
+                    summary.bytes += future.result()
+                    summary.downloaded += 1
+                    self.manifest.record(task)
+                except Exception as e:
+                    summary.failed.append(task.name)
+                    self._log(f"  ✗ Failed to download {task.name}: {e}")
+                    continue
+                if on_file:
+                    on_file(task.dest_path)
+
+        summary.seconds = time.time() - started
+        return summary
+
+    def sync_month(self, month: str, on_file: Optional[Callable[[Path], None]] = None) -> Optional[SyncSummary]:
+        """
+        Download what changed since the last sync and record it in the manifest
+
+        on_file is called (from this thread) with each local path once it is
+        current - straight away for unchanged files, on arrival for the rest.
+        """
+        tasks = self.plan_month(month)
+        if tasks is None:
+            return None
+
+        self.changes = self.manifest.compare(tasks, scopes=[f"{month}/", 'master_data/'])
+        pending = set(self.changes.new + self.changes.changed)
+        to_download = tasks if self.full else [
+            task for task in tasks if self.manifest.relative(task.dest_path) in pending
+        ]
+
+        self._log(f"\n{len(self.changes.new)} new, {len(self.changes.changed)} changed, "
+                  f"{len(self.changes.unchanged)} unchanged, {len(self.changes.deleted)} deleted on Drive")
+        self._log(f"Downloading {len(to_download)} files with {self.workers} workers...")
+
+        if on_file:
+            downloading = {task.dest_path for task in to_download}
+            for task in tasks:
+                if task.dest_path not in downloading:
+                    on_file(task.dest_path)
+
+        try:
+            summary = self.run(to_download, on_file)
+        finally:
+            self.manifest.save()
+
+        for relative in self.changes.deleted:
+            self.manifest.mark_deleted(relative)
+            local = self.base_dir / relative
+            if self.prune and local.exists():
+                local.unlink()
+                self._log(f"  ✗ Removed (deleted on Drive): {relative}")
+            else:
+                self._log(f"  ! Deleted on Drive: {relative}")
+
+        # Failed downloads aren't in the manifest yet, so the next sync retries them
+        self.manifest.save()
+        self.changes.save(self.base_dir / month / CHANGES_NAME, month)
+        return summary
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    import argparse
+    from datetime import datetime
+
+    parser = argparse.ArgumentParser(description='Sync a month of commission files from Google Drive')
+    parser.add_argument('--month', type=str, default=datetime.now().strftime('%Y-%m'),
+                        help='Month to sync in YYYY-MM format (e.g., 2025-08)')
+    parser.add_argument('--base-dir', type=str, default=BASE_DIR, help='Local data directory')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Concurrent downloads')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE // 1024,
+                        help='Download chunk size in KB')
+    parser.add_argument('--api-base', type=str, default=DRIVE_API_BASE,
+                        help='Drive API base URL (point at fake_drive.py for local testing)')
+    parser.add_argument('--drive-id', type=str, default=SHARED_DRIVE_ID, help='Shared drive ID')
+    parser.add_argument('--full', action='store_true', help='Download every file, even unchanged ones')
+    parser.add_argument('--prune', action='store_true', help='Delete local copies of files removed from Drive')
+    args = parser.parse_args(argv)
+
+    client = DriveClient(args.api_base, pool_size=args.workers)
+    sync = DriveSync(client, args.base_dir, args.drive_id, workers=args.workers,
+                     chunk_size=args.chunk_size * 1024, full=args.full, prune=args.prune)
+
+    summary = sync.sync_month(args.month)
+    if summary is None:
+        print(f"ERROR: Month folder '{args.month}' not found in shared Drive")
+        sys.exit(1)
+
+    print("\n" + "=" * 70)
+    print(f"✓ Sync Complete! {summary.report()}")
+    print("=" * 70)
+
+    if summary.failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Google Drive Change Watcher
+Keeps a month's local files and extraction outputs current by polling the
+shared drive's changes feed instead of re-listing the month's folders.
+
+On start it syncs the month once (cheap when the manifest is current) to learn
+the folder layout, then polls changes.list from a stored page token. Only files
+that changed are downloaded, and only the statements that changed are
+re-extracted - outputs for the rest are reused from extraction_state.json.
+Files removed from Drive are removed locally too, unless --keep-deleted.
+
+Usage:
+    python drive_watch.py --month 2025-10 --interval 60
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from drive_sync import (BASE_DIR, DEFAULT_WORKERS, DRIVE_API_BASE, FOLDER_MIME, SHARED_DRIVE_ID, DownloadTask,
+                        DriveClient, DriveNode, DriveSync)
+from extract_commissions import CommissionExtractor
+
+BASE_OUTPUT_DIR = "/home/sam/chatbot-platform/mbh/commission-automator/output"
+LOG_DIR = "/home/sam/chatbot-platform/mbh/commission-automator/logs"
+MASTER_CSV_NAME = "mbh master contacts list.csv"
+TOKEN_FILE = '.drive_changes_token.json'
+DEFAULT_INTERVAL = 60
+
+
+class DriveWatcher:
+    """Applies the Drive changes feed to one month's local copy"""
+
+    def __init__(self, sync: DriveSync, month: str, output_dir: Optional[str] = None, log_dir: str = LOG_DIR):
+        self.sync = sync
+        self.client = sync.client
+        self.month = month
+        self.base_dir = sync.base_dir
+        self.pdf_dir = self.base_dir / month / 'commission_statements'
+        self.master_csv = self.base_dir / 'master_data' / MASTER_CSV_NAME
+        self.output_dir = Path(output_dir or f"{BASE_OUTPUT_DIR}/{month}")
+        self.log_dir = log_dir
+        self.token_path = self.base_dir / TOKEN_FILE
+        self.page_token = None
+        self.extractor = None
+        self.failed: List[str] = []     # downloads that failed in the last apply()
+
+    def _load_token(self) -> Optional[str]:
+        if self.token_path.exists():
+            with open(self.token_path) as f:
+                saved = json.load(f)
+            if saved.get('drive_id') == self.sync.drive_id:
+                return saved['page_token']
+        return None
+
+    def _save_token(self):
+        tmp_path = self.token_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({'drive_id': self.sync.drive_id, 'page_token': self.page_token,
+                       'updated_at': time.strftime('%Y-%m-%dT%H:%M:%S')}, f)
+        os.replace(tmp_path, self.token_path)
+
+    def start(self) -> bool:
+        """Initial sync and extraction; False if the month folder doesn't exist"""
+        # Take the token before syncing so nothing changed during the sync is missed
+        self.page_token = self._load_token() or self.client.start_page_token(self.sync.drive_id)
+
+        summary = self.sync.sync_month(self.month)
+        if summary is None:
+            return False
+        self.sync._log(summary.report())
+        self._save_token()
+
+        self.extractor = CommissionExtractor(str(self.pdf_dir), str(self.master_csv), str(self.output_dir),
+                                             self.log_dir, claude_api_key=os.getenv('ANTHROPIC_API_KEY'))
+        self.extractor.refresh()
+        return True
+
+    def _path_for_id(self, file_id: str) -> Optional[str]:
+        """Relative path the manifest has for a Drive file id"""
+        for relative, entry in self.sync.manifest.entries.items():
+            if entry.get('id') == file_id and entry.get('status') == 'present':
+                return relative
+        return None
+
+    def _remove(self, relative: str, touched: Set[Path]):
+        self.sync.manifest.mark_deleted(relative)
+        local = self.base_dir / relative
+        if self.sync.prune and local.exists():
+            local.unlink()
+        self.sync._log(f"  ✗ Deleted on Drive: {relative}")
+        touched.add(local)
+
+    def _watched_dir(self, file: Dict) -> Optional[Path]:
+        return next((self.sync.folders[parent] for parent in file.get('parents', [])
+                     if parent in self.sync.folders), None)
+
+    def apply(self, changes: List[Dict]) -> Set[Path]:
+        """Download or remove what the changes touch; returns the affected local paths"""
+        tasks, touched = [], set()
+        month_dir = self.base_dir / self.month
+        self.failed = []
+
+        for change in changes:
+            file = change.get('file') or {}
+            previous = self._path_for_id(change['fileId'])
+
+            if change.get('removed') or file.get('trashed'):
+                if previous:
+                    self._remove(previous, touched)
+                continue
+
+            dest_dir = self._watched_dir(file)
+            if file.get('mimeType') == FOLDER_MIME:
+                # New (or moved-in) folder: pick up its whole subtree. Only
+                # commission_statements/bank_statement are watched at month level.
+                if dest_dir is None or (dest_dir == month_dir and
+                                        file['name'] not in ('commission_statements', 'bank_statement')):
+                    continue
+                if dest_dir == self.base_dir / 'master_data' or file['id'] in self.sync.folders:
+                    continue
+                folder = DriveNode(file['id'], file['name'])
+                self.client.walk([folder])
+                self.sync._map_folders(folder, dest_dir / folder.name)
+                tasks += self.sync._tasks_for(folder.files(), dest_dir / folder.name)
+                continue
+
+            if dest_dir is None or dest_dir == month_dir:
+                if previous:
+                    # Moved out of the watched folders
+                    self._remove(previous, touched)
+                continue
+            if dest_dir == self.base_dir / 'master_data' and not file['name'].endswith('.csv'):
+                continue
+
+            task = DownloadTask(file['id'], file['name'], dest_dir, int(file.get('size', 0) or 0),
+                                file.get('md5Checksum', ''), file.get('modifiedTime', ''))
+            relative = self.sync.manifest.relative(task.dest_path)
+            if previous and previous != relative:
+                # Renamed or moved within the month
+                self._remove(previous, touched)
+            tasks.append(task)
+
+        # A new folder's files can arrive both from its walk and as their own changes
+        unique = {task.dest_path: task for task in tasks}
+        pending = [task for task in unique.values() if not self.sync.manifest.is_current(task)]
+        if pending:
+            summary = self.sync.run(pending, on_file=touched.add)
+            self.sync._log(summary.report())
+            self.failed = summary.failed
+        self.sync.manifest.save()
+        return touched
+
+    def poll(self) -> Set[Path]:
+        """Apply changes since the last poll, re-extracting if any statement or the master list changed"""
+        changes, next_token = self.client.changes(self.page_token, self.sync.drive_id)
+        touched = self.apply(changes) if changes else set()
+
+        if any(path == self.master_csv or self.pdf_dir in path.parents for path in touched):
+            self.extractor.refresh()
+
+        if self.failed:
+            # Keep the old token so the next poll replays these changes; files already current are skipped
+            self.extractor.logger.warning(f"{len(self.failed)} download(s) failed ({', '.join(self.failed)}); "
+                                          f"retrying on the next poll")
+            return touched
+        self.page_token = next_token
+        self._save_token()
+        return touched
+
+    def watch(self, interval: float = DEFAULT_INTERVAL):
+        """Poll forever"""
+        while True:
+            time.sleep(interval)
+            try:
+                self.poll()
+            except Exception as e:
+                # Keep watching through transient API errors; the token only advances on success
+                self.extractor.logger.error(f"Drive change poll failed: {e}")
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    import argparse
+    from datetime import datetime
+
+    parser = argparse.ArgumentParser(description="Keep a month's files and outputs current from the Drive changes feed")
+    parser.add_argument('--month', type=str, default=datetime.now().strftime('%Y-%m'),
+                        help='Month to watch in YYYY-MM format (e.g., 2025-08)')
+    parser.add_argument('--base-dir', type=str, default=BASE_DIR, help='Local data directory')
+    parser.add_argument('--output-dir', type=str, help='Output directory (default: output/<month>)')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help='Seconds between polls')
+    parser.add_argument('--once', action='store_true', help='Sync, poll once and exit')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Concurrent downloads')
+    parser.add_argument('--api-base', type=str, default=DRIVE_API_BASE,
+                        help='Drive API base URL (point at fake_drive.py for local testing)')
+    parser.add_argument('--drive-id', type=str, default=SHARED_DRIVE_ID, help='Shared drive ID')
+    parser.add_argument('--keep-deleted', action='store_true',
+                        help="Keep local copies of files removed from Drive (they'll still be extracted)")
+    args = parser.parse_args(argv)
+
+    client = DriveClient(args.api_base, pool_size=args.workers)
+    sync = DriveSync(client, args.base_dir, args.drive_id, workers=args.workers, prune=not args.keep_deleted)
+    watcher = DriveWatcher(sync, args.month, args.output_dir)
+
+    if not watcher.start():
+        print(f"ERROR: Month folder '{args.month}' not found in shared Drive")
+        sys.exit(1)
+
+    if args.once:
+        watcher.poll()
+    else:
+        print(f"Watching Drive for changes to {args.month} every {args.interval:g}s")
+        watcher.watch(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Entry Stream
+all_commission_data.json as JSON Lines, written as statements are extracted,
+with a sidecar index for reading one carrier or one page at a time.
+
+all_commission_data.json is a single array, so a reader has to parse all of
+it before it can show anything. all_commission_data.jsonl (or .jsonl.gz) has
+the same rows, one per line, and each statement's rows are appended and
+flushed as soon as they are added to the results. A reader can follow the
+file while a month is still being extracted.
+
+Rows are written in blocks: runs of at most BLOCK_LINES rows from one carrier.
+When the stream is closed, the file's offset index is written next to it as
+<file>.idx.json; it holds each block's carrier, byte offset, first row and row
+count. In a .gz stream every block is its own gzip member (concatenated
+members are still one valid gzip file). A reader can start decompressing at
+any block without reading the ones before it.
+
+    reader = EntryStreamReader.open(output_dir)
+    reader.carriers()                                   # {'Beam': 1200, ...}
+    for row in reader.read(carrier='Beam', start=100, limit=50):
+        ...
+
+Without an index, or with one that doesn't match the file (a run still in
+progress or one that stopped partway), the reader scans the file from the start
+instead.
+
+Usage:
+    python entry_stream.py output/2025-10 --carriers
+    python entry_stream.py output/2025-10 --carrier Beam --start 100 --limit 50
+"""
+
+import gzip
+import json
+import logging
+import os
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional
+
+STREAM_NAME = 'all_commission_data.jsonl'
+STREAM_FORMATS = ('jsonl', 'jsonl.gz', 'none')
+DEFAULT_STREAM_FORMAT = os.getenv('COMMISSION_STREAM_FORMAT', 'jsonl')
+BLOCK_LINES = 1000
+INDEX_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+
+def stream_path(output_dir: Path, compressed: bool) -> Path:
+    return Path(output_dir) / (f"{STREAM_NAME}.gz" if compressed else STREAM_NAME)
+
+
+def index_path_for(path: Path) -> Path:
+    return path.with_name(f"{path.name}.idx.json")
+
+
+def entry_row(entry, needs_review: bool) -> Dict:
+    """One all_commission_data row: the entry plus the fields the review page reads"""
+    row = entry.to_dict()
+    row['confidence'] = entry.get('match_confidence', 100)
+    row['needs_review'] = needs_review
+    return row
+
+
+class EntryStreamWriter:
+    """Appends rows to the month's JSON Lines file; the index is written on close()"""
+
+    def __init__(self, output_dir: Path, compressed: bool = False):
+        self.path = stream_path(output_dir, compressed)
+        self.index_path = index_path_for(self.path)
+        self.compressed = compressed
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Readers must not pair the new file with the last run's index, or read the other format's stale file
+        other = stream_path(output_dir, not compressed)
+        for stale in (self.index_path, other, index_path_for(other)):
+            stale.unlink(missing_ok=True)
+
+        self._file: BinaryIO = open(self.path, 'wb')
+        self.blocks: List[Dict] = []
+        self.rows = 0
+
+    def write(self, rows: Iterable[Dict]):
+        """Append rows (one statement's, say) and flush them so followers can read them"""
+        block, out = None, None
+        for row in rows:
+            if block is None or row['carrier'] != block['carrier'] or block['count'] == BLOCK_LINES:
+                if out is not None:
+                    self._end_block(out)
+                block = {'carrier': row['carrier'], 'offset': self._file.tell(), 'first': self.rows, 'count': 0}
+                self.blocks.append(block)
+                out = gzip.GzipFile(fileobj=self._file, mode='wb', mtime=0) if self.compressed else self._file
+            out.write(json.dumps(row, default=str).encode('utf-8') + b'\n')
+            block['count'] += 1
+            self.rows += 1
+        if out is not None:
+            self._end_block(out)
+
+    def _end_block(self, out):
+        if out is not self._file:
+            out.close()                 # ends the gzip member; the underlying file stays open
+        self._file.flush()
+
+    def close(self):
+        """Finish the file and write its offset index"""
+        self._file.close()
+        index = {'version': INDEX_VERSION, 'compressed': self.compressed, 'size': self.path.stat().st_size,
+                 'rows': self.rows, 'blocks': self.blocks}
+        tmp_path = self.index_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(index))
+        os.replace(tmp_path, self.index_path)
+        return self.path
+
+
+class EntryStreamReader:
+    """Rows of a month's entry stream, by carrier and page, without loading the whole month"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.compressed = self.path.suffix == '.gz'
+        self.size = self.path.stat().st_size
+        self.index = self._load_index()
+
+    @classmethod
+    def open(cls, output_dir: Path) -> 'EntryStreamReader':
+        """The stream in a month's output folder, whichever format it was written in"""
+        for compressed in (False, True):
+            path = stream_path(output_dir, compressed)
+            if path.exists():
+                return cls(path)
+        raise FileNotFoundError(f"No {STREAM_NAME}[.gz] in {output_dir}")
+
+    def _load_index(self) -> Optional[Dict]:
+        try:
+            index = json.loads(index_path_for(self.path).read_text())
+        except (OSError, ValueError):
+            return None
+        if index.get('version') != INDEX_VERSION or index.get('size') != self.size:
+            logger.info(f"Index for {self.path.name} doesn't match the file; scanning it instead")
+            return None
+        return index
+
+    def __len__(self) -> int:
+        if self.index is not None:
+            return self.index['rows']
+        return sum(1 for _ in self._scan())
+
+    def carriers(self) -> Dict[str, int]:
+        """Row count per carrier, in stream order"""
+        counts: Dict[str, int] = {}
+        if self.index is not None:
+            for block in self.index['blocks']:
+                counts[block['carrier']] = counts.get(block['carrier'], 0) + block['count']
+        else:
+            for row in self._scan():
+                counts[row['carrier']] = counts.get(row['carrier'], 0) + 1
+        return counts
+
+    def read(self, carrier: Optional[str] = None, start: int = 0, limit: Optional[int] = None) -> Iterator[Dict]:
+        """Rows (of one carrier, if given), skipping the first start of them, at most limit"""
+        if limit is not None and limit <= 0:
+            return
+        if self.index is None:
+            rows = (row for row in self._scan() if carrier is None or row['carrier'] == carrier)
+            for n, row in enumerate(rows):
+                if n >= start:
+                    yield row
+                    if limit is not None and n + 1 - start >= limit:
+                        return
+            return
+
+        wanted = limit
+        with open(self.path, 'rb') as f:
+            for block in self.index['blocks']:
+                if carrier is not None and block['carrier'] != carrier:
+                    continue
+                if start >= block['count']:
+                    start -= block['count']
+                    continue
+                for row in self._read_block(f, block, start):
+                    yield row
+                    if wanted is not None:
+                        wanted -= 1
+                        if not wanted:
+                            return
+                start = 0
+
+    def _read_block(self, f: BinaryIO, block: Dict, skip: int) -> Iterator[Dict]:
+        f.seek(block['offset'])
+        lines = gzip.GzipFile(fileobj=f, mode='rb') if self.compressed else f
+        for n in range(block['count']):
+            line = lines.readline()
+            if n >= skip:
+                yield json.loads(line)
+
+    def _scan(self) -> Iterator[Dict]:
+        """Every complete row, in order"""
+        opener = gzip.open if self.compressed else open
+        with opener(self.path, 'rb') as f:
+            try:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        return              # still being written
+                    yield json.loads(line)
+            except EOFError:
+                return                      # a gzip member still being written
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Page through a month\'s all_commission_data.jsonl')
+    parser.add_argument('path', help='Month output folder, or the .jsonl / .jsonl.gz file')
+    parser.add_argument('--carriers', action='store_true', help='List carriers and row counts')
+    parser.add_argument('--carrier', type=str, help='Only this carrier\'s rows')
+    parser.add_argument('--start', type=int, default=0, help='Rows to skip (default: 0)')
+    parser.add_argument('--limit', type=int, default=20, help='Rows to print (default: 20; 0 for all)')
+    args = parser.parse_args(argv)
+
+    path = Path(args.path)
+    try:
+        reader = EntryStreamReader.open(path) if path.is_dir() else EntryStreamReader(path)
+    except FileNotFoundError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+
+    if args.carriers:
+        for carrier, count in reader.carriers().items():
+            print(f"{count:>8,}  {carrier}")
+        return
+    for row in reader.read(args.carrier, args.start, args.limit or None):
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,34 +4,105 @@ Commission Statement Extractor
 Extracts commission data from various carrier PDF statements
 """
 
-import pdfplumber
 import csv
 import re
 import os
+import sys
 import logging
 import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Optional
-from fuzzywuzzy import fuzz
-from fuzzywuzzy import process
-import anthropic
+
+from commission_entry import CommissionEntry
+from contacts_index import ContactsIndex, load_index
+from entry_stream import DEFAULT_STREAM_FORMAT, STREAM_FORMATS, EntryStreamWriter, entry_row
+from history_store import record_month
+from lazy_imports import lazy_import
+from log_config import DEFAULT_FORMAT, DEFAULT_LEVEL, add_logging_arguments, configure_logging, log_event
+from memory_guard import MEMORY, add_memory_arguments
+from metrics import METRICS
+from profiling import RunProfiler, add_profile_arguments
+from statement_triage import StatementTriage, TriageResult, find_near_duplicates, save_triage_report, statement_pdfs
+
+# Heavy dependencies load on first use (see lazy_imports.py)
+pdfplumber = lazy_import('pdfplumber')
+anthropic = lazy_import('anthropic')
+
+# inotify-backed file watching for --watch; falls back to polling without it
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+# Master contacts already loaded in this process, keyed on (path, size, mtime)
+_MASTER_CONTACTS_CACHE = {}
+
+# Per-statement results kept in the output directory, so later runs only re-extract what changed
+EXTRACTION_STATE_FILE = 'extraction_state.json'
+
+
+def file_signature(path: Path) -> List[int]:
+    stat = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+@contextmanager
+def open_pdf(pdf_path: Path):
+    """pdfplumber.open(), timed as the pdf_open stage"""
+    with METRICS.span('pdf_open'):
+        pdf = pdfplumber.open(pdf_path)
+    try:
+        yield pdf
+    finally:
+        pdf.close()
+
+
+def page_text(page) -> str:
+    """page.extract_text(), timed per page as the extract_text stage (the page is released in low-memory mode)"""
+    with METRICS.span('extract_text'):
+        text = page.extract_text()
+    METRICS.count('pages')
+    MEMORY.page_done(page)
+    return text
+
+
+def carrier_stage(carrier: str):
+    """Time a carrier extractor as the parse stage, tagging everything under it with the carrier"""
+    def decorate(extract):
+        @wraps(extract)
+        def timed(self, pdf_path, *args):
+            with METRICS.span('parse', carrier=carrier):
+                return extract(self, pdf_path, *args)
+        return timed
+    return decorate
 
 
 class CommissionExtractor:
-    def __init__(self, pdf_dir: str, master_csv: str, output_dir: str, log_dir: str, claude_api_key: Optional[str] = None):
+    def __init__(self, pdf_dir: str, master_csv: str, output_dir: str, log_dir: str, claude_api_key: Optional[str] = None,
+                 configure_logging: bool = True, log_level: str = DEFAULT_LEVEL, log_format: str = DEFAULT_FORMAT,
+                 profiler: Optional[RunProfiler] = None, stream_format: str = DEFAULT_STREAM_FORMAT):
         self.pdf_dir = Path(pdf_dir)
         self.master_csv = Path(master_csv)
         self.output_dir = Path(output_dir)
         self.log_dir = Path(log_dir)
 
-        # Setup Claude API client
-        self.claude_client = None
-        if claude_api_key:
-            self.claude_client = anthropic.Anthropic(api_key=claude_api_key)
+        # Claude API client, created the first time an unknown format needs it
+        self.claude_api_key = claude_api_key
+        self._claude_client = None
 
-        # Setup logging
-        self.setup_logging()
+        # Setup logging (extraction worker processes log through their parent's handlers instead)
+        if configure_logging:
+            self.setup_logging(log_level, log_format)
+        else:
+            self.logger = logging.getLogger(__name__)
 
         # Load master contacts
         self.master_contacts = self.load_master_contacts()
@@ -39,36 +110,48 @@ class CommissionExtractor:
         # Results storage
         self.results = []
         self.review_items = []
-
-    def setup_logging(self):
-        """Setup logging to file and console"""
-        self.log_dir.mkdir(parents=True, exist_ok=True)
-        log_file = self.log_dir / f"extraction_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file),
-                logging.StreamHandler()
-            ]
-        )
+        self.file_results = {}      # PDF path relative to pdf_dir -> (signature, entries, review)
+
+        # Exact duplicate statements are skipped; the last scan's copies are reported with the results
+        self.triage = StatementTriage(self.pdf_dir)
+        self.last_triage = TriageResult()
+
+        # --profile: each statement gets its own profile
+        self.profiler = profiler
+
+        # all_commission_data.jsonl[.gz]: rows are appended as each statement is added, then indexed
+        self.stream_format = stream_format
+        self.entry_stream: Optional[EntryStreamWriter] = None
+
+    @property
+    def claude_client(self):
+        if self._claude_client is None and self.claude_api_key:
+            self._claude_client = anthropic.Anthropic(api_key=self.claude_api_key)
+        return self._claude_client
+
+    def setup_logging(self, level: str = DEFAULT_LEVEL, fmt: str = DEFAULT_FORMAT):
+        """Setup logging to file and console, written from a background thread"""
+        suffix = 'jsonl' if fmt == 'json' else 'log'
+        log_file = self.log_dir / f"extraction_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{suffix}"
+        configure_logging(log_file, level, fmt)
         self.logger = logging.getLogger(__name__)
 
-    def load_master_contacts(self) -> Dict[str, str]:
-        """Load master contacts CSV and create lookup dict"""
-        self.logger.info(f"Loading master contacts from {self.master_csv}")
-        contacts = {}
+    def load_master_contacts(self) -> ContactsIndex:
+        """Map the compiled master contacts index (card name -> state), compiling it if the CSV changed"""
+        stat = self.master_csv.stat()
+        cache_key = (str(self.master_csv.resolve()), stat.st_size, stat.st_mtime_ns)
+        if cache_key in _MASTER_CONTACTS_CACHE:
+            contacts = _MASTER_CONTACTS_CACHE[cache_key]
+            self.logger.info(f"Using {len(contacts)} cached contacts from {self.master_csv}")
+            return contacts
 
-        with open(self.master_csv, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                card_name = row.get('Card Name', '').strip()
-                state = row.get('State', '').strip()
-                if card_name:
-                    contacts[card_name] = state
+        self.logger.info(f"Loading master contacts from {self.master_csv}")
+        with METRICS.span('contacts_index'):
+            contacts = load_index(self.master_csv)
 
         self.logger.info(f"Loaded {len(contacts)} contacts from master list")
+        _MASTER_CONTACTS_CACHE.clear()
+        _MASTER_CONTACTS_CACHE[cache_key] = contacts
         return contacts
 
     def fuzzy_match_state(self, group_name: str) -> tuple[str, int]:
@@ -80,24 +163,27 @@ class CommissionExtractor:
             return "", 0
 
         # Get best match
-        result = process.extractOne(group_name, self.master_contacts.keys(), scorer=fuzz.token_sort_ratio)
+        with METRICS.span('fuzzy_match'):
+            result = self.master_contacts.match(group_name)
 
         if result:
-            matched_name, score = result[0], result[1]
-            state = self.master_contacts[matched_name]
-            self.logger.debug(f"Matched '{group_name}' to '{matched_name}' (score: {score}) -> {state}")
+            matched_name, state, score = result
+            log_event(self.logger, logging.DEBUG, 'state_match',
+                      "Matched '{group_name}' to '{matched_name}' (score: {score}) -> {state}",
+                      group_name=group_name, matched_name=matched_name, score=score, state=state)
             return state, score
 
         return "UNKNOWN", 0
 
-    def extract_allied(self, pdf_path: Path) -> List[Dict]:
+    @carrier_stage('Allied')
+    def extract_allied(self, pdf_path: Path) -> List[CommissionEntry]:
         """Extract commissions from Allied PDF"""
         self.logger.info(f"Extracting Allied: {pdf_path.name}")
         results = []
 
-        with pdfplumber.open(pdf_path) as pdf:
+        with open_pdf(pdf_path) as pdf:
             for page in pdf.pages:
-                text = page.extract_text()
+                text = page_text(page)
 
                 # Look for group entries with regex
                 # Pattern: Group number, group name, dates, amounts
@@ -109,23 +195,20 @@ class CommissionExtractor:
                     group_name = match.group(2).strip()
                     commission = match.group(3).replace(',', '')
 
-                    results.append({
-                        'carrier': 'Allied',
-                        'group_name': group_name,
-                        'commission': float(commission)
-                    })
+                    results.append(CommissionEntry('Allied', group_name, float(commission)))
 
         self.logger.info(f"Allied: Extracted {len(results)} entries")
         return results
 
-    def extract_beam(self, pdf_path: Path) -> List[Dict]:
+    @carrier_stage('Beam')
+    def extract_beam(self, pdf_path: Path) -> List[CommissionEntry]:
         """Extract commissions from Beam PDF"""
         self.logger.info(f"Extracting Beam: {pdf_path.name}")
         results = {}
 
-        with pdfplumber.open(pdf_path) as pdf:
+        with open_pdf(pdf_path) as pdf:
             for page in pdf.pages:
-                text = page.extract_text()
+                text = page_text(page)
                 lines = text.split('\n')
 
                 # In Beam PDFs, there are two patterns:
@@ -183,19 +266,20 @@ class CommissionExtractor:
 
         # Convert to list format
         result_list = [
-            {'carrier': 'Beam', 'group_name': name, 'commission': comm}
+            CommissionEntry('Beam', name, comm)
             for name, comm in results.items()
         ]
 
         self.logger.info(f"Beam: Extracted {len(result_list)} entries")
         return result_list
 
-    def extract_guardian(self, pdf_path: Path) -> List[Dict]:
+    @carrier_stage('Guardian')
+    def extract_guardian(self, pdf_path: Path) -> List[CommissionEntry]:
         """Extract commissions from Guardian PDF"""
         self.logger.info(f"Extracting Guardian: {pdf_path.name}")
 
-        with pdfplumber.open(pdf_path) as pdf:
-            text = pdf.pages[0].extract_text()
+        with open_pdf(pdf_path) as pdf:
+            text = page_text(pdf.pages[0])
 
             # Find the total commission amount
             # Look for "Guardian Life Total" line
@@ -205,16 +289,13 @@ class CommissionExtractor:
                 total_commission = match.group(1).replace(',', '')
                 self.logger.info(f"Guardian: Total commission ${total_commission}")
 
-                return [{
-                    'carrier': 'Guardian',
-                    'group_name': '',
-                    'commission': float(total_commission)
-                }]
+                return [CommissionEntry('Guardian', '', float(total_commission))]
 
         self.logger.warning(f"Guardian: Could not extract total commission")
         return []
 
-    def extract_american_heritage(self, pdf_path: Path) -> List[Dict]:
+    @carrier_stage('American Heritage Life Insurance Co')
+    def extract_american_heritage(self, pdf_path: Path) -> List[CommissionEntry]:
         """
         Extract commissions from American Heritage Life Insurance PDF
 
@@ -229,10 +310,10 @@ class CommissionExtractor:
         results = {}
         group_commissions_total = 0
 
-        with pdfplumber.open(pdf_path) as pdf:
+        with open_pdf(pdf_path) as pdf:
             # Extract group commissions from "Case" lines
             for page in pdf.pages:
-                text = page.extract_text()
+                text = page_text(page)
                 lines = text.split('\n')
 
                 for line in lines:
@@ -266,11 +347,13 @@ class CommissionExtractor:
                                 results[group_name] = commission
 
                             group_commissions_total += commission
-                            self.logger.debug(f"American Heritage: {group_name} -> ${commission:.2f}")
+                            log_event(self.logger, logging.DEBUG, 'group_commission',
+                                      "American Heritage: {group_name} -> ${commission:.2f}",
+                                      carrier='American Heritage', group_name=group_name, commission=commission)
 
             # Get total commission from PDF bottom
             last_page = pdf.pages[-1]
-            last_text = last_page.extract_text()
+            last_text = page_text(last_page)
 
             total_commission = 0
             # Try "Commissions Due" first
@@ -294,14 +377,15 @@ class CommissionExtractor:
 
         # Convert to list format
         result_list = [
-            {'carrier': 'American Heritage Life Insurance Co', 'group_name': name, 'commission': comm}
+            CommissionEntry('American Heritage Life Insurance Co', name, comm)
             for name, comm in results.items()
         ]
 
         self.logger.info(f"American Heritage: Extracted {len(result_list)} entries ({len([r for r in result_list if r['group_name']])} groups + {len([r for r in result_list if not r['group_name']])} blank)")
         return result_list
 
-    def extract_choice_builder(self, pdf_path: Path) -> List[Dict]:
+    @carrier_stage('Choice Builder')
+    def extract_choice_builder(self, pdf_path: Path) -> List[CommissionEntry]:
         """Extract commissions from Choice Builder PDF"""
         self.logger.info(f"Extracting Choice Builder: {pdf_path.name}")
         results = {}
@@ -310,9 +394,9 @@ class CommissionExtractor:
         current_company = None
         looking_for_company = False
 
-        with pdfplumber.open(pdf_path) as pdf:
+        with open_pdf(pdf_path) as pdf:
             for page in pdf.pages:
-                text = page.extract_text()
+                text = page_text(page)
                 lines = text.split('\n')
 
                 for i, line in enumerate(lines):
@@ -346,7 +430,9 @@ class CommissionExtractor:
                             if company_part:
                                 current_company = company_part
                                 looking_for_company = False
-                                self.logger.debug(f"Choice Builder: Found company '{current_company}' on commission line")
+                                log_event(self.logger, logging.DEBUG, 'company_detected',
+                                          "Choice Builder: Found company '{company}' on commission line",
+                                          carrier='Choice Builder', company=current_company, source='commission_line')
 
                         # Add commission to current company
                         if current_company:
@@ -362,26 +448,29 @@ class CommissionExtractor:
                             # This might be part of the company name or the full company name
                             current_company = line.strip()
                             looking_for_company = False
-                            self.logger.debug(f"Choice Builder: Found company '{current_company}' on separate line")
+                            log_event(self.logger, logging.DEBUG, 'company_detected',
+                                      "Choice Builder: Found company '{company}' on separate line",
+                                      carrier='Choice Builder', company=current_company, source='separate_line')
 
         # Convert to list format
         result_list = [
-            {'carrier': 'Choice Builder', 'group_name': name, 'commission': comm}
+            CommissionEntry('Choice Builder', name, comm)
             for name, comm in results.items()
         ]
 
         self.logger.info(f"Choice Builder: Extracted {len(result_list)} entries")
         return result_list
 
-    def extract_cal_choice(self, pdf_path: Path) -> List[Dict]:
+    @carrier_stage('Cal Choice')
+    def extract_cal_choice(self, pdf_path: Path) -> List[CommissionEntry]:
         """Extract commissions from Cal Choice PDF"""
         self.logger.info(f"Extracting Cal Choice: {pdf_path.name}")
         results = {}
         current_company = None
 
-        with pdfplumber.open(pdf_path) as pdf:
+        with open_pdf(pdf_path) as pdf:
             for page in pdf.pages:
-                text = page.extract_text()
+                text = page_text(page)
                 lines = text.split('\n')
 
                 for line in lines:
@@ -408,38 +497,40 @@ class CommissionExtractor:
 
         # Convert to list format
         result_list = [
-            {'carrier': 'Cal Choice', 'group_name': name, 'commission': comm}
+            CommissionEntry('Cal Choice', name, comm)
             for name, comm in results.items()
         ]
 
         self.logger.info(f"Cal Choice: Extracted {len(result_list)} entries, total: ${sum(r['commission'] for r in result_list):.2f}")
         return result_list
 
-    def extract_vsp_vision(self, pdf_path: Path) -> List[Dict]:
+    @carrier_stage('VSP Vision')
+    def extract_vsp_vision(self, pdf_path: Path) -> List[CommissionEntry]:
         """Extract commissions from VSP Vision PDF (lump sum format)"""
         self.logger.info(f"Extracting VSP Vision: {pdf_path.name}")
 
-        with pdfplumber.open(pdf_path) as pdf:
-            text = pdf.pages[0].extract_text()
+        with open_pdf(pdf_path) as pdf:
+            text = page_text(pdf.pages[0])
 
             # Look for "Sum total" line with amount
             match = re.search(r'Sum total\s+([\d,]+\.\d+)', text)
             if match:
                 commission = float(match.group(1).replace(',', ''))
                 self.logger.info(f"VSP Vision: Extracted total ${commission:.2f}")
-                return [{'carrier': 'VSP Vision', 'group_name': 'VSP Vision Total', 'commission': commission}]
+                return [CommissionEntry('VSP Vision', 'VSP Vision Total', commission)]
 
             # Fallback: look for Net Amount
             match = re.search(r'Net Amount[^\d]*([\d,]+\.\d+)', text)
             if match:
                 commission = float(match.group(1).replace(',', ''))
                 self.logger.info(f"VSP Vision: Extracted net amount ${commission:.2f}")
-                return [{'carrier': 'VSP Vision', 'group_name': 'VSP Vision Total', 'commission': commission}]
+                return [CommissionEntry('VSP Vision', 'VSP Vision Total', commission)]
 
         self.logger.warning(f"VSP Vision: Could not extract commission from {pdf_path.name}")
         return []
 
-    def extract_generic(self, pdf_path: Path, carrier_name: str) -> List[Dict]:
+    @carrier_stage('Claude API')
+    def extract_generic(self, pdf_path: Path, carrier_name: str) -> List[CommissionEntry]:
         """Generic extraction for unknown formats using Claude API"""
         self.logger.warning(f"Using Claude API extraction for {carrier_name}: {pdf_path.name}")
 
@@ -449,9 +540,9 @@ class CommissionExtractor:
 
         # Extract text from PDF
         full_text = ""
-        with pdfplumber.open(pdf_path) as pdf:
+        with open_pdf(pdf_path) as pdf:
             for page in pdf.pages:
-                text = page.extract_text()
+                text = page_text(page)
                 if text:
                     full_text += text + "\n"
 
@@ -513,16 +604,13 @@ Important:
             data = json.loads(response_text)
 
             # Convert to our standard format
-            carrier = data.get('carrier', 'Unknown')
+            carrier = data.get('carrier') or 'Unknown'
             entries = data.get('entries', [])
 
             results = []
             for entry in entries:
-                results.append({
-                    'carrier': carrier,
-                    'group_name': entry.get('group_name', ''),
-                    'commission': float(entry.get('commission', 0))
-                })
+                results.append(CommissionEntry(carrier, entry.get('group_name') or '',
+                                               float(entry.get('commission', 0))))
 
             self.logger.info(f"Claude API extracted {len(results)} entries from {pdf_path.name}")
             return results
@@ -535,7 +623,7 @@ Important:
             self.logger.error(f"Error calling Claude API for {pdf_path.name}: {str(e)}")
             return []
 
-    def process_pdf(self, pdf_path: Path) -> List[Dict]:
+    def process_pdf(self, pdf_path: Path) -> List[CommissionEntry]:
         """Route PDF to appropriate extractor based on filename or content"""
         filename = pdf_path.stem.lower()
 
@@ -554,8 +642,8 @@ Important:
                 return self.extract_vsp_vision(pdf_path)
             else:
                 # Try to detect carrier from PDF content
-                with pdfplumber.open(pdf_path) as pdf:
-                    first_page = pdf.pages[0].extract_text().lower()
+                with open_pdf(pdf_path) as pdf:
+                    first_page = page_text(pdf.pages[0]).lower()
 
                     if 'allied' in first_page:
                         return self.extract_allied(pdf_path)
@@ -579,99 +667,281 @@ Important:
         """Process all PDFs in the directory"""
         self.logger.info(f"Scanning for PDFs in {self.pdf_dir}")
 
-        # Get all PDFs recursively (case-insensitive)
-        pdf_files = list(self.pdf_dir.rglob('*.pdf')) + list(self.pdf_dir.rglob('*.PDF'))
+        # Get all PDFs recursively (case-insensitive), one copy of each statement
+        pdf_files = self._unique_pdf_files()
         self.logger.info(f"Found {len(pdf_files)} PDF files")
 
         for pdf_path in pdf_files:
+            self.add_file_results(*self.extract_file(pdf_path), pdf_path=pdf_path)
+
+        self.logger.info(f"Total extracted: {len(self.results)} commission entries")
+
+    def extract_file(self, pdf_path: Path) -> tuple[List[CommissionEntry], List[CommissionEntry]]:
+        """
+        Extract and state-match one PDF without touching the accumulated results
+        Returns: (entries, entries needing review)
+        """
+        profiled = self.profiler.document(pdf_path.name) if self.profiler else nullcontext()
+        with profiled, METRICS.span('statement', file=pdf_path.name) as tags:
             self.logger.info(f"Processing: {pdf_path.name}")
-            extracted = self.process_pdf(pdf_path)
-
-            # Add state matching
-            for item in extracted:
-                if item['group_name']:  # Only match if group name exists
-                    state, confidence = self.fuzzy_match_state(item['group_name'])
-                    item['state'] = state
-                    item['match_confidence'] = confidence
-
-                    # If matched state is blank/empty, assign to WA
-                    if not state or state == 'UNKNOWN':
-                        item['state'] = 'WA'
-                        self.logger.debug(f"Blank/unknown state assigned to WA: {item['group_name']} ${item['commission']:.2f}")
-
-                    # Flag for review if confidence is low
-                    if 60 <= confidence < 80:
-                        self.review_items.append(item)
-                        self.logger.warning(f"Low confidence match ({confidence}%): {item['group_name']} -> {item['state']}")
-                else:
-                    # Blank group names (Guardian, American Heritage personal plans) -> WA
+            with MEMORY.document(pdf_path.name):
+                extracted = self.process_pdf(pdf_path)
+                if extracted:
+                    # Routing decided the carrier; count state matching and memory against it too
+                    tags['carrier'] = extracted[0]['carrier']
+            review = self.match_states(extracted)
+            METRICS.count('entries', len(extracted))
+            METRICS.count('review_items', len(review))
+        return extracted, review
+
+    def match_states(self, extracted: List[CommissionEntry]) -> List[CommissionEntry]:
+        """Add state and match confidence to extracted entries; returns those needing review"""
+        review = []
+        for item in extracted:
+            if item['group_name']:  # Only match if group name exists
+                state, confidence = self.fuzzy_match_state(item['group_name'])
+                item['state'] = state
+                item['match_confidence'] = confidence
+
+                # If matched state is blank/empty, assign to WA
+                if not state or state == 'UNKNOWN':
                     item['state'] = 'WA'
-                    item['match_confidence'] = 100
-                    self.logger.debug(f"Blank group name assigned to WA: {item['carrier']} ${item['commission']:.2f}")
+                    log_event(self.logger, logging.DEBUG, 'state_fallback',
+                              "Blank/unknown state assigned to WA: {group_name} ${commission:.2f}",
+                              carrier=item['carrier'], group_name=item['group_name'], commission=item['commission'],
+                              reason='unmatched_state')
+
+                # Flag for review if confidence is low
+                if 60 <= confidence < 80:
+                    review.append(item)
+                    self.logger.warning(f"Low confidence match ({confidence}%): {item['group_name']} -> {item['state']}")
+            else:
+                # Blank group names (Guardian, American Heritage personal plans) -> WA
+                item['state'] = 'WA'
+                item['match_confidence'] = 100
+                log_event(self.logger, logging.DEBUG, 'state_fallback',
+                          "Blank group name assigned to WA: {carrier} ${commission:.2f}",
+                          carrier=item['carrier'], commission=item['commission'], reason='blank_group')
+
+        return review
+
+    def add_file_results(self, entries: List[CommissionEntry], review: List[CommissionEntry], pdf_path: Optional[Path] = None):
+        """Add one PDF's extract_file() output to the results"""
+        self.results.extend(entries)
+        self.review_items.extend(review)
+        if self.stream_format != 'none':
+            if self.entry_stream is None:
+                self.entry_stream = EntryStreamWriter(self.output_dir, compressed=self.stream_format == 'jsonl.gz')
+            review_ids = {id(item) for item in review}
+            self.entry_stream.write(entry_row(item, id(item) in review_ids) for item in entries)
+        if pdf_path is not None:
+            self.file_results[self._relative(pdf_path)] = (file_signature(pdf_path), entries, review)
+
+    def _relative(self, pdf_path: Path) -> str:
+        return Path(pdf_path).relative_to(self.pdf_dir).as_posix()
+
+    def _pdf_files(self) -> List[Path]:
+        return statement_pdfs(self.pdf_dir)
+
+    def _unique_pdf_files(self) -> List[Path]:
+        """Statements to extract, leaving out exact copies of another statement"""
+        self.last_triage = self.triage.triage(self._pdf_files())
+        for copy, kept in sorted(self.last_triage.duplicates.items()):
+            self.logger.warning(f"Skipping duplicate statement {self._relative(copy)} "
+                                f"(same content as {self._relative(kept)})")
+        return self.last_triage.unique
+
+    def save_triage_report(self):
+        """Record skipped copies and flag statements that look like the same statement twice"""
+        near_duplicates = find_near_duplicates({relative: entries for relative, (_, entries, _) in
+                                                self.file_results.items()})
+        for group in near_duplicates:
+            self.logger.warning(f"Possible duplicate statements ({group['carrier']}, {group['entries']} entries, "
+                                f"${group['total']:,.2f}): {', '.join(group['files'])}")
+
+        duplicates = {self._relative(copy): self._relative(kept) for copy, kept in self.last_triage.duplicates.items()}
+        report_path = save_triage_report(self.output_dir, duplicates, near_duplicates)
+        self.logger.info(f"Saved statement triage ({len(duplicates)} duplicates skipped, "
+                         f"{len(near_duplicates)} possible duplicates) to {report_path}")
+
+    def save_state(self):
+        """Record per-statement results for later incremental runs"""
+        state = {
+            'master_csv': file_signature(self.master_csv),
+            'hashes': self.triage.hashes,
+            'files': {
+                relative: {
+                    'signature': signature,
+                    'entries': [entry.to_dict() for entry in entries],
+                    # Review items are a subset of the entries; store their positions
+                    'review': [i for i, entry in enumerate(entries) if any(entry is item for item in review)],
+                }
+                for relative, (signature, entries, review) in self.file_results.items()
+            },
+        }
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        state_path = self.output_dir / EXTRACTION_STATE_FILE
+        tmp_path = state_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, default=str)
+        os.replace(tmp_path, state_path)
+
+    def load_state(self) -> bool:
+        """Load per-statement results from the last run; False if there are none or the master CSV changed"""
+        state_path = self.output_dir / EXTRACTION_STATE_FILE
+        if not state_path.exists():
+            return False
+        with open(state_path) as f:
+            state = json.load(f)
+        # Content hashes don't depend on the master list
+        self.triage.hashes = state.get('hashes', {})
+        if state.get('master_csv') != file_signature(self.master_csv):
+            # Every state match depends on the master list
+            self.logger.info("Master contacts changed since the last run; re-extracting everything")
+            return False
+
+        self.file_results = {}
+        for relative, saved in state.get('files', {}).items():
+            entries = [CommissionEntry.from_dict(entry) for entry in saved['entries']]
+            self.file_results[relative] = (saved['signature'], entries, [entries[i] for i in saved['review']])
+        return True
+
+    def refresh(self) -> Dict[str, int]:
+        """
+        Bring the outputs up to date with the PDFs on disk
+
+        Only statements that are new or whose size/mtime changed since the last
+        run are extracted; results for removed statements are dropped.
+        """
+        METRICS.reset()
+        MEMORY.reset()
+        # Pick up master list edits made since this extractor was created (cached if unchanged)
+        self.master_contacts = self.load_master_contacts()
+        if not self.load_state():
+            self.file_results = {}
+
+        on_disk = {self._relative(path): path for path in self._unique_pdf_files()}
+        removed = [relative for relative in self.file_results if relative not in on_disk]
+        for relative in removed:
+            del self.file_results[relative]
+            self.logger.info(f"Removed: {relative}")
+
+        changed = [
+            path for relative, path in sorted(on_disk.items())
+            if relative not in self.file_results or self.file_results[relative][0] != file_signature(path)
+        ]
+        for path in changed:
+            entries, review = self.extract_file(path)
+            self.file_results[self._relative(path)] = (file_signature(path), entries, review)
 
-                self.results.append(item)
+        self.results, self.review_items = [], []
+        for relative in sorted(self.file_results):
+            _, entries, review = self.file_results[relative]
+            self.results.extend(entries)
+            self.review_items.extend(review)
 
-        self.logger.info(f"Total extracted: {len(self.results)} commission entries")
+        self.save_results()
+        self.save_state()
+        self.save_metrics()
+        counts = {'extracted': len(changed), 'removed': len(removed),
+                  'unchanged': len(on_disk) - len(changed), 'entries': len(self.results)}
+        self.logger.info(f"Refreshed outputs: {counts['extracted']} extracted, {counts['removed']} removed, "
+                         f"{counts['unchanged']} unchanged, {counts['entries']} entries")
+        MEMORY.log_summary(self.logger)
+        return counts
 
     def save_results(self):
         """Save results to CSV and JSON files"""
-        self.output_dir.mkdir(parents=True, exist_ok=True)
-
-        # Build a set of review item identifiers to avoid duplicates
-        review_keys = set()
-        for item in self.review_items:
-            key = (item['carrier'], item['group_name'], item['commission'])
-            review_keys.add(key)
-
-        # Save all data as JSON for interactive processor
-        all_data = []
-        for item in self.results:
-            key = (item['carrier'], item['group_name'], item['commission'])
-            needs_review = key in review_keys
-            all_data.append({
-                **item,
-                'confidence': item.get('match_confidence', 100),
-                'needs_review': needs_review
-            })
-
-        json_file = self.output_dir / 'all_commission_data.json'
-        with open(json_file, 'w') as f:
-            json.dump(all_data, f, indent=2, default=str)
-        self.logger.info(f"Saved JSON data to {json_file}")
-
-        # Main output file
-        output_file = self.output_dir / 'commission_output.csv'
-        with open(output_file, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=['carrier', 'group_name', 'commission', 'state'])
-            writer.writeheader()
-
-            for item in self.results:
-                writer.writerow({
-                    'carrier': item['carrier'],
-                    'group_name': item['group_name'],
-                    'commission': f"{item['commission']:.2f}",
-                    'state': item['state']
-                })
-
-        self.logger.info(f"Saved main results to {output_file}")
-
-        # Review file (low confidence matches)
-        if self.review_items:
-            review_file = self.output_dir / 'needs_review.csv'
-            with open(review_file, 'w', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=['carrier', 'group_name', 'commission', 'state', 'match_confidence'])
+        with METRICS.span('write_outputs'):
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+
+            # Build a set of review item identifiers to avoid duplicates
+            review_keys = set()
+            for item in self.review_items:
+                key = (item['carrier'], item['group_name'], item['commission'])
+                review_keys.add(key)
+
+            # Save all data as JSON for interactive processor, one entry at a time
+            json_file = self.output_dir / 'all_commission_data.json'
+            with open(json_file, 'w') as f:
+                f.write('[')
+                for n, item in enumerate(self.results):
+                    row = entry_row(item, (item.carrier, item.group_name, item.commission) in review_keys)
+                    # Same layout as json.dump(rows, indent=2)
+                    f.write(',\n  ' if n else '\n  ')
+                    f.write(json.dumps(row, indent=2, default=str).replace('\n', '\n  '))
+                f.write('\n]' if self.results else ']')
+            self.logger.info(f"Saved JSON data to {json_file}")
+            self.save_entry_stream(review_keys)
+
+            # Main output file
+            output_file = self.output_dir / 'commission_output.csv'
+            with open(output_file, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=['carrier', 'group_name', 'commission', 'state'])
                 writer.writeheader()
 
-                for item in self.review_items:
+                for item in self.results:
                     writer.writerow({
                         'carrier': item['carrier'],
                         'group_name': item['group_name'],
                         'commission': f"{item['commission']:.2f}",
-                        'state': item['state'],
-                        'match_confidence': item['match_confidence']
+                        'state': item['state']
                     })
 
-            self.logger.info(f"Saved {len(self.review_items)} items needing review to {review_file}")
+            self.logger.info(f"Saved main results to {output_file}")
+
+            # Review file (low confidence matches)
+            if self.review_items:
+                review_file = self.output_dir / 'needs_review.csv'
+                with open(review_file, 'w', newline='') as f:
+                    writer = csv.DictWriter(f, fieldnames=['carrier', 'group_name', 'commission', 'state', 'match_confidence'])
+                    writer.writeheader()
+
+                    for item in self.review_items:
+                        writer.writerow({
+                            'carrier': item['carrier'],
+                            'group_name': item['group_name'],
+                            'commission': f"{item['commission']:.2f}",
+                            'state': item['state'],
+                            'match_confidence': item['match_confidence']
+                        })
+
+                self.logger.info(f"Saved {len(self.review_items)} items needing review to {review_file}")
+            elif (self.output_dir / 'needs_review.csv').exists():
+                # Left over from a run whose low-confidence statements have since changed
+                (self.output_dir / 'needs_review.csv').unlink()
+
+            self.save_triage_report()
+        self.save_history()
+
+    def save_entry_stream(self, review_keys: set):
+        """Finish all_commission_data.jsonl, writing it in one pass if nothing was streamed (refresh())"""
+        if self.stream_format == 'none':
+            return
+        stream, self.entry_stream = self.entry_stream, None
+        if stream is None:
+            stream = EntryStreamWriter(self.output_dir, compressed=self.stream_format == 'jsonl.gz')
+            stream.write(entry_row(item, (item.carrier, item.group_name, item.commission) in review_keys)
+                         for item in self.results)
+        path = stream.close()
+        self.logger.info(f"Saved {stream.rows} JSON Lines rows to {path} ({len(stream.blocks)} indexed blocks)")
+
+    def save_history(self):
+        """Mirror commission_output.csv into the cross-month history store (month output folders only)"""
+        try:
+            with METRICS.span('history'):
+                db_path = record_month(self.output_dir)
+        except (sqlite3.Error, OSError) as e:
+            self.logger.warning(f"Could not update the history store: {e}")
+            return
+        if db_path:
+            self.logger.info(f"Recorded {self.output_dir.name} in the history store {db_path}")
+
+    def save_metrics(self):
+        """Write this run's stage timings to metrics.json and the Prometheus textfile"""
+        # Output folders are named for the month
+        json_path, prom_path = METRICS.write(self.output_dir, 'extraction', month=self.output_dir.name)
+        self.logger.info(f"Saved metrics to {json_path} and {prom_path}")
 
     def run(self):
         """Main execution method"""
@@ -679,31 +949,171 @@ Important:
         self.logger.info("Commission Extraction Started")
         self.logger.info("=" * 60)
 
+        METRICS.reset()
+        MEMORY.reset()
         self.process_all_pdfs()
         self.save_results()
+        self.save_state()
+        self.save_metrics()
 
         self.logger.info("=" * 60)
         self.logger.info("Commission Extraction Completed")
         self.logger.info(f"Total entries: {len(self.results)}")
         self.logger.info(f"Needs review: {len(self.review_items)}")
+        MEMORY.log_summary(self.logger)
         self.logger.info("=" * 60)
 
 
-if __name__ == "__main__":
+class _StatementEvents(FileSystemEventHandler):
+    def __init__(self, watcher: 'StatementWatcher'):
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        # Ignore opens and read-only closes - refresh() reading PDFs would retrigger itself
+        if event.event_type not in ('created', 'modified', 'deleted', 'moved', 'closed'):
+            return
+        paths = [event.src_path, getattr(event, 'dest_path', '')]
+        if event.is_directory or any(str(path).lower().endswith('.pdf') for path in paths):
+            self.watcher.notify()
+
+
+class StatementWatcher:
+    """
+    Keeps a month's outputs current while statements are dropped into its folder
+
+    Waits until the folder has been quiet for `debounce` seconds (so half-written
+    uploads settle), then runs CommissionExtractor.refresh(), which only
+    re-extracts new or modified PDFs.
+    """
+
+    def __init__(self, extractor: CommissionExtractor, debounce: float = 2.0, poll_interval: float = 2.0):
+        self.extractor = extractor
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._changed_at = None
+        self._stop = threading.Event()
+
+    def notify(self):
+        with self._lock:
+            self._changed_at = time.monotonic()
+
+    def _snapshot(self) -> Dict[str, List[int]]:
+        snapshot = {}
+        for path in self.extractor._pdf_files():
+            try:
+                snapshot[str(path)] = file_signature(path)
+            except FileNotFoundError:
+                pass
+        return snapshot
+
+    def _settled(self) -> bool:
+        with self._lock:
+            if self._changed_at is None or time.monotonic() - self._changed_at < self.debounce:
+                return False
+            self._changed_at = None
+            return True
+
+    def _refresh(self):
+        try:
+            self.extractor.refresh()
+        except Exception as e:
+            # e.g. an upload renamed mid-scan or a master CSV caught mid-write; try again after the next quiet period
+            self.extractor.logger.error(f"Refresh failed, retrying in {self.debounce:g}s: {e}", exc_info=True)
+            self.notify()
+
+    def run(self):
+        """Refresh once, then watch until stop() (or Ctrl+C)"""
+        self._refresh()
+
+        observer = None
+        if Observer is not None:
+            observer = Observer()
+            observer.schedule(_StatementEvents(self), str(self.extractor.pdf_dir), recursive=True)
+            observer.start()
+            self.extractor.logger.info(f"Watching {self.extractor.pdf_dir} for statement changes")
+        else:
+            self.extractor.logger.info(f"Polling {self.extractor.pdf_dir} every {self.poll_interval:g}s "
+                                       f"for statement changes (install watchdog for inotify)")
+
+        snapshot = self._snapshot()
+        try:
+            while not self._stop.wait(min(self.poll_interval, self.debounce) if observer else self.poll_interval):
+                if observer is None:
+                    current = self._snapshot()
+                    if current != snapshot:
+                        snapshot = current
+                        self.notify()
+                if self._settled():
+                    self._refresh()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+
+    def stop(self):
+        self._stop.set()
+
+
+def outputs_up_to_date(pdf_dir: str, master_csv: str, output_dir: str) -> bool:
+    """
+    True if the month's outputs were built from the statements now on disk
+
+    Drive sync only rewrites new or changed files, so an output newer than every
+    statement and the master CSV is current - unless the last sync reported a
+    statement removed from Drive (see drive_sync.py's sync_changes.json).
+    """
+    output_csv = Path(output_dir) / "commission_output.csv"
+    if not output_csv.exists():
+        return False
+
+    changes_file = Path(pdf_dir).parent / "sync_changes.json"
+    if changes_file.exists():
+        with open(changes_file) as f:
+            changes = json.load(f)
+        if any('commission_statements/' in path for path in changes.get('deleted', [])):
+            return False
+
+    built_at = output_csv.stat().st_mtime
+    inputs = [Path(master_csv)] + statement_pdfs(Path(pdf_dir))
+    return all(path.stat().st_mtime < built_at for path in inputs)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
     import argparse
 
     # Parse command line arguments
     parser = argparse.ArgumentParser(description='Extract commission data from PDF statements')
     parser.add_argument('--month', type=str, help='Month to process in YYYY-MM format (e.g., 2025-08)',
                        default=datetime.now().strftime('%Y-%m'))
-    args = parser.parse_args()
+    parser.add_argument('--if-changed', action='store_true',
+                        help='Skip extraction if no statement changed since the last run')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running, re-extracting statements as they are added, changed or removed')
+    parser.add_argument('--debounce', type=float, default=2.0,
+                        help='With --watch, seconds of quiet before re-extracting (default: 2)')
+    add_logging_arguments(parser)
+    add_profile_arguments(parser)
+    parser.add_argument('--stream-format', choices=STREAM_FORMATS, default=DEFAULT_STREAM_FORMAT,
+                        help='Also write all_commission_data as JSON Lines, gzipped or not, while extracting '
+                             '(default: $COMMISSION_STREAM_FORMAT or jsonl)')
+    add_memory_arguments(parser)
+    args = parser.parse_args(argv)
+    MEMORY.configure(args.memory_ceiling, args.low_memory, args.trace_memory)
+
+    if args.profile and args.watch:
+        print("ERROR: --profile profiles a single run and cannot be combined with --watch")
+        sys.exit(1)
 
     # Validate month format
     try:
         datetime.strptime(args.month, '%Y-%m')
     except ValueError:
         print(f"ERROR: Invalid month format '{args.month}'. Use YYYY-MM (e.g., 2025-08)")
-        exit(1)
+        sys.exit(1)
 
     # Configuration with month-based paths
     BASE_DATA_DIR = "/home/sam/commission_automator/data/mbh"
@@ -716,11 +1126,15 @@ if __name__ == "__main__":
     if not os.path.exists(PDF_DIR):
         print(f"ERROR: Commission statements directory not found: {PDF_DIR}")
         print(f"Please create the directory and add PDF files for {args.month}")
-        exit(1)
+        sys.exit(1)
 
     if not os.path.exists(MASTER_CSV):
         print(f"ERROR: Master contacts CSV not found: {MASTER_CSV}")
-        exit(1)
+        sys.exit(1)
+
+    if args.if_changed and outputs_up_to_date(PDF_DIR, MASTER_CSV, OUTPUT_DIR):
+        print(f"No statements changed since the last extraction for {args.month}; keeping {OUTPUT_DIR}")
+        return
 
     print(f"Processing commission statements for {args.month}")
     print(f"PDF Directory: {PDF_DIR}")
@@ -731,5 +1145,21 @@ if __name__ == "__main__":
     CLAUDE_API_KEY = os.getenv('ANTHROPIC_API_KEY')
 
     # Run extractor
-    extractor = CommissionExtractor(PDF_DIR, MASTER_CSV, OUTPUT_DIR, LOG_DIR, claude_api_key=CLAUDE_API_KEY)
-    extractor.run()
+    profiler = RunProfiler('extraction', args.profile_dir) if args.profile else None
+    extractor = CommissionExtractor(PDF_DIR, MASTER_CSV, OUTPUT_DIR, LOG_DIR, claude_api_key=CLAUDE_API_KEY,
+                                    log_level=args.log_level, log_format=args.log_format, profiler=profiler,
+                                    stream_format=args.stream_format)
+    if args.watch:
+        StatementWatcher(extractor, debounce=args.debounce).run()
+    elif profiler:
+        profiler.start()
+        try:
+            extractor.run()
+        finally:
+            profiler.finish(extractor.logger)
+    else:
+        extractor.run()
+
+
+if __name__ == "__main__":
+    main()
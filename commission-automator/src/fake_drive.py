@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Fake Google Drive Server
+Serves a local directory tree through the subset of the Drive v3 REST API the
+sync scripts use, so syncs can be exercised without credentials or network.
+
+The root directory stands in for the shared drive: its subdirectories are
+folders and its files are files, e.g.
+
+    fake_root/2025-10/commission_statements/Beam.pdf
+    fake_root/master_data/mbh master contacts list.csv
+
+Edits to the directory show up in the changes feed (changes.list /
+changes.getStartPageToken), found by rescanning on each changes request.
+
+Usage:
+    python fake_drive.py --root /tmp/fake_root --port 8089
+    python drive_sync.py --month 2025-10 --api-base http://127.0.0.1:8089 --base-dir /tmp/synced
+"""
+
+import hashlib
+import json
+import re
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+FOLDER_MIME = 'application/vnd.google-apps.folder'
+DEFAULT_DRIVE_ID = '0AJ_IbKcKhFkyUk9PVA'
+MAX_PAGE_SIZE = 1000
+
+
+def _split_top_level(expression: str, keyword: str) -> List[str]:
+    """Split a query on ' and ' / ' or ' outside quotes and parentheses"""
+    parts, depth, quoted, start, i = [], 0, False, 0, 0
+    token = f" {keyword} "
+    while i < len(expression):
+        char = expression[i]
+        if char == '\\' and quoted:
+            i += 2
+            continue
+        if char == "'":
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        elif not quoted and depth == 0 and expression.startswith(token, i):
+            parts.append(expression[start:i])
+            i += len(token)
+            start = i
+            continue
+        i += 1
+    parts.append(expression[start:])
+    return [part.strip() for part in parts]
+
+
+def _unquote(value: str) -> str:
+    return value[1:-1].replace("\\'", "'")
+
+
+def matches_query(resource: Dict, query: str) -> bool:
+    """Evaluate the Drive query subset used by the sync scripts"""
+    query = query.strip()
+    if not query:
+        return True
+
+    clauses = _split_top_level(query, 'and')
+    if len(clauses) > 1:
+        return all(matches_query(resource, clause) for clause in clauses)
+
+    alternatives = _split_top_level(query, 'or')
+    if len(alternatives) > 1:
+        return any(matches_query(resource, alternative) for alternative in alternatives)
+
+    if query.startswith('(') and query.endswith(')'):
+        return matches_query(resource, query[1:-1])
+
+    match = re.fullmatch(r"('(?:[^'\\]|\\.)*')\s+in\s+parents", query)
+    if match:
+        return _unquote(match.group(1)) in resource['parents']
+
+    match = re.fullmatch(r"(\w+)\s*(!=|=)\s*('(?:[^'\\]|\\.)*'|true|false)", query)
+    if match:
+        field_name, operator, raw = match.groups()
+        if raw in ('true', 'false'):
+            value = raw == 'true'
+            actual = resource.get(field_name, False)
+        else:
+            value = _unquote(raw)
+            actual = resource.get(field_name)
+        return (actual == value) if operator == '=' else (actual != value)
+
+    raise ValueError(f"Unsupported query clause: {query}")
+
+
+def project_fields(resource: Dict, fields: str) -> Dict:
+    """Apply a files(a, b, c) field mask to one resource"""
+    match = re.search(r'files\(([^)]*)\)', fields or '')
+    if not match:
+        return resource
+    wanted = [name.strip() for name in match.group(1).split(',')]
+    return {name: resource[name] for name in wanted if name in resource}
+
+
+class FakeDrive:
+    """Directory-backed file index, rescanned on each request"""
+
+    def __init__(self, root: Path, drive_id: str = DEFAULT_DRIVE_ID):
+        self.root = Path(root)
+        self.drive_id = drive_id
+        self._md5_cache = {}
+
+        # Change feed: each rescan appends what differs from the previous one
+        self._changes_lock = threading.Lock()
+        self._changes = []
+        self._snapshot = self._versions(self.resources())
+
+    def file_id(self, path: Path) -> str:
+        if path == self.root:
+            return self.drive_id
+        relative = path.relative_to(self.root).as_posix()
+        return 'f' + hashlib.sha1(relative.encode()).hexdigest()[:24]
+
+    def _md5(self, path: Path, stat) -> str:
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        if key not in self._md5_cache:
+            self._md5_cache[key] = hashlib.md5(path.read_bytes()).hexdigest()
+        return self._md5_cache[key]
+
+    def resources(self) -> Dict[str, Dict]:
+        """Every file and folder under the root, keyed by id"""
+        resources = {}
+        for path in sorted(self.root.rglob('*')):
+            if path.name.startswith('.'):
+                continue
+            stat = path.stat()
+            resource = {
+                'id': self.file_id(path),
+                'name': path.name,
+                'parents': [self.file_id(path.parent)],
+                'modifiedTime': datetime.fromtimestamp(stat.st_mtime, timezone.utc)
+                                        .strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z',
+                'trashed': False,
+                '_path': path,
+            }
+            if path.is_dir():
+                resource['mimeType'] = FOLDER_MIME
+            else:
+                resource['mimeType'] = 'application/pdf' if path.suffix.lower() == '.pdf' else 'text/csv'
+                resource['size'] = str(stat.st_size)
+                resource['md5Checksum'] = self._md5(path, stat)
+            resources[resource['id']] = resource
+        return resources
+
+    @staticmethod
+    def _versions(resources: Dict[str, Dict]) -> Dict[str, tuple]:
+        return {
+            file_id: (r['name'], tuple(r['parents']), r.get('md5Checksum'), r['modifiedTime'])
+            for file_id, r in resources.items()
+        }
+
+    def _record_changes(self):
+        """Append a change for everything added, modified or removed since the last rescan"""
+        resources = self.resources()
+        versions = self._versions(resources)
+        now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+        for file_id, version in versions.items():
+            if self._snapshot.get(file_id) != version:
+                self._changes.append({'kind': 'drive#change', 'changeType': 'file', 'time': now,
+                                      'fileId': file_id, 'removed': False, 'file': resources[file_id]})
+        for file_id in self._snapshot.keys() - versions.keys():
+            self._changes.append({'kind': 'drive#change', 'changeType': 'file', 'time': now,
+                                  'fileId': file_id, 'removed': True})
+        self._snapshot = versions
+
+    def start_page_token(self) -> str:
+        with self._changes_lock:
+            self._record_changes()
+            return str(len(self._changes))
+
+    def changes(self, page_token: str, page_size: int) -> Dict:
+        with self._changes_lock:
+            self._record_changes()
+            offset = int(page_token)
+            page = self._changes[offset:offset + page_size]
+            result = {'changes': page}
+            if offset + page_size < len(self._changes):
+                result['nextPageToken'] = str(offset + page_size)
+            else:
+                result['newStartPageToken'] = str(len(self._changes))
+            return result
+
+    def list(self, query: str, page_size: int, page_token: Optional[str]) -> Dict:
+        matching = [r for r in self.resources().values() if matches_query(r, query)]
+        offset = int(page_token or 0)
+        page = matching[offset:offset + page_size]
+        result = {'files': page}
+        if offset + page_size < len(matching):
+            result['nextPageToken'] = str(offset + page_size)
+        return result
+
+
+class FakeDriveHandler(BaseHTTPRequestHandler):
+    drive: FakeDrive = None
+    max_page_size = MAX_PAGE_SIZE
+    drop_after = 0                  # cut each file's first download off after this many bytes
+    _dropped = set()
+    request_count = 0
+    _count_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _public(self, resource: Dict) -> Dict:
+        return {k: v for k, v in resource.items() if not k.startswith('_')}
+
+    def do_GET(self):
+        with self._count_lock:
+            FakeDriveHandler.request_count += 1
+
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if url.path == '/drive/v3/files':
+            page_size = min(int(params.get('pageSize', 100)), self.max_page_size)
+            try:
+                result = self.drive.list(params.get('q', ''), page_size, params.get('pageToken'))
+            except ValueError as e:
+                return self._send_json(400, {'error': {'code': 400, 'message': str(e)}})
+            result['files'] = [project_fields(self._public(r), params.get('fields')) for r in result['files']]
+            return self._send_json(200, result)
+
+        if url.path == '/drive/v3/changes/startPageToken':
+            return self._send_json(200, {'kind': 'drive#startPageToken',
+                                         'startPageToken': self.drive.start_page_token()})
+
+        if url.path == '/drive/v3/changes':
+            if 'pageToken' not in params:
+                return self._send_json(400, {'error': {'code': 400, 'message': 'pageToken is required'}})
+            page_size = min(int(params.get('pageSize', 100)), self.max_page_size)
+            result = self.drive.changes(params['pageToken'], page_size)
+            result['changes'] = [
+                {**change, 'file': self._public(change['file'])} if 'file' in change else change
+                for change in result['changes']
+            ]
+            return self._send_json(200, result)
+
+        match = re.fullmatch(r'/drive/v3/files/([\w-]+)', url.path)
+        if match:
+            resource = self.drive.resources().get(match.group(1))
+            if not resource:
+                return self._send_json(404, {'error': {'code': 404, 'message': 'File not found'}})
+            if params.get('alt') == 'media':
+                return self._send_media(resource['_path'], resource['id'])
+            return self._send_json(200, self._public(resource))
+
+        match = re.fullmatch(r'/drive/v3/files/([\w-]+)/export', url.path)
+        if match:
+            resource = self.drive.resources().get(match.group(1))
+            if not resource:
+                return self._send_json(404, {'error': {'code': 404, 'message': 'File not found'}})
+            return self._send_media(resource['_path'], resource['id'])
+
+        self._send_json(404, {'error': {'code': 404, 'message': 'Not found'}})
+
+    def _send_media(self, path: Path, file_id: str):
+        data = path.read_bytes()
+        start = 0
+
+        match = re.fullmatch(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        if match:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else len(data) - 1
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{len(data)}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{end}/{len(data)}")
+            data = data[start:end + 1]
+        else:
+            self.send_response(200)
+
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+
+        with self._count_lock:
+            drop = self.drop_after and start == 0 and file_id not in self._dropped and len(data) > self.drop_after
+            if drop:
+                self._dropped.add(file_id)
+        if drop:
+            # Simulate a connection lost part-way through the transfer
+            self.wfile.write(data[:self.drop_after])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(data)
+
+
+def serve(root: str, host: str = '127.0.0.1', port: int = 8089, drive_id: str = DEFAULT_DRIVE_ID,
+          max_page_size: int = MAX_PAGE_SIZE, drop_after: int = 0) -> ThreadingHTTPServer:
+    """Create a fake Drive server (call serve_forever, or run it in a thread)"""
+    handler = type('Handler', (FakeDriveHandler,), {'drive': FakeDrive(Path(root), drive_id),
+                                                    'max_page_size': max_page_size,
+                                                    'drop_after': drop_after, '_dropped': set()})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Serve a directory as a fake Google Drive')
+    parser.add_argument('--root', type=str, required=True, help='Directory standing in for the shared drive')
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--drive-id', type=str, default=DEFAULT_DRIVE_ID)
+    parser.add_argument('--max-page-size', type=int, default=MAX_PAGE_SIZE,
+                        help='Cap on pageSize, to exercise pagination')
+    parser.add_argument('--drop-after', type=int, default=0,
+                        help="Cut off each file's first download after this many bytes, to exercise resume")
+    args = parser.parse_args()
+
+    server = serve(args.root, args.host, args.port, args.drive_id, args.max_page_size, args.drop_after)
+    print(f"Fake Drive serving {args.root} on http://{args.host}:{args.port}")
+    server.serve_forever()
@@ -4,15 +4,27 @@ Commission Statement Bank Reconciliation & Reporting
 Matches commission statement totals against bank deposits and emails report
 """
 
-import pdfplumber
 import csv
 import re
 from pathlib import Path
 from collections import defaultdict
 from datetime import datetime
 import logging
-import requests
+import sys
 import json
+from contextlib import nullcontext
+from typing import Optional
+
+from lazy_imports import lazy_import
+from log_config import DEFAULT_FORMAT, DEFAULT_LEVEL, add_logging_arguments
+from log_config import configure_logging as setup_logging
+from memory_guard import MEMORY, add_memory_arguments
+from metrics import METRICS
+from profiling import RunProfiler, add_profile_arguments
+
+# Heavy dependencies load on first use (see lazy_imports.py)
+pdfplumber = lazy_import('pdfplumber')
+requests = lazy_import('requests')
 
 # Configuration
 PDF_DIR = "/home/sam/commission_automator/data/mbh"
@@ -45,22 +57,79 @@ CARRIER_MAPPING = {
 }
 
 
+def parse_bank_deposits(bank_statement_path: Path) -> dict:
+    """
+    Parse electronic deposits from a US Bank statement PDF
+
+    Returns:
+        dict: {bank_carrier_name: [amounts]}
+    """
+    deposits = defaultdict(list)
+
+    name = Path(bank_statement_path).name
+    with METRICS.span('bank_parse', file=name, carrier='US Bank'), MEMORY.document(name):
+        with METRICS.span('pdf_open'):
+            pdf = pdfplumber.open(bank_statement_path)
+        with pdf:
+            for page in pdf.pages:
+                with METRICS.span('extract_text'):
+                    text = page.extract_text()
+                METRICS.count('pages')
+                MEMORY.page_done(page)
+                lines = text.split('\n')
+
+                for line in lines:
+                    if 'Electronic Deposit From' in line:
+                        # Extract carrier name and amount
+                        match = re.search(r'Electronic Deposit From (.+?)\s+([\d,]+\.\d+)', line)
+                        if match:
+                            carrier = match.group(1).strip()
+                            amount = float(match.group(2).replace(',', ''))
+                            deposits[carrier].append(amount)
+
+        METRICS.count('bank_deposits', sum(len(amounts) for amounts in deposits.values()))
+    return deposits
+
+
+def bank_totals_by_carrier(deposits: dict) -> dict:
+    """Sum bank deposits by commission carrier name, using CARRIER_MAPPING where possible"""
+    bank_totals = defaultdict(float)
+    for bank_name, amounts in deposits.items():
+        # Keep unmapped deposits with original bank name
+        bank_totals[CARRIER_MAPPING.get(bank_name, bank_name)] += sum(amounts)
+    return bank_totals
+
+
+def reconcile_carrier(carrier: str, commission_total: float, bank_total: float) -> dict:
+    """Build the reconciliation record for one carrier"""
+    variance = bank_total - commission_total
+
+    status = "MATCHED" if abs(variance) < 0.01 else "VARIANCE"
+
+    if commission_total == 0:
+        status = "BANK ONLY"
+    elif bank_total == 0:
+        status = "COMMISSION ONLY"
+
+    return {
+        'carrier': carrier,
+        'commission_total': f"{commission_total:.2f}",
+        'bank_total': f"{bank_total:.2f}",
+        'variance': f"{variance:.2f}",
+        'status': status
+    }
+
+
 class ReportGenerator:
     """Generates bank reconciliation report and emails results"""
 
-    def __init__(self):
-        # Setup logging
-        log_file = Path(LOG_DIR) / f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-        Path(LOG_DIR).mkdir(parents=True, exist_ok=True)
-
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file),
-                logging.StreamHandler()
-            ]
-        )
+    def __init__(self, configure_logging: bool = True, log_level: str = DEFAULT_LEVEL,
+                 log_format: str = DEFAULT_FORMAT, profiler: Optional[RunProfiler] = None):
+        # Setup logging (skipped when embedded in another process that owns logging)
+        if configure_logging:
+            suffix = 'jsonl' if log_format == 'json' else 'log'
+            log_file = Path(LOG_DIR) / f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{suffix}"
+            setup_logging(log_file, log_level, log_format)
         self.logger = logging.getLogger(__name__)
 
         self.commission_data = []
@@ -69,11 +138,15 @@ class ReportGenerator:
         self.needs_review = []
         self.reconciliation = []
 
-    def load_commission_data(self):
-        """Load commission output CSV"""
-        self.logger.info(f"Loading commission data from {COMMISSION_CSV}")
+        # --profile: the bank statement gets its own profile
+        self.profiler = profiler
+
+    def load_commission_data(self, path: Optional[Path] = None):
+        """Load commission output CSV (the month's, unless another path is given)"""
+        path = path or COMMISSION_CSV
+        self.logger.info(f"Loading commission data from {path}")
 
-        with open(COMMISSION_CSV, 'r') as f:
+        with open(path, 'r') as f:
             reader = csv.DictReader(f)
             self.commission_data = list(reader)
 
@@ -116,21 +189,8 @@ class ReportGenerator:
         """
         self.logger.info(f"Extracting bank deposits from {bank_statement_path.name}")
 
-        deposits = defaultdict(list)
-
-        with pdfplumber.open(bank_statement_path) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text()
-                lines = text.split('\n')
-
-                for line in lines:
-                    if 'Electronic Deposit From' in line:
-                        # Extract carrier name and amount
-                        match = re.search(r'Electronic Deposit From (.+?)\s+([\d,]+\.\d+)', line)
-                        if match:
-                            carrier = match.group(1).strip()
-                            amount = float(match.group(2).replace(',', ''))
-                            deposits[carrier].append(amount)
+        with self.profiler.document(bank_statement_path.name) if self.profiler else nullcontext():
+            deposits = parse_bank_deposits(bank_statement_path)
 
         # Log extracted deposits
         total_deposits = sum(sum(amounts) for amounts in deposits.values())
@@ -163,16 +223,7 @@ class ReportGenerator:
             commission_totals[carrier] += commission
 
         # Sum bank deposits by normalized carrier name
-        bank_totals = defaultdict(float)
-        for bank_name, amounts in self.bank_deposits.items():
-            # Map bank name to commission carrier name if possible
-            commission_carrier = CARRIER_MAPPING.get(bank_name)
-
-            if commission_carrier:
-                bank_totals[commission_carrier] += sum(amounts)
-            else:
-                # Keep unmapped deposits with original bank name
-                bank_totals[bank_name] += sum(amounts)
+        bank_totals = bank_totals_by_carrier(self.bank_deposits)
 
         # Create reconciliation records
         all_carriers = set(commission_totals.keys()) | set(bank_totals.keys())
@@ -182,20 +233,9 @@ class ReportGenerator:
             bank_total = bank_totals.get(carrier, 0.0)
             variance = bank_total - commission_total
 
-            status = "MATCHED" if abs(variance) < 0.01 else "VARIANCE"
-
-            if commission_total == 0:
-                status = "BANK ONLY"
-            elif bank_total == 0:
-                status = "COMMISSION ONLY"
-
-            self.reconciliation.append({
-                'carrier': carrier,
-                'commission_total': f"{commission_total:.2f}",
-                'bank_total': f"{bank_total:.2f}",
-                'variance': f"{variance:.2f}",
-                'status': status
-            })
+            record = reconcile_carrier(carrier, commission_total, bank_total)
+            status = record['status']
+            self.reconciliation.append(record)
 
             # Log variances and unmatched items
             if status == "VARIANCE":
@@ -207,13 +247,14 @@ class ReportGenerator:
 
         self.logger.info(f"Reconciliation complete: {len(self.reconciliation)} carriers")
 
-    def save_reconciliation_csv(self):
-        """Save reconciliation results to CSV"""
-        self.logger.info(f"Saving reconciliation to {RECONCILIATION_CSV}")
+    def save_reconciliation_csv(self, path: Optional[Path] = None):
+        """Save reconciliation results to CSV (the month's, unless another path is given)"""
+        path = path or RECONCILIATION_CSV
+        self.logger.info(f"Saving reconciliation to {path}")
 
-        Path(OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
 
-        with open(RECONCILIATION_CSV, 'w', newline='') as f:
+        with open(path, 'w', newline='') as f:
             fieldnames = ['carrier', 'commission_total', 'bank_total', 'variance', 'status']
             writer = csv.DictWriter(f, fieldnames=fieldnames)
             writer.writeheader()
@@ -531,8 +572,10 @@ class ReportGenerator:
         }
 
         try:
-            response = requests.post(RESEND_API_URL, json=payload, headers=headers)
+            with METRICS.span('email_send'):
+                response = requests.post(RESEND_API_URL, json=payload, headers=headers)
             response.raise_for_status()
+            METRICS.count('emails_sent')
 
             result = response.json()
             self.logger.info(f"Email sent successfully! ID: {result.get('id')}")
@@ -551,6 +594,8 @@ class ReportGenerator:
             bank_statement_path: Path to US Bank statement PDF
         """
         self.logger.info("=== Commission Reconciliation Report Started ===")
+        METRICS.reset()
+        MEMORY.reset()
 
         try:
             # Load all data
@@ -562,25 +607,34 @@ class ReportGenerator:
             self.extract_bank_deposits(Path(bank_statement_path))
 
             # Reconcile
-            self.reconcile_commissions()
+            with METRICS.span('reconciliation'):
+                self.reconcile_commissions()
 
             # Save reconciliation CSV
-            self.save_reconciliation_csv()
+            with METRICS.span('write_outputs'):
+                self.save_reconciliation_csv()
 
             # Generate HTML report
-            html_report = self.generate_html_report()
+            with METRICS.span('render_report'):
+                html_report = self.generate_html_report()
 
             # Send email
             self.send_email_report(html_report)
 
+            MEMORY.log_summary(self.logger)
             self.logger.info("=== Commission Reconciliation Report Completed Successfully ===")
 
         except Exception as e:
             self.logger.error(f"Report generation failed: {e}", exc_info=True)
             raise
+        finally:
+            # Written for failed runs too - a slow or failing email send shows up here
+            output_dir = COMMISSION_CSV.parent
+            json_path, prom_path = METRICS.write(output_dir, 'report', month=output_dir.name)
+            self.logger.info(f"Saved metrics to {json_path} and {prom_path}")
 
 
-def main():
+def main(argv=None):
     """Main entry point"""
     import argparse
 
@@ -588,14 +642,18 @@ def main():
     parser = argparse.ArgumentParser(description='Generate commission reconciliation report')
     parser.add_argument('--month', type=str, help='Month to process in YYYY-MM format (e.g., 2025-08)',
                        default=datetime.now().strftime('%Y-%m'))
-    args = parser.parse_args()
+    add_logging_arguments(parser)
+    add_profile_arguments(parser)
+    add_memory_arguments(parser)
+    args = parser.parse_args(argv)
+    MEMORY.configure(args.memory_ceiling, args.low_memory, args.trace_memory)
 
     # Validate month format
     try:
         datetime.strptime(args.month, '%Y-%m')
     except ValueError:
         print(f"ERROR: Invalid month format '{args.month}'. Use YYYY-MM (e.g., 2025-08)")
-        exit(1)
+        sys.exit(1)
 
     # Update paths for the specified month
     global COMMISSION_CSV, STATE_SUMMARY_CSV, NEEDS_REVIEW_CSV, RECONCILIATION_CSV
@@ -615,7 +673,7 @@ def main():
     if not bank_statement_dir.exists():
         print(f"ERROR: Bank statement directory not found: {bank_statement_dir}")
         print(f"Please create the directory and add bank statement PDF for {args.month}")
-        exit(1)
+        sys.exit(1)
 
     # Look for bank statement file
     bank_statement = None
@@ -626,13 +684,13 @@ def main():
     if not bank_statement:
         print(f"ERROR: No bank statement PDF found in {bank_statement_dir}")
         print("Please add the US Bank statement PDF to this directory")
-        exit(1)
+        sys.exit(1)
 
     # Verify commission data exists
     if not COMMISSION_CSV.exists():
         print(f"ERROR: Commission data not found: {COMMISSION_CSV}")
         print(f"Please run extract_commissions.py --month {args.month} first")
-        exit(1)
+        sys.exit(1)
 
     print(f"Generating reconciliation report for {args.month}")
     print(f"Commission data: {COMMISSION_CSV}")
@@ -640,8 +698,16 @@ def main():
     print()
 
     # Generate and send report
-    generator = ReportGenerator()
-    generator.run(str(bank_statement))
+    profiler = RunProfiler('report', args.profile_dir) if args.profile else None
+    generator = ReportGenerator(log_level=args.log_level, log_format=args.log_format, profiler=profiler)
+    if not profiler:
+        generator.run(str(bank_statement))
+        return
+    profiler.start()
+    try:
+        generator.run(str(bank_statement))
+    finally:
+        profiler.finish(generator.logger)
 
 
 if __name__ == "__main__":
@@ -6,6 +6,7 @@ Reads commission_output.csv and generates state-level subtotals
 
 import csv
 import os
+import sys
 from pathlib import Path
 from datetime import datetime
 from collections import defaultdict
@@ -89,21 +90,22 @@ def generate_state_summary(input_csv: str, output_csv: str):
     return True
 
 
-if __name__ == "__main__":
+def main(argv=None):
+    """Command line entry point"""
     import argparse
 
     # Parse command line arguments
     parser = argparse.ArgumentParser(description='Generate state summary report')
     parser.add_argument('--month', type=str, help='Month to process in YYYY-MM format (e.g., 2025-08)',
                        default=datetime.now().strftime('%Y-%m'))
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     # Validate month format
     try:
         datetime.strptime(args.month, '%Y-%m')
     except ValueError:
         print(f"ERROR: Invalid month format '{args.month}'. Use YYYY-MM (e.g., 2025-08)")
-        exit(1)
+        sys.exit(1)
 
     # Configuration with month-based paths
     BASE_OUTPUT_DIR = "/home/sam/chatbot-platform/mbh/commission-automator/output"
@@ -124,4 +126,8 @@ if __name__ == "__main__":
         print("\n✓ State summary generation completed successfully!")
     else:
         print("\n✗ State summary generation failed")
-        exit(1)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Golden Output Check
+Runs every extraction mode over the same statements and checks they all write
+the same outputs as the reference (sequential) run.
+
+Each mode runs in its own process and writes commission_output.csv,
+state_summary.csv and, when there is a bank statement, reconciliation.csv. Each
+file is compared row by row against the reference run. Amounts are compared to
+the cent, and every other cell must match exactly. Extraction times are shown
+side by side. The check exits non-zero if any mode fails or differs.
+
+Modes:
+    sequential   CommissionExtractor.run(), the reference
+    parallel     extraction workers as used by pipeline.py, results added in path order
+    cached       refresh() from the reference run's extraction_state.json (no PDF is opened)
+    low_memory   run() with every page released after use (memory_guard.py)
+
+New engines go in MODES. Without --pdf-dir the corpus is synthetic: one
+statement per layout, plus a US Bank statement (see synthetic_statements.py).
+With --golden DIR, the reference outputs are also compared against a copy
+saved earlier with --update-golden, which catches changes to the reference
+path itself.
+
+Usage:
+    python golden_outputs.py                                    # synthetic corpus, all modes
+    python golden_outputs.py --pages 40 --mode parallel
+    python golden_outputs.py --pdf-dir ~/commission_automator/data/mbh/2025-08/commission_statements \\
+        --master-csv "~/commission_automator/data/mbh/master_data/mbh master contacts list.csv" \\
+        --bank-statement ~/commission_automator/data/mbh/2025-08/bank_statement/statement.pdf
+"""
+
+import csv
+import io
+import json
+import logging
+import multiprocessing
+import re
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from typing import Dict, List, Optional
+
+OUTPUT_FILES = ['commission_output.csv', 'state_summary.csv', 'reconciliation.csv']
+REFERENCE_MODE = 'sequential'
+TIMING_FILE = 'timing.json'
+DEFAULT_PAGES = 5
+PARALLEL_WORKERS = 4
+MAX_DIFFERENCES = 10        # shown per file
+
+_AMOUNT = re.compile(r'-?\$?-?[\d,]*\.?\d+%?')
+
+
+def _extractor(pdf_dir: str, master_csv: str, out_dir: Path):
+    from extract_commissions import CommissionExtractor
+    # No API key: the Claude fallback is neither free nor deterministic
+    return CommissionExtractor(pdf_dir, master_csv, str(out_dir), str(out_dir / 'logs'), configure_logging=False)
+
+
+def _sequential(pdf_dir: str, master_csv: str, out_dir: Path, reference_dir: Path):
+    _extractor(pdf_dir, master_csv, out_dir).run()
+
+
+def _parallel(pdf_dir: str, master_csv: str, out_dir: Path, reference_dir: Path):
+    from pipeline import _extract_in_worker, _init_worker
+
+    extractor = _extractor(pdf_dir, master_csv, out_dir)
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=PARALLEL_WORKERS, mp_context=context, initializer=_init_worker,
+                             initargs=(pdf_dir, master_csv, str(out_dir), str(out_dir / 'logs'), None,
+                                       'WARNING', 'text')) as pool:
+        futures = [(path, pool.submit(_extract_in_worker, str(path))) for path in extractor._unique_pdf_files()]
+        for path, future in futures:
+            entries, review, _, _ = future.result()
+            extractor.add_file_results(entries, review, pdf_path=path)
+    extractor.save_results()
+
+
+def _cached(pdf_dir: str, master_csv: str, out_dir: Path, reference_dir: Path):
+    from extract_commissions import EXTRACTION_STATE_FILE
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    shutil.copy(reference_dir / EXTRACTION_STATE_FILE, out_dir / EXTRACTION_STATE_FILE)
+    counts = _extractor(pdf_dir, master_csv, out_dir).refresh()
+    if counts['extracted']:
+        raise RuntimeError(f"{counts['extracted']} statements were re-extracted instead of read from the cache")
+
+
+def _low_memory(pdf_dir: str, master_csv: str, out_dir: Path, reference_dir: Path):
+    from memory_guard import MEMORY
+
+    MEMORY.configure(low_memory=True)
+    _extractor(pdf_dir, master_csv, out_dir).run()
+
+
+MODES = {
+    'sequential': _sequential,
+    'parallel': _parallel,
+    'cached': _cached,
+    'low_memory': _low_memory,
+}
+
+
+def write_derived_outputs(out_dir: Path, bank_statement: Optional[str]):
+    """state_summary.csv and reconciliation.csv from a mode's commission_output.csv"""
+    from generate_report import ReportGenerator
+    from generate_state_summary import generate_state_summary
+
+    with redirect_stdout(io.StringIO()):
+        generate_state_summary(str(out_dir / 'commission_output.csv'), str(out_dir / 'state_summary.csv'))
+    if bank_statement:
+        report = ReportGenerator(configure_logging=False)
+        report.load_commission_data(out_dir / 'commission_output.csv')
+        report.extract_bank_deposits(Path(bank_statement))
+        report.reconcile_commissions()
+        report.save_reconciliation_csv(out_dir / 'reconciliation.csv')
+
+
+def _run_mode(mode: str, pdf_dir: str, master_csv: str, bank_statement: Optional[str], out_dir: str,
+              reference_dir: str):
+    """Runs in a fresh process, so no mode inherits another's caches or memory"""
+    logging.disable(logging.WARNING)
+    out_dir = Path(out_dir)
+    started = time.perf_counter()
+    MODES[mode](pdf_dir, master_csv, out_dir, Path(reference_dir))
+    extraction = time.perf_counter() - started
+    write_derived_outputs(out_dir, bank_statement)
+    (out_dir / TIMING_FILE).write_text(json.dumps({
+        'extraction_seconds': extraction,
+        'total_seconds': time.perf_counter() - started,
+    }))
+
+
+def run_mode(mode: str, pdf_dir: str, master_csv: str, bank_statement: Optional[str], out_dir: Path,
+             reference_dir: Path) -> Dict:
+    """Run one mode; returns its timings, or {'error': ...}"""
+    context = multiprocessing.get_context('spawn')
+    process = context.Process(target=_run_mode, args=(mode, pdf_dir, master_csv, bank_statement, str(out_dir),
+                                                      str(reference_dir)))
+    process.start()
+    process.join()
+    timing_path = out_dir / TIMING_FILE
+    if process.exitcode != 0 or not timing_path.exists():
+        return {'error': f"exit code {process.exitcode}"}
+    return json.loads(timing_path.read_text())
+
+
+def _cell_value(cell: str):
+    """Amounts as Decimal cents, anything else as-is"""
+    if _AMOUNT.fullmatch(cell.strip()):
+        try:
+            return Decimal(re.sub(r'[$,%]', '', cell.strip())).quantize(Decimal('0.01'))
+        except InvalidOperation:
+            pass
+    return cell
+
+
+def _read_rows(path: Path) -> List[List[str]]:
+    with open(path, newline='') as f:
+        return list(csv.reader(f))
+
+
+def diff_outputs(reference_dir: Path, candidate_dir: Path, files: List[str]) -> List[str]:
+    """Differences between two runs' output files, to the cent"""
+    differences = []
+    for name in files:
+        reference_path, candidate_path = reference_dir / name, candidate_dir / name
+        if not reference_path.exists() and not candidate_path.exists():
+            continue
+        if not candidate_path.exists() or not reference_path.exists():
+            missing = candidate_path if not candidate_path.exists() else reference_path
+            differences.append(f"{name}: missing from {missing.parent}")
+            continue
+
+        reference, candidate = _read_rows(reference_path), _read_rows(candidate_path)
+        header = reference[0] if reference else []
+        found = []
+        if len(reference) != len(candidate):
+            found.append(f"{name}: {len(candidate)} rows, expected {len(reference)}")
+        for number, (expected_row, row) in enumerate(zip(reference, candidate), start=1):
+            if len(expected_row) != len(row):
+                found.append(f"{name} row {number}: {row} != {expected_row}")
+                continue
+            for column, (expected, actual) in enumerate(zip(expected_row, row)):
+                if _cell_value(expected) != _cell_value(actual):
+                    label = header[column] if column < len(header) else column
+                    found.append(f"{name} row {number} {label}: {actual!r} != {expected!r}")
+        differences.extend(found[:MAX_DIFFERENCES])
+        if len(found) > MAX_DIFFERENCES:
+            differences.append(f"{name}: ... {len(found) - MAX_DIFFERENCES} more differences")
+    return differences
+
+
+def synthetic_corpus(work_dir: Path, pages: int, seed: int) -> Dict[str, Optional[str]]:
+    """One statement per layout, a matching master contacts list and a bank statement"""
+    from synthetic_statements import STATEMENT_LAYOUTS, generate, write_master_contacts
+
+    pdf_dir = work_dir / 'commission_statements'
+    statements = [generate(layout, pdf_dir, pages, seed=seed + n) for n, layout in enumerate(STATEMENT_LAYOUTS)]
+    master_csv = work_dir / 'master contacts.csv'
+    write_master_contacts(master_csv, statements)
+    bank = generate('us_bank', work_dir / 'bank_statement', pages, seed=seed)
+    return {'pdf_dir': str(pdf_dir), 'master_csv': str(master_csv), 'bank_statement': str(bank.path)}
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Check every extraction mode writes the same outputs')
+    parser.add_argument('--mode', choices=[mode for mode in MODES if mode != REFERENCE_MODE], action='append',
+                        help='Mode to check against the reference (repeatable; default: all)')
+    parser.add_argument('--pdf-dir', type=str, help='Statements to use (default: a synthetic corpus)')
+    parser.add_argument('--master-csv', type=str, help='Master contacts CSV for --pdf-dir')
+    parser.add_argument('--bank-statement', type=str, help='US Bank statement PDF, for reconciliation.csv')
+    parser.add_argument('--pages', type=int, default=DEFAULT_PAGES, help='Pages per synthetic statement')
+    parser.add_argument('--seed', type=int, default=1, help='Synthetic corpus seed')
+    parser.add_argument('--golden', type=str, help='Also compare the reference outputs with those saved here')
+    parser.add_argument('--update-golden', action='store_true', help='Save the reference outputs to --golden')
+    parser.add_argument('--keep', action='store_true', help="Keep every mode's outputs and print where they are")
+    args = parser.parse_args(argv)
+
+    if args.pdf_dir and not args.master_csv:
+        print("ERROR: --pdf-dir needs --master-csv")
+        sys.exit(1)
+    if args.update_golden and not args.golden:
+        print("ERROR: --update-golden needs --golden")
+        sys.exit(1)
+
+    work_dir = Path(tempfile.mkdtemp(prefix='golden_outputs_'))
+    try:
+        if args.pdf_dir:
+            corpus = {'pdf_dir': args.pdf_dir, 'master_csv': args.master_csv, 'bank_statement': args.bank_statement}
+        else:
+            corpus = synthetic_corpus(work_dir / 'corpus', args.pages, args.seed)
+        files = OUTPUT_FILES if corpus['bank_statement'] else OUTPUT_FILES[:2]
+
+        reference_dir = work_dir / REFERENCE_MODE
+        results = {REFERENCE_MODE: run_mode(REFERENCE_MODE, corpus['pdf_dir'], corpus['master_csv'],
+                                            corpus['bank_statement'], reference_dir, reference_dir)}
+        differences = {}
+        if 'error' in results[REFERENCE_MODE]:
+            print(f"ERROR: the reference run failed ({results[REFERENCE_MODE]['error']})")
+            sys.exit(1)
+
+        if args.golden:
+            golden_dir = Path(args.golden)
+            if args.update_golden:
+                golden_dir.mkdir(parents=True, exist_ok=True)
+                for name in files:
+                    shutil.copy(reference_dir / name, golden_dir / name)
+                print(f"✓ Saved golden outputs to {golden_dir}")
+            elif golden_dir.exists():
+                differences[REFERENCE_MODE] = diff_outputs(golden_dir, reference_dir, files)
+            else:
+                print(f"No golden outputs at {golden_dir}; run with --update-golden to save them")
+
+        for mode in args.mode or [mode for mode in MODES if mode != REFERENCE_MODE]:
+            results[mode] = run_mode(mode, corpus['pdf_dir'], corpus['master_csv'], corpus['bank_statement'],
+                                     work_dir / mode, reference_dir)
+            if 'error' not in results[mode]:
+                differences[mode] = diff_outputs(reference_dir, work_dir / mode, files)
+
+        reference_seconds = results[REFERENCE_MODE]['extraction_seconds']
+        print(f"{'Mode':<14} {'Extraction':>11} {'Speedup':>8} {'Total':>9}  Result")
+        print("-" * 60)
+        for mode, result in results.items():
+            if 'error' in result:
+                print(f"{mode:<14} {'':>11} {'':>8} {'':>9}  FAIL {result['error']}")
+                continue
+            status = 'reference' if mode == REFERENCE_MODE else 'same'
+            if differences.get(mode):
+                status = f"FAIL {len(differences[mode])} difference(s)"
+            elif mode == REFERENCE_MODE and args.golden and not args.update_golden and REFERENCE_MODE in differences:
+                status = 'reference, matches golden'
+            print(f"{mode:<14} {result['extraction_seconds']:>10.2f}s "
+                  f"{reference_seconds / max(result['extraction_seconds'], 1e-9):>7.2f}x "
+                  f"{result['total_seconds']:>8.2f}s  {status}")
+        print("-" * 60)
+
+        for mode, found in differences.items():
+            against = 'golden outputs' if mode == REFERENCE_MODE else REFERENCE_MODE
+            for difference in found:
+                print(f"  {mode} vs {against}: {difference}")
+
+        failed = [mode for mode, result in results.items() if 'error' in result or differences.get(mode)]
+        if args.keep:
+            print(f"Outputs kept in {work_dir}")
+        if failed:
+            print(f"✗ {len(failed)} mode(s) failed or differ from the reference: {', '.join(failed)}")
+            sys.exit(1)
+        print(f"✓ {len(results) - 1} mode(s) match the reference across {', '.join(files)}")
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
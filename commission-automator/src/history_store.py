@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Commission History Store
+Every month's commission_output.csv in one indexed SQLite database, for
+cross-month questions that would otherwise mean opening every month's CSV.
+
+output/history.sqlite sits next to the month folders. Extraction runs and the
+interactive review's final write call record_month(), which replaces that
+month's rows with the CSV it just wrote, so the store always matches the files.
+Amounts are stored in integer cents. Group names are also stored normalised
+(case, punctuation and LLC/INC-style suffixes removed), so the same group
+matches across carriers and months.
+
+The rollups table holds totals by state and carrier for every month, quarter
+and year. Reloading a month applies only the difference from its previous rows
+to that month, its quarter and its year. Period reports read at most one row
+per state and carrier, however long the history is.
+
+Usage:
+    python history_store.py import                      # backfill every output/<YYYY-MM>/
+    python history_store.py months
+    python history_store.py group "Timber Consulting"   # per-month totals, prefix match
+    python history_store.py carriers --month 2025-08    # change vs the month before, drops first
+    python history_store.py carrier Beam
+    python history_store.py state WA
+    python history_store.py period 2025-Q3 --by state  # also YYYY and YYYY-MM
+    python history_store.py sql "SELECT ..."            # read-only
+"""
+
+import csv
+import os
+import re
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BASE_OUTPUT_DIR = "/home/sam/chatbot-platform/mbh/commission-automator/output"
+HISTORY_DB_NAME = 'history.sqlite'
+COMMISSION_CSV_NAME = 'commission_output.csv'
+
+_MONTH = re.compile(r'\d{4}-\d{2}')
+_SUFFIXES = {'LLC', 'INC', 'CO', 'CORP', 'CORPORATION', 'COMPANY', 'LTD', 'LP', 'LLP', 'PLLC', 'PC', 'PA'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS months (
+    month TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    source_size INTEGER NOT NULL,
+    source_mtime_ns INTEGER NOT NULL,
+    entries INTEGER NOT NULL,
+    total_cents INTEGER NOT NULL,
+    loaded_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS commissions (
+    id INTEGER PRIMARY KEY,
+    month TEXT NOT NULL,
+    carrier TEXT NOT NULL,
+    group_name TEXT NOT NULL,
+    group_key TEXT NOT NULL,
+    state TEXT NOT NULL,
+    commission_cents INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_commissions_month ON commissions (month);
+CREATE INDEX IF NOT EXISTS idx_commissions_carrier ON commissions (carrier, month, commission_cents);
+CREATE INDEX IF NOT EXISTS idx_commissions_group ON commissions (group_key, month);
+CREATE INDEX IF NOT EXISTS idx_commissions_state ON commissions (state, month, commission_cents);
+CREATE TABLE IF NOT EXISTS rollups (
+    period TEXT NOT NULL,
+    period_type TEXT NOT NULL,
+    state TEXT NOT NULL,
+    carrier TEXT NOT NULL,
+    entries INTEGER NOT NULL,
+    commission_cents INTEGER NOT NULL,
+    PRIMARY KEY (period, state, carrier)
+) WITHOUT ROWID;
+"""
+# Bumped when a table is added that existing databases must be backfilled into
+SCHEMA_VERSION = 2
+_PERIOD = re.compile(r'(\d{4})(?:-(\d{2})|-Q([1-4]))?')
+
+
+def normalise_group(name: str) -> str:
+    """'The Timber Consulting Group, LLC' -> 'TIMBER CONSULTING GROUP'"""
+    words = re.sub(r'[^A-Z0-9 ]+', ' ', name.upper().replace('&', ' AND ')).split()
+    if words and words[0] == 'THE':
+        words = words[1:]
+    while len(words) > 1 and words[-1] in _SUFFIXES:
+        words.pop()
+    return ' '.join(words)
+
+
+def is_month(name: str) -> bool:
+    return bool(_MONTH.fullmatch(name))
+
+
+def periods(month: str) -> List[tuple]:
+    """'2025-08' -> [('2025-08', 'month'), ('2025-Q3', 'quarter'), ('2025', 'year')]"""
+    year, number = month.split('-')
+    return [(month, 'month'), (f"{year}-Q{(int(number) - 1) // 3 + 1}", 'quarter'), (year, 'year')]
+
+
+def _cents(amount: str) -> int:
+    return int(round(float(amount.replace(',', '').replace('$', '')) * 100))
+
+
+class HistoryStore:
+    """SQLite database of commission entries across months"""
+
+    def __init__(self, db_path: str, read_only: bool = False):
+        self.db_path = Path(db_path)
+        if read_only:
+            self.conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        else:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(self.db_path, timeout=30)
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.executescript(SCHEMA)
+        self.conn.row_factory = sqlite3.Row
+        if not read_only and self.conn.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+            # Databases from before the rollups table
+            self.rebuild_rollups()
+            self.conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def close(self):
+        self.conn.close()
+
+    @contextmanager
+    def _write(self):
+        """A transaction that holds the write lock from its first statement, reads included"""
+        # sqlite3 would only begin at the first INSERT/DELETE, after the old rollups were read; two processes
+        # recording the same month could then both apply their delta against the same old rows
+        with self.conn:
+            self.conn.execute('BEGIN IMMEDIATE')
+            yield
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def up_to_date(self, month: str, csv_path: Path) -> bool:
+        stat = csv_path.stat()
+        row = self.conn.execute('SELECT source_size, source_mtime_ns FROM months WHERE month = ?', (month,)).fetchone()
+        return row is not None and (row['source_size'], row['source_mtime_ns']) == (stat.st_size, stat.st_mtime_ns)
+
+    def load_month(self, month: str, csv_path: Path) -> int:
+        """Replace a month's entries with those in its commission_output.csv; returns the entry count"""
+        csv_path = Path(csv_path)
+        stat = csv_path.stat()
+        with open(csv_path, newline='') as f:
+            rows = [
+                (month, row['carrier'], row['group_name'], normalise_group(row['group_name']),
+                 (row.get('state') or '').strip(), _cents(row['commission']))
+                for row in csv.DictReader(f)
+            ]
+
+        with self._write():
+            self._apply_rollup_delta(month, rows)
+            self.conn.execute('DELETE FROM commissions WHERE month = ?', (month,))
+            self.conn.executemany(
+                'INSERT INTO commissions (month, carrier, group_name, group_key, state, commission_cents) '
+                'VALUES (?, ?, ?, ?, ?, ?)', rows)
+            self.conn.execute(
+                'INSERT OR REPLACE INTO months VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (month, str(csv_path), stat.st_size, stat.st_mtime_ns, len(rows), sum(row[-1] for row in rows),
+                 datetime.now().isoformat(timespec='seconds')))
+        return len(rows)
+
+    def _apply_rollup_delta(self, month: str, rows: List[tuple]):
+        """Move the month's, quarter's and year's rollups from the month's old rows to its new ones"""
+        delta: Dict[tuple, List[int]] = {}
+        for row in self.conn.execute('SELECT state, carrier, entries, commission_cents FROM rollups WHERE period = ?',
+                                     (month,)):
+            delta[(row['state'], row['carrier'])] = [-row['entries'], -row['commission_cents']]
+        for _, carrier, _, _, state, cents in rows:
+            change = delta.setdefault((state, carrier), [0, 0])
+            change[0] += 1
+            change[1] += cents
+
+        changes = [(period, period_type, state, carrier, entries, cents)
+                   for (state, carrier), (entries, cents) in delta.items() if entries or cents
+                   for period, period_type in periods(month)]
+        self.conn.executemany(
+            'INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (period, state, carrier) DO UPDATE SET '
+            'entries = entries + excluded.entries, commission_cents = commission_cents + excluded.commission_cents',
+            changes)
+        self.conn.executemany('DELETE FROM rollups WHERE period = ? AND state = ? AND carrier = ? AND entries = 0',
+                              [change[0:1] + change[2:4] for change in changes])
+
+    def rebuild_rollups(self):
+        """Recompute every rollup from the commissions table"""
+        with self._write():
+            self.conn.execute('DELETE FROM rollups')
+            for month_row in self.query('SELECT month FROM months'):
+                month = month_row['month']
+                for period, period_type in periods(month):
+                    self.conn.execute(
+                        'INSERT INTO rollups SELECT ?, ?, state, carrier, COUNT(*), SUM(commission_cents) '
+                        'FROM commissions WHERE month = ? GROUP BY state, carrier '
+                        'ON CONFLICT (period, state, carrier) DO UPDATE SET entries = entries + excluded.entries, '
+                        'commission_cents = commission_cents + excluded.commission_cents', (period, period_type, month))
+
+    def verify_rollups(self) -> List[Dict]:
+        """Rollup rows that differ from a full recompute (empty when they are consistent)"""
+        expected: Dict[tuple, List[int]] = {}
+        for row in self.conn.execute('SELECT month, state, carrier, COUNT(*) AS entries, SUM(commission_cents) AS cents '
+                                     'FROM commissions GROUP BY month, state, carrier'):
+            for period, _ in periods(row['month']):
+                totals = expected.setdefault((period, row['state'], row['carrier']), [0, 0])
+                totals[0] += row['entries']
+                totals[1] += row['cents']
+        actual = {(row['period'], row['state'], row['carrier']): [row['entries'], row['commission_cents']]
+                  for row in self.conn.execute('SELECT * FROM rollups')}
+        return [{'period': key[0], 'state': key[1], 'carrier': key[2], 'rollup': actual.get(key),
+                 'expected': expected.get(key)}
+                for key in sorted(set(expected) | set(actual)) if expected.get(key) != actual.get(key)]
+
+    def period_totals(self, period: str, by: str = 'state') -> List[Dict]:
+        """Totals for a month (YYYY-MM), quarter (YYYY-Qn) or year (YYYY), read from the rollups"""
+        columns = {'state': ['state'], 'carrier': ['carrier'], 'both': ['state', 'carrier']}[by]
+        select = ', '.join("CASE state WHEN '' THEN 'NO STATE' ELSE state END AS state" if column == 'state'
+                           else column for column in columns)
+        rows = self.query(f'SELECT {select}, SUM(entries) AS entries, SUM(commission_cents) AS cents '
+                          f'FROM rollups WHERE period = ? GROUP BY {", ".join(columns)}', (period,))
+        grand_total = sum(row['cents'] for row in rows)
+        for row in rows:
+            row['total'] = row.pop('cents') / 100
+            row['percent'] = round(row['total'] * 100 / (grand_total / 100), 2) if grand_total else 0.0
+        return sorted(rows, key=lambda row: -row['total'])
+
+    def import_all(self, base_output_dir: str, force: bool = False) -> Dict[str, int]:
+        """Load every output/<YYYY-MM>/commission_output.csv that changed since it was last loaded"""
+        loaded = {}
+        for month_dir in sorted(Path(base_output_dir).iterdir()):
+            csv_path = month_dir / COMMISSION_CSV_NAME
+            if is_month(month_dir.name) and csv_path.exists():
+                if force or not self.up_to_date(month_dir.name, csv_path):
+                    loaded[month_dir.name] = self.load_month(month_dir.name, csv_path)
+        return loaded
+
+    def query(self, sql: str, params=()) -> List[Dict]:
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def months(self) -> List[Dict]:
+        return self.query('SELECT month, entries, total_cents / 100.0 AS total, loaded_at FROM months ORDER BY month')
+
+    def group_history(self, name: str, carrier: Optional[str] = None) -> List[Dict]:
+        """Per-month totals for groups whose normalised name starts with `name`"""
+        key = normalise_group(name)
+        sql = ('SELECT month, carrier, group_name, state, COUNT(*) AS entries, SUM(commission_cents) / 100.0 AS total '
+               'FROM commissions WHERE group_key >= ? AND group_key < ?')
+        params = [key, key + '\uffff']
+        if carrier:
+            sql += ' AND carrier = ?'
+            params.append(carrier)
+        return self.query(sql + ' GROUP BY month, carrier, group_key ORDER BY group_key, carrier, month', params)
+
+    def carrier_history(self, carrier: str) -> List[Dict]:
+        return self.query('SELECT month, COUNT(*) AS entries, SUM(commission_cents) / 100.0 AS total '
+                          'FROM commissions WHERE carrier = ? GROUP BY month ORDER BY month', (carrier,))
+
+    def state_history(self, state: str) -> List[Dict]:
+        return self.query('SELECT month, COUNT(*) AS entries, SUM(commission_cents) / 100.0 AS total '
+                          'FROM commissions WHERE state = ? GROUP BY month ORDER BY month', (state.upper(),))
+
+    def carrier_changes(self, month: Optional[str] = None) -> List[Dict]:
+        """Each carrier's total against the previous loaded month, biggest drop first"""
+        months = [row['month'] for row in self.query('SELECT month FROM months ORDER BY month')]
+        month = month or (months[-1] if months else None)
+        if month not in months:
+            return []
+        previous = months[months.index(month) - 1] if months.index(month) else None
+
+        totals = {}
+        for row in self.query('SELECT month, carrier, SUM(commission_cents) AS cents FROM commissions '
+                              'WHERE month IN (?, ?) GROUP BY month, carrier', (month, previous or month)):
+            totals.setdefault(row['carrier'], {})[row['month']] = row['cents']
+        changes = []
+        for carrier, by_month in totals.items():
+            current, before = by_month.get(month, 0), by_month.get(previous, 0) if previous else 0
+            changes.append({
+                'carrier': carrier, 'previous_month': previous, 'previous': before / 100,
+                'month': month, 'total': current / 100, 'change': (current - before) / 100,
+                'change_pct': round((current - before) / before * 100, 1) if before else None,
+            })
+        return sorted(changes, key=lambda change: (change['change'], change['carrier']))
+
+
+def history_db_path(output_dir: Path) -> Path:
+    """output/<month>/ -> output/history.sqlite ($COMMISSION_HISTORY_DB overrides)"""
+    return Path(os.getenv('COMMISSION_HISTORY_DB') or Path(output_dir).parent / HISTORY_DB_NAME)
+
+
+def record_month(output_dir: Path) -> Optional[Path]:
+    """Mirror a month folder's commission_output.csv into the history store; None if it isn't a month folder"""
+    output_dir = Path(output_dir)
+    csv_path = output_dir / COMMISSION_CSV_NAME
+    if not is_month(output_dir.name) or not csv_path.exists():
+        return None
+    db_path = history_db_path(output_dir)
+    with HistoryStore(db_path) as store:
+        store.load_month(output_dir.name, csv_path)
+    return db_path
+
+
+def _print_rows(rows: List[Dict], as_json: bool):
+    if as_json:
+        import json
+        print(json.dumps(rows, indent=2))
+        return
+    if not rows:
+        print("No rows")
+        return
+    columns = list(rows[0])
+    cells = [[('' if row[c] is None else f"{row[c]:,.2f}" if isinstance(row[c], float) else str(row[c]))
+              for c in columns] for row in rows]
+    widths = [max(len(column), *(len(line[i]) for line in cells)) for i, column in enumerate(columns)]
+    print('  '.join(column.ljust(width) for column, width in zip(columns, widths)))
+    print('  '.join('-' * width for width in widths))
+    for line in cells:
+        print('  '.join(cell.rjust(width) if cell[:1].isdigit() or cell[:1] == '-' else cell.ljust(width)
+                        for cell, width in zip(line, widths)))
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Query commission history across months')
+    parser.add_argument('--db', type=str,
+                        default=os.getenv('COMMISSION_HISTORY_DB') or str(Path(BASE_OUTPUT_DIR) / HISTORY_DB_NAME),
+                        help='History database (default: $COMMISSION_HISTORY_DB or output/history.sqlite)')
+    parser.add_argument('--json', action='store_true', help='Print rows as JSON')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    load = commands.add_parser('import', help='Load every month folder that changed since it was last loaded')
+    load.add_argument('--output-dir', type=str, default=BASE_OUTPUT_DIR, help='Folder holding the month folders')
+    load.add_argument('--force', action='store_true', help='Reload every month')
+    commands.add_parser('months', help='Months in the store')
+    group = commands.add_parser('group', help='Per-month totals for a group (prefix of the normalised name)')
+    group.add_argument('name')
+    group.add_argument('--carrier', type=str, help='Only this carrier')
+    carrier = commands.add_parser('carrier', help="Per-month totals for a carrier")
+    carrier.add_argument('name')
+    changes = commands.add_parser('carriers', help="Each carrier's change from the previous month, drops first")
+    changes.add_argument('--month', type=str, help='Month to compare (default: latest)')
+    state = commands.add_parser('state', help='Per-month totals for a state')
+    state.add_argument('state')
+    period = commands.add_parser('period', help='Totals for a month, quarter or year, from the rollups')
+    period.add_argument('period', help='YYYY-MM, YYYY-Qn or YYYY')
+    period.add_argument('--by', choices=['state', 'carrier', 'both'], default='state')
+    rollups = commands.add_parser('rollups', help='Check the rollups against a full recompute')
+    rollups.add_argument('--rebuild', action='store_true', help='Recompute them from scratch')
+    sql = commands.add_parser('sql', help='Run a read-only SQL query')
+    sql.add_argument('query')
+    args = parser.parse_args(argv)
+
+    if args.command == 'period' and not _PERIOD.fullmatch(args.period):
+        print(f"ERROR: Invalid period '{args.period}'. Use YYYY-MM, YYYY-Qn or YYYY (e.g., 2025-Q3)")
+        sys.exit(1)
+
+    if args.command != 'import' and not Path(args.db).exists():
+        print(f"ERROR: History database not found: {args.db}")
+        print("Run 'history_store.py import' to build it from the month folders")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    # Opening for writing also adds tables missing from databases made by older versions
+    with HistoryStore(args.db, read_only=args.command not in ('import', 'rollups')) as store:
+        try:
+            if args.command == 'import':
+                loaded = store.import_all(args.output_dir, force=args.force)
+                for month, entries in loaded.items():
+                    print(f"  {month}: {entries} entries")
+                print(f"✓ Loaded {len(loaded)} month(s) into {args.db}")
+                return
+            if args.command == 'rollups':
+                if args.rebuild:
+                    store.rebuild_rollups()
+                    print("✓ Rebuilt rollups")
+                mismatches = store.verify_rollups()
+                if mismatches:
+                    _print_rows(mismatches, args.json)
+                    print(f"✗ {len(mismatches)} rollup row(s) differ from the commissions table; run with --rebuild")
+                    sys.exit(1)
+                print("✓ Rollups match the commissions table")
+                return
+            rows = {
+                'months': lambda: store.months(),
+                'group': lambda: store.group_history(args.name, args.carrier),
+                'carrier': lambda: store.carrier_history(args.name),
+                'carriers': lambda: store.carrier_changes(args.month),
+                'state': lambda: store.state_history(args.state),
+                'period': lambda: store.period_totals(args.period, args.by),
+                'sql': lambda: store.query(args.query),
+            }[args.command]()
+        except sqlite3.Error as e:
+            print(f"ERROR: {e}")
+            if 'no such table' in str(e):
+                print("The database predates this table; run 'history_store.py import' to add it")
+            sys.exit(1)
+    _print_rows(rows, args.json)
+    if not args.json:
+        print(f"\n{len(rows)} row(s) in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
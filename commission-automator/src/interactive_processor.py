@@ -6,12 +6,24 @@ Processes commissions with real-time user review for fuzzy matches
 
 import json
 import asyncio
+import sqlite3
 from pathlib import Path
 from typing import Dict, List, Optional
 import logging
-from dataclasses import dataclass
+import uuid
+from dataclasses import dataclass, asdict
 from datetime import datetime
 
+from draft_report import DraftReport
+from generate_report import parse_bank_deposits
+from history_store import record_month
+from processing_service import ProcessingService, get_service
+from session_store import SessionCheckpoint, SessionStore
+from statement_triage import StatementTriage
+
+BASE_DATA_DIR = "/home/sam/commission_automator/data/mbh"
+BASE_OUTPUT_DIR = "/home/sam/chatbot-platform/mbh/commission-automator/output"
+
 @dataclass
 class ReviewItem:
     """Item requiring user review"""
@@ -26,33 +38,157 @@ class ReviewItem:
 class InteractiveProcessor:
     """Process commissions with user review pause points"""
 
-    def __init__(self, month: str, websocket=None):
+    def __init__(self, month: str, websocket=None, session_id: Optional[str] = None,
+                 session_store: Optional[SessionStore] = None, service: Optional[ProcessingService] = None):
         self.month = month
         self.websocket = websocket
+        self.session_id = session_id or uuid.uuid4().hex
+        self.session_store = session_store or SessionStore()
+        self.checkpoint = None
+        self.draft = None
         self.review_queue = []
         self.corrections = {}
-        self.learning_db = self._load_learning_db()
 
-    def _load_learning_db(self) -> Dict:
-        """Load previous user corrections for learning"""
-        db_path = Path.home() / '.commission_learning.json'
-        if db_path.exists():
-            with open(db_path) as f:
-                return json.load(f)
-        return {}
+        # Master contacts, learned corrections and extraction results are shared
+        # with every other session in this process
+        self.service = service or get_service()
+        self.learning_db = self.service.learning
 
     def _save_learning(self, original: str, corrected_state: str):
         """Save user corrections for future use"""
-        self.learning_db[original] = corrected_state
-        db_path = Path.home() / '.commission_learning.json'
-        with open(db_path, 'w') as f:
-            json.dump(self.learning_db, f, indent=2)
+        self.learning_db.remember(original, corrected_state)
+
+    def _load_checkpoint(self, pdf_files: List[Path]) -> SessionCheckpoint:
+        """Resume a saved session for this month, or start a fresh checkpoint"""
+        checkpoint = self.session_store.load(self.session_id)
+        if checkpoint and checkpoint.month == self.month:
+            return checkpoint
+
+        return SessionCheckpoint(
+            session_id=self.session_id,
+            month=self.month,
+            files=[str(pdf) for pdf in pdf_files]
+        )
+
+    def _save_checkpoint(self, phase: Optional[str] = None):
+        """Persist current progress"""
+        if phase:
+            self.checkpoint.phase = phase
+        self.session_store.save(self.checkpoint)
 
     async def process_with_review(self, pdf_files: List[Path]):
         """Process PDFs with pause for user review"""
+        self.checkpoint = self._load_checkpoint(pdf_files)
+        checkpoint = self.checkpoint
+
+        if checkpoint.phase == 'complete':
+            await self._send_status(
+                "Session already complete",
+                phase="complete",
+                progress=100,
+                session_id=self.session_id,
+                report_path=checkpoint.report_path
+            )
+            return Path(checkpoint.report_path)
+
+        # Parse the bank statement alongside extraction so the draft can reconcile immediately
+        bank_task = asyncio.create_task(self._load_bank_deposits())
+
+        if checkpoint.phase != 'extraction':
+            await self._send_status(
+                f"Resuming session at review item {checkpoint.review_position + 1} of {len(checkpoint.review_queue)}",
+                phase="resumed",
+                session_id=self.session_id,
+                reviewed=checkpoint.review_position,
+                needs_review=len(checkpoint.review_queue)
+            )
+        else:
+            await self._extract_and_match(pdf_files)
+
+        high_confidence = checkpoint.high_confidence
+        needs_review = [ReviewItem(**item) for item in checkpoint.review_queue]
+
+        await self._build_draft(needs_review, await bank_task)
+
+        # Phase 3: Interactive review
+        if needs_review:
+            reviewed = await self._interactive_review(needs_review)
+            all_entries = high_confidence + reviewed
+        else:
+            all_entries = high_confidence
+
+        # Phase 4: Generate report
+        self._save_checkpoint('report')
+        await self._send_status("Generating final report...", phase="report", progress=90)
+
+        report_path = await self._generate_report(all_entries)
+
+        checkpoint.report_path = str(report_path)
+        self._save_checkpoint('complete')
+
+        await self._send_status(
+            "Processing complete!",
+            phase="complete",
+            progress=100,
+            report_path=str(report_path)
+        )
+
+        return report_path
+
+    async def _load_bank_deposits(self) -> Dict:
+        """Parse this month's bank statement, if one has been uploaded"""
+        bank_dir = Path(BASE_DATA_DIR) / self.month / 'bank_statement'
+        bank_statements = sorted(bank_dir.glob('*.pdf')) if bank_dir.exists() else []
+        if not bank_statements:
+            return {}
 
-        # Phase 1: Initial extraction
-        await self._send_status("Extracting commission data...", phase="extraction", progress=0)
+        try:
+            return await asyncio.to_thread(parse_bank_deposits, bank_statements[0])
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Could not parse bank statement {bank_statements[0].name}: {e}")
+            return {}
+
+    async def _build_draft(self, review_items: List[ReviewItem], bank_deposits: Dict):
+        """Aggregate and reconcile everything already confirmed, then render a draft report"""
+        checkpoint = self.checkpoint
+        self.draft = DraftReport(bank_deposits)
+
+        for entry in checkpoint.high_confidence + checkpoint.reviewed:
+            self.draft.add_entry(entry)
+        for item in review_items[checkpoint.review_position:]:
+            self.draft.add_pending(item.commission)
+
+        draft_dir = Path(BASE_OUTPUT_DIR) / self.month / 'draft'
+        draft_path = await asyncio.to_thread(self.draft.write, draft_dir)
+
+        await self._send_status(
+            "Draft report ready",
+            phase="draft",
+            draft_path=str(draft_path),
+            grand_total=round(self.draft.grand_total, 2),
+            pending=round(self.draft.pending, 2),
+            state_summary=self.draft.state_summary(),
+            reconciliation=self.draft.reconciliation_rows()
+        )
+
+    async def _send_draft_update(self, entry: Dict):
+        """Apply a reviewed entry to the draft totals and push the change to the client"""
+        delta = self.draft.add_entry(entry, was_pending=True)
+        await self._send_status("Draft updated", phase="draft_update", **delta)
+
+    async def _extract_and_match(self, pdf_files: List[Path]):
+        """Run extraction and state matching, checkpointing the review queue"""
+        checkpoint = self.checkpoint
+
+        # Phase 1: Initial extraction (announced before triage, which hashes every statement first)
+        await self._send_status("Extracting commission data...", phase="extraction", progress=0,
+                                session_id=self.session_id)
+
+        # The same statement uploaded twice would have its commissions counted twice
+        duplicates = await asyncio.to_thread(lambda: StatementTriage().triage(pdf_files).duplicates)
+        for copy, kept in duplicates.items():
+            logging.getLogger(__name__).warning(f"Skipping duplicate statement {copy.name} (same content as {kept.name})")
+        pdf_files = [pdf for pdf in dict.fromkeys(pdf_files) if pdf not in duplicates]
 
         all_entries = []
         for i, pdf in enumerate(pdf_files):
@@ -68,6 +204,8 @@ class InteractiveProcessor:
                 total=len(pdf_files)
             )
 
+        checkpoint.entries = all_entries
+
         # Phase 2: State matching with review queue
         await self._send_status("Matching states...", phase="matching", progress=0)
 
@@ -103,6 +241,12 @@ class InteractiveProcessor:
                 )
                 needs_review.append(review_item)
 
+        checkpoint.high_confidence = high_confidence
+        checkpoint.review_queue = [asdict(item) for item in needs_review]
+        checkpoint.reviewed = []
+        checkpoint.review_position = 0
+        self._save_checkpoint('review')
+
         await self._send_status(
             f"Found {len(high_confidence)} auto-matches, {len(needs_review)} need review",
             phase="review_needed",
@@ -110,32 +254,14 @@ class InteractiveProcessor:
             needs_review=len(needs_review)
         )
 
-        # Phase 3: Interactive review
-        if needs_review:
-            reviewed = await self._interactive_review(needs_review)
-            all_entries = high_confidence + reviewed
-        else:
-            all_entries = high_confidence
-
-        # Phase 4: Generate report
-        await self._send_status("Generating final report...", phase="report", progress=90)
-
-        report_path = await self._generate_report(all_entries)
-
-        await self._send_status(
-            "Processing complete!",
-            phase="complete",
-            progress=100,
-            report_path=str(report_path)
-        )
-
-        return report_path
-
     async def _interactive_review(self, items: List[ReviewItem]) -> List[Dict]:
-        """Handle interactive review with user"""
-        reviewed_entries = []
+        """Handle interactive review with user, continuing from the checkpointed position"""
+        checkpoint = self.checkpoint
+        reviewed_entries = checkpoint.reviewed
+
+        for i in range(checkpoint.review_position, len(items)):
+            item = items[i]
 
-        for i, item in enumerate(items):
             # Send review request to frontend
             await self._send_review_request(item, i, len(items))
 
@@ -152,14 +278,20 @@ class InteractiveProcessor:
             else:  # auto-approve all
                 # Process remaining items with best matches
                 for remaining in items[i:]:
-                    reviewed_entries.append({
+                    entry = {
                         'carrier': remaining.carrier,
                         'group_name': remaining.group_name,
                         'commission': remaining.commission,
                         'state': remaining.best_match['state'],
                         'confidence': remaining.confidence,
                         'user_verified': False
-                    })
+                    }
+                    reviewed_entries.append(entry)
+                checkpoint.review_position = len(items)
+                self._save_checkpoint()
+                for entry in reviewed_entries[-(len(items) - i):]:
+                    await self._send_draft_update(entry)
+                await self._send_status(f"Reviewed {len(items)} of {len(items)}", phase="reviewing", progress=100)
                 break
 
             # Save learning if requested
@@ -167,14 +299,19 @@ class InteractiveProcessor:
                 self._save_learning(item.group_name, state)
 
             # Add to reviewed entries
-            reviewed_entries.append({
+            entry = {
                 'carrier': item.carrier,
                 'group_name': item.group_name,
                 'commission': item.commission,
                 'state': state,
                 'confidence': 100,  # User verified
                 'user_verified': True
-            })
+            }
+            reviewed_entries.append(entry)
+            checkpoint.review_position = i + 1
+            self._save_checkpoint()
+
+            await self._send_draft_update(entry)
 
             # Update progress
             progress = (i + 1) / len(items) * 100
@@ -231,40 +368,45 @@ class InteractiveProcessor:
 
     async def _extract_pdf(self, pdf_path: Path) -> List[Dict]:
         """Extract commission data from PDF"""
-        # This would call your existing extraction logic
-        # For now, return mock data
-        await asyncio.sleep(0.1)  # Simulate processing
-        return []
+        # Run in a worker thread so other sessions keep getting messages
+        return await asyncio.to_thread(self.service.extract, pdf_path)
 
     def _fuzzy_match_state(self, group_name: str) -> Dict:
         """Fuzzy match to find state"""
-        # This would call your existing fuzzy matching
-        # For now, return mock data
-        return {
-            'state': 'CA',
-            'confidence': 75,
-            'matched_name': 'Similar Company Inc'
-        }
+        return self.service.match_state(group_name)
 
     def _get_alternatives(self, group_name: str) -> List[Dict]:
         """Get alternative state matches"""
         # Return top 3 alternatives
-        return [
-            {'state': 'WA', 'confidence': 65, 'name': 'Other Match'},
-            {'state': 'OR', 'confidence': 60, 'name': 'Another Match'}
-        ]
+        return self.service.alternatives(group_name, limit=3)
 
     async def _generate_report(self, entries: List[Dict]) -> Path:
-        """Generate final report with all corrections"""
-        # Your existing report generation
-        report_path = Path(f"report_{self.month}.csv")
+        """Write the final report - the draft already holds every confirmed entry"""
+        # Auto-approved entries were never looked at, so they stay on the review list
+        needs_review = [
+            {**entry, 'match_confidence': entry['confidence']}
+            for entry in entries if entry.get('user_verified') is False
+        ]
+        output_dir = Path(BASE_OUTPUT_DIR) / self.month
+        report_path = await asyncio.to_thread(self.draft.write, output_dir, needs_review)
+        try:
+            # The reviewed commission_output.csv replaces the extraction's in the history store
+            await asyncio.to_thread(record_month, output_dir)
+        except (sqlite3.Error, OSError) as e:
+            logging.getLogger(__name__).warning(f"Could not update the history store for {self.month}: {e}")
         return report_path
 
 
 # WebSocket handler for real-time communication
-async def handle_processing(websocket, month: str, files: List[str]):
-    """Handle WebSocket connection for processing"""
-    processor = InteractiveProcessor(month, websocket)
+async def handle_processing(websocket, month: str, files: List[str], session_id: Optional[str] = None,
+                            service: Optional[ProcessingService] = None):
+    """
+    Handle WebSocket connection for processing
+
+    Pass the session_id from an earlier connection to resume where it left off.
+    """
+    processor = InteractiveProcessor(month, websocket, session_id=session_id, service=service)
+    processor.service.sessions[processor.session_id] = processor
     pdf_files = [Path(f) for f in files]
 
     try:
@@ -278,6 +420,8 @@ async def handle_processing(websocket, month: str, files: List[str]):
             'type': 'error',
             'message': str(e)
         }))
+    finally:
+        processor.service.sessions.pop(processor.session_id, None)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Processing Job Queue
+Bounded scheduler for pipeline runs submitted by the upload portal.
+
+- A fixed number of runs execute at once
+- Only one run per month at a time (they share output/<month>)
+- Identical submissions for the same month and inputs share one run
+- Interactive review work is picked before background backfills
+"""
+
+import hashlib
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Lower runs first
+PRIORITIES = {
+    'interactive': 0,
+    'normal': 5,
+    'backfill': 10,
+}
+
+logger = logging.getLogger(__name__)
+
+
+def month_inputs_fingerprint(month_dir: Path) -> str:
+    """Fingerprint a month's input files by path, size and modification time"""
+    digest = hashlib.sha256()
+    month_dir = Path(month_dir)
+    if month_dir.exists():
+        for path in sorted(p for p in month_dir.rglob('*') if p.is_file()):
+            stat = path.stat()
+            digest.update(f"{path.relative_to(month_dir)}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+@dataclass
+class Job:
+    """One queued pipeline run"""
+    id: int
+    month: str
+    script: str
+    args: List[str]
+    priority: int
+    fingerprint: str = ''
+    status: str = 'pending'            # pending -> running -> done | failed
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict] = None
+    error: Optional[BaseException] = None
+    submissions: int = 1               # how many requests were coalesced into this job
+    _done: threading.Event = field(default_factory=threading.Event, repr=False)
+    _callbacks: List[Callable] = field(default_factory=list, repr=False)
+
+    @property
+    def key(self) -> Tuple:
+        return (self.month, self.script, tuple(self.args), self.fingerprint)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+
+class JobQueue:
+    """Runs jobs on a bounded pool of scheduler threads"""
+
+    def __init__(self, runner: Callable[[Job], Dict], workers: int = 2, history: int = 200):
+        self.runner = runner
+        self.workers = max(1, workers)
+
+        self._cond = threading.Condition()
+        self._pending = []
+        self._running = {}                  # month -> job
+        self._by_key = {}                   # coalescing key -> pending/running job
+        self._ids = itertools.count(1)
+        self._shutdown = False
+
+        self._wait_times = deque(maxlen=history)
+        self._run_times = deque(maxlen=history)
+        self.completed = 0
+        self.failed = 0
+        self.coalesced = 0
+
+        self._threads = [
+            threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, month: str, script: str, args: Optional[List[str]] = None,
+               priority: str = 'normal', fingerprint: str = '',
+               on_done: Optional[Callable[[Job], None]] = None) -> Job:
+        """
+        Queue a run, or join an identical one that is already queued or running
+
+        Args:
+            priority: 'interactive', 'normal' or 'backfill'
+            fingerprint: identifies the month's inputs; runs only coalesce when it matches
+            on_done: called with the job once it finishes
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("Job queue is shut down")
+
+            job = Job(next(self._ids), month, script, list(args or []), PRIORITIES[priority], fingerprint)
+            existing = self._by_key.get(job.key)
+
+            if existing:
+                existing.submissions += 1
+                # An interactive request shouldn't wait behind its backfill twin's place in line
+                existing.priority = min(existing.priority, job.priority)
+                self.coalesced += 1
+                job = existing
+            else:
+                self._pending.append(job)
+                self._by_key[job.key] = job
+
+            if on_done:
+                job._callbacks.append(on_done)
+            self._cond.notify_all()
+            return job
+
+    def _next_job(self) -> Optional[Job]:
+        """Highest priority, oldest pending job whose month isn't already running"""
+        runnable = [job for job in self._pending if job.month not in self._running]
+        if not runnable:
+            return None
+        job = min(runnable, key=lambda j: (j.priority, j.id))
+        self._pending.remove(job)
+        return job
+
+    def _work(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    if self._shutdown:
+                        return
+                    self._cond.wait()
+                    job = self._next_job()
+
+                job.status = 'running'
+                job.started_at = time.time()
+                self._running[job.month] = job
+                self._wait_times.append(job.started_at - job.submitted_at)
+
+            try:
+                job.result = self.runner(job)
+                job.status = 'done'
+            except BaseException as e:
+                job.error = e
+                job.status = 'failed'
+
+            with self._cond:
+                job.finished_at = time.time()
+                self._run_times.append(job.finished_at - job.started_at)
+                del self._running[job.month]
+                self._by_key.pop(job.key, None)
+                if job.status == 'done':
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self._cond.notify_all()
+
+            job._done.set()
+            for callback in job._callbacks:
+                # A failing callback mustn't take the scheduler thread down with it
+                try:
+                    callback(job)
+                except Exception:
+                    logger.exception(f"on_done callback failed for job {job.id} ({job.month})")
+
+    def metrics(self) -> Dict:
+        """Queue depth, concurrency and wait-time statistics"""
+        with self._cond:
+            depth_by_priority = {name: 0 for name in PRIORITIES}
+            names = {value: name for name, value in PRIORITIES.items()}
+            for job in self._pending:
+                depth_by_priority[names.get(job.priority, 'normal')] += 1
+
+            waits = list(self._wait_times)
+            runs = list(self._run_times)
+            oldest = min((job.submitted_at for job in self._pending), default=None)
+
+            return {
+                'workers': self.workers,
+                'queue_depth': len(self._pending),
+                'queue_depth_by_priority': depth_by_priority,
+                'running': len(self._running),
+                'running_months': sorted(self._running),
+                'completed': self.completed,
+                'failed': self.failed,
+                'coalesced': self.coalesced,
+                'oldest_pending_seconds': round(time.time() - oldest, 3) if oldest else 0,
+                'wait_seconds_avg': round(sum(waits) / len(waits), 3) if waits else 0,
+                'wait_seconds_max': round(max(waits), 3) if waits else 0,
+                'run_seconds_avg': round(sum(runs) / len(runs), 3) if runs else 0,
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting jobs; workers exit once the queue drains"""
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
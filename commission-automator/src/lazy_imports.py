@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Lazy Imports
+Defers heavy third-party imports until a module attribute is first used.
+
+pdfplumber, anthropic, fuzzywuzzy and requests together take over a second to
+import. Scripts bind them with lazy_import() at module level so `--help`,
+argument errors and runs that never touch a PDF or the network skip that cost:
+
+    pdfplumber = lazy_import('pdfplumber')     # imported on pdfplumber.open(...)
+
+Processes that want everything warm up front (the portal worker) call
+preload() before importing the scripts.
+"""
+
+import importlib
+import importlib.util
+import sys
+from types import ModuleType
+from typing import Iterable
+
+# Heavy dependencies of the pipeline scripts
+HEAVY_MODULES = ('pdfplumber', 'anthropic', 'fuzzywuzzy.fuzz', 'fuzzywuzzy.process', 'requests')
+
+
+def lazy_import(name: str) -> ModuleType:
+    """A module object that runs the real import on first attribute access"""
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def preload(names: Iterable[str] = HEAVY_MODULES):
+    """Finish importing modules now (including any bound lazily already)"""
+    for name in names:
+        module = importlib.import_module(name)
+        # Touching any attribute completes a pending lazy load
+        getattr(module, '__name__')
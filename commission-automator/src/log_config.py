@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Logging Setup
+Background log writing and structured events for the pipeline scripts.
+
+Log calls only put records on a queue; a listener thread formats them and
+writes the file and console output, so slow disks or terminals don't stall
+extraction. Output is the usual text lines or, with format 'json', one JSON
+object per line.
+
+Hot loops log with log_event(), which does nothing unless the level is
+enabled and only formats the message when a handler writes it:
+
+    log_event(logger, logging.DEBUG, 'state_match',
+              "Matched '{group_name}' -> {state}", group_name=name, state=state)
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from typing import Optional
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_FORMATS = ('text', 'json')
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR')
+
+# Libraries whose debug output would drown ours (pdfminer logs every token it parses)
+QUIET_LOGGERS = ('pdfminer', 'urllib3', 'PIL')
+
+# Defaults for runs that don't pass --log-level / --log-format
+DEFAULT_LEVEL = os.getenv('COMMISSION_LOG_LEVEL', 'INFO')
+DEFAULT_FORMAT = os.getenv('COMMISSION_LOG_FORMAT', 'text')
+
+_listener: Optional[QueueListener] = None
+
+
+class Event:
+    """A log message with named fields, formatted only when written"""
+    __slots__ = ('name', 'template', 'fields')
+
+    def __init__(self, name: str, template: str, fields: dict):
+        self.name = name
+        self.template = template
+        self.fields = fields
+
+    def __str__(self):
+        return self.template.format(**self.fields)
+
+
+def log_event(logger: logging.Logger, level: int, name: str, template: str, **fields):
+    """Log a structured event; free when the level is disabled"""
+    if logger.isEnabledFor(level):
+        logger.log(level, Event(name, template, fields), stacklevel=2)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with event fields at the top level"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if isinstance(record.msg, Event):
+            entry['event'] = record.msg.name
+            entry.update(record.msg.fields)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Queues records as they are; the stock handler formats them on the caller's thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _formatter(fmt: str) -> logging.Formatter:
+    if fmt not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format: {fmt} (expected one of {', '.join(LOG_FORMATS)})")
+    return JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT)
+
+
+def stop_logging():
+    """Write out anything still queued and stop the background writer"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def configure_logging(log_file: Optional[Path] = None, level: str = DEFAULT_LEVEL, fmt: str = DEFAULT_FORMAT,
+                      console: bool = True):
+    """
+    Route the root logger through a queue to a background writer
+
+    Replaces any handlers configured earlier in the process (e.g. by a
+    previous run in the warm worker).
+    """
+    stop_logging()
+
+    handlers = []
+    formatter = _formatter(fmt)
+    if log_file:
+        Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+        handlers.append(logging.FileHandler(log_file))
+    if console:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(_DeferredQueueHandler(records))
+    root.setLevel(level.upper())
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(max(root.level, logging.WARNING))
+
+    global _listener
+    _listener = QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def add_logging_arguments(parser):
+    """--log-level and --log-format for a script's argument parser"""
+    parser.add_argument('--log-level', type=str.upper, choices=LOG_LEVELS, default=DEFAULT_LEVEL.upper(),
+                        help=f'Log level (default: {DEFAULT_LEVEL.upper()}, or $COMMISSION_LOG_LEVEL)')
+    parser.add_argument('--log-format', choices=LOG_FORMATS, default=DEFAULT_FORMAT,
+                        help=f'Log line format (default: {DEFAULT_FORMAT}, or $COMMISSION_LOG_FORMAT)')
+
+
+atexit.register(stop_logging)
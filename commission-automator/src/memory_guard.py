@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Memory Guard
+Per-statement memory accounting, plus a ceiling that switches extraction to a
+low-memory mode before the machine starts swapping.
+
+pdfplumber caches layout objects (chars, words, text maps) on every page it
+reads, and keeps them until the PDF is closed. A multi-hundred-page statement
+can hold several GB this way. RSS is sampled after every page. Once it reaches
+LOW_MEMORY_FRACTION of the ceiling, the rest of the run is page-by-page: each
+page's cached objects are released as soon as its text has been read. This
+mode stays on for the rest of the run, because the process keeps memory it has
+already taken from the OS.
+
+    with MEMORY.document(pdf_path.name):
+        for page in pdf.pages:
+            text = page.extract_text()
+            MEMORY.page_done(page)
+
+Each statement's start, peak and end RSS are logged in the run summary and
+recorded as a metric, so they also reach metrics.json and the Prometheus
+textfile. --trace-memory adds tracemalloc's peak Python allocation per
+statement, but it slows extraction down.
+
+The ceiling defaults to $COMMISSION_MEMORY_CEILING_MB (1024 MB if unset);
+0 turns the guard off.
+"""
+
+import gc
+import logging
+import os
+import resource
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from metrics import METRICS
+
+MEMORY_CEILING_MB = float(os.getenv('COMMISSION_MEMORY_CEILING_MB', '1024'))
+LOW_MEMORY_FRACTION = 0.8
+LARGEST_STATEMENTS = 5
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+logger = logging.getLogger(__name__)
+
+
+def rss_mb() -> float:
+    """Current resident set size; falls back to the peak where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class MemoryGuard:
+    """Memory use of each statement in a run, and the switch to low-memory mode"""
+
+    def __init__(self, ceiling_mb: float = MEMORY_CEILING_MB, low_memory: bool = False, trace: bool = False):
+        self.configure(ceiling_mb, low_memory, trace)
+        self.reset()
+
+    def configure(self, ceiling_mb: float = MEMORY_CEILING_MB, low_memory: bool = False, trace: bool = False):
+        self.ceiling_mb = ceiling_mb
+        self.forced_low_memory = low_memory
+        self.trace = trace
+
+    def reset(self):
+        """Start a new run"""
+        self.low_memory = self.forced_low_memory
+        self.documents: List[Dict] = []
+        self._current: Optional[Dict] = None
+
+    @property
+    def threshold_mb(self) -> Optional[float]:
+        return self.ceiling_mb * LOW_MEMORY_FRACTION if self.ceiling_mb else None
+
+    @contextmanager
+    def document(self, name: str):
+        """Account memory to one statement; yields its usage dict"""
+        if self._current is not None:
+            # Nested (e.g. routing opened the first page, then the carrier extractor the whole PDF)
+            yield self._current
+            return
+
+        if self.trace:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        start = rss_mb()
+        usage = {'file': name, 'pages': 0, 'rss_start_mb': round(start, 1), 'rss_peak_mb': start,
+                 'low_memory': self.low_memory}
+        self._current = usage
+        try:
+            yield usage
+        finally:
+            self._current = None
+            usage['rss_end_mb'] = round(rss_mb(), 1)
+            usage['rss_peak_mb'] = round(max(usage['rss_peak_mb'], usage['rss_end_mb']), 1)
+            if self.trace and tracemalloc.is_tracing():
+                usage['python_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+            self.documents.append(usage)
+            METRICS.peak('statement_peak_rss_mb', usage['rss_peak_mb'])
+            METRICS.peak('statement_rss_growth_mb', round(usage['rss_peak_mb'] - usage['rss_start_mb'], 1))
+
+    def page_done(self, page):
+        """Sample RSS after a page; in low-memory mode, drop the page's cached layout objects"""
+        rss = rss_mb()
+        usage = self._current
+        if usage is not None:
+            usage['pages'] += 1
+            usage['rss_peak_mb'] = max(usage['rss_peak_mb'], rss)
+
+        if not self.low_memory and self.threshold_mb and rss >= self.threshold_mb:
+            self.low_memory = True
+            if usage is not None:
+                usage['low_memory'] = True
+            logger.warning(f"RSS {rss:.0f} MB reached {LOW_MEMORY_FRACTION:.0%} of the {self.ceiling_mb:.0f} MB "
+                           f"memory ceiling{' on ' + usage['file'] if usage else ''}; "
+                           f"switching to low-memory page-by-page extraction")
+            METRICS.count('low_memory_switches')
+            gc.collect()
+
+        if self.low_memory:
+            page.close()
+
+    def log_summary(self, log):
+        """Largest statements by peak RSS, for the end-of-run summary"""
+        if not self.documents:
+            return
+        largest = sorted(self.documents, key=lambda usage: -usage['rss_peak_mb'])[:LARGEST_STATEMENTS]
+        ceiling = f" (ceiling {self.ceiling_mb:.0f} MB)" if self.ceiling_mb else ''
+        log.info(f"Peak RSS: {peak_rss_mb():.0f} MB{ceiling}"
+                 f"{'; low-memory mode was used' if self.low_memory else ''}")
+        for usage in largest:
+            python_peak = f", Python peak {usage['python_peak_mb']:.0f} MB" if 'python_peak_mb' in usage else ''
+            log.info(f"  {usage['file']}: {usage['pages']} pages, RSS {usage['rss_start_mb']:.0f} -> "
+                     f"{usage['rss_peak_mb']:.0f} MB peak{python_peak}"
+                     f"{' (low-memory)' if usage['low_memory'] else ''}")
+
+
+def add_memory_arguments(parser):
+    """--memory-ceiling, --low-memory and --trace-memory for a script's argument parser"""
+    parser.add_argument('--memory-ceiling', type=float, default=MEMORY_CEILING_MB, metavar='MB',
+                        help=f'Switch to low-memory extraction at {LOW_MEMORY_FRACTION * 100:.0f}%% of this RSS; 0 disables '
+                             f'(default: $COMMISSION_MEMORY_CEILING_MB or 1024)')
+    parser.add_argument('--low-memory', action='store_true',
+                        help='Extract page by page from the start, releasing each page after use')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Also report peak Python allocations per statement (tracemalloc; slower)')
+
+
+# Process-wide guard used by the pipeline scripts
+MEMORY = MemoryGuard()
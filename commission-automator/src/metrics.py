@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Pipeline Metrics
+Timing spans and counters for each stage of extraction and reporting.
+
+Stages are timed with nested spans. A span inherits its parent's tags (file,
+carrier), so a page's text extraction is counted against the statement and
+carrier it belongs to. Each span records both total time and self time, which
+excludes nested spans. A carrier extractor's self time is therefore its regex
+parsing, without the PDF open and text extraction under it.
+
+    with METRICS.span('statement', file=pdf_path.name) as tags:
+        ...
+        tags['carrier'] = carrier
+
+At the end of a run, write() adds the run to the month's metrics.json (one
+entry per job) and writes a Prometheus textfile. The textfile goes to
+$COMMISSION_METRICS_TEXTFILE_DIR when that is set (point it at node_exporter's
+textfile collector); otherwise it goes to the output folder.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+METRICS_FILE = 'metrics.json'
+TEXTFILE_DIR = os.getenv('COMMISSION_METRICS_TEXTFILE_DIR')
+SLOWEST_STATEMENTS = 10
+
+# Prometheus series per stage are labelled by carrier only; per-file detail stays in metrics.json
+# except for the statement span, which is how the slow statement is found
+_FILE_SERIES_SPAN = 'statement'
+
+_TagKey = Tuple[Tuple[str, str], ...]
+
+
+def _key(name: str, tags: Dict) -> Tuple[str, _TagKey]:
+    return name, tuple(sorted((k, str(v)) for k, v in tags.items() if v is not None))
+
+
+class Metrics:
+    """Spans and counters for one run of one process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        """Start a new run"""
+        with self._lock:
+            self._spans: Dict[Tuple[str, _TagKey], list] = {}   # -> [count, seconds, self_seconds, max_seconds]
+            self._counters: Dict[Tuple[str, _TagKey], float] = {}
+            self._peaks: Dict[Tuple[str, _TagKey], float] = {}
+            self.started = time.time()
+
+    def _stack(self) -> list:
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def current_tags(self) -> Dict:
+        stack = self._stack()
+        return dict(stack[-1][0]) if stack else {}
+
+    @contextmanager
+    def span(self, name: str, **tags):
+        """Time a stage; yields its tags so they can be added to once known"""
+        stack = self._stack()
+        merged = {**(stack[-1][0] if stack else {}), **tags}
+        frame = [merged, 0.0]           # tags, time spent in nested spans
+        stack.append(frame)
+        started = time.perf_counter()
+        try:
+            yield merged
+        finally:
+            seconds = time.perf_counter() - started
+            stack.pop()
+            if stack:
+                stack[-1][1] += seconds
+            self.record(name, seconds, seconds - frame[1], **merged)
+
+    def record(self, name: str, seconds: float, self_seconds: Optional[float] = None, **tags):
+        """Add a span measured some other way"""
+        key = _key(name, tags)
+        with self._lock:
+            entry = self._spans.setdefault(key, [0, 0.0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] += seconds if self_seconds is None else self_seconds
+            entry[3] = max(entry[3], seconds)
+
+    def count(self, name: str, value: float = 1, **tags):
+        """Add to a counter; tags from the enclosing span are included"""
+        key = _key(name, {**self.current_tags(), **tags})
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def peak(self, name: str, value: float, **tags):
+        """Keep the largest value seen (e.g. a statement's peak RSS); tags from the enclosing span are included"""
+        key = _key(name, {**self.current_tags(), **tags})
+        with self._lock:
+            self._peaks[key] = max(self._peaks.get(key, value), value)
+
+    def snapshot(self) -> Dict:
+        """Everything recorded so far, as JSON-ready lists"""
+        with self._lock:
+            spans = [
+                {'name': name, 'tags': dict(tags), 'count': count, 'seconds': round(seconds, 6),
+                 'self_seconds': round(self_seconds, 6), 'max_seconds': round(max_seconds, 6)}
+                for (name, tags), (count, seconds, self_seconds, max_seconds) in sorted(self._spans.items())
+            ]
+            counters = [{'name': name, 'tags': dict(tags), 'value': value}
+                        for (name, tags), value in sorted(self._counters.items())]
+            peaks = [{'name': name, 'tags': dict(tags), 'value': value}
+                     for (name, tags), value in sorted(self._peaks.items())]
+        return {'spans': spans, 'counters': counters, 'peaks': peaks}
+
+    def merge(self, snapshot: Dict):
+        """Add another process's snapshot (e.g. from an extraction worker)"""
+        with self._lock:
+            for span in snapshot.get('spans', []):
+                entry = self._spans.setdefault(_key(span['name'], span['tags']), [0, 0.0, 0.0, 0.0])
+                entry[0] += span['count']
+                entry[1] += span['seconds']
+                entry[2] += span['self_seconds']
+                entry[3] = max(entry[3], span['max_seconds'])
+            for counter in snapshot.get('counters', []):
+                key = _key(counter['name'], counter['tags'])
+                self._counters[key] = self._counters.get(key, 0) + counter['value']
+            for peak in snapshot.get('peaks', []):
+                key = _key(peak['name'], peak['tags'])
+                self._peaks[key] = max(self._peaks.get(key, peak['value']), peak['value'])
+
+    def drain(self) -> Dict:
+        """Snapshot and clear, keeping the run start time"""
+        snapshot = self.snapshot()
+        with self._lock:
+            self._spans, self._counters, self._peaks = {}, {}, {}
+        return snapshot
+
+    def write(self, output_dir: Path, job: str, **labels) -> Tuple[Path, Path]:
+        """Add this run to output_dir/metrics.json and write its Prometheus textfile"""
+        finished = time.time()
+        run = {
+            'job': job,
+            'labels': labels,
+            'started_at': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+            'finished_at': datetime.fromtimestamp(finished).isoformat(timespec='seconds'),
+            'wall_seconds': round(finished - self.started, 3),
+            **self.snapshot(),
+        }
+        run['stages'] = _stage_totals(run['spans'])
+        run['slowest_statements'] = sorted(
+            ({'file': span['tags'].get('file'), 'carrier': span['tags'].get('carrier'), 'seconds': span['seconds']}
+             for span in run['spans'] if span['name'] == _FILE_SERIES_SPAN),
+            key=lambda statement: -statement['seconds'])[:SLOWEST_STATEMENTS]
+
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        json_path = output_dir / METRICS_FILE
+        runs = {}
+        if json_path.exists():
+            try:
+                with open(json_path) as f:
+                    runs = json.load(f)
+            except ValueError:
+                runs = {}
+        runs[job] = run
+        _write_atomic(json_path, json.dumps(runs, indent=2))
+
+        prom_path = Path(TEXTFILE_DIR or output_dir) / f"commission_{job}.prom"
+        prom_path.parent.mkdir(parents=True, exist_ok=True)
+        _write_atomic(prom_path, prometheus_text(run))
+        return json_path, prom_path
+
+
+def _write_atomic(path: Path, text: str):
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _stage_totals(spans) -> list:
+    """Spans summed across files: one row per stage and carrier"""
+    totals: Dict[Tuple[str, str], list] = {}
+    for span in spans:
+        entry = totals.setdefault((span['name'], span['tags'].get('carrier', '')), [0, 0.0, 0.0])
+        entry[0] += span['count']
+        entry[1] += span['seconds']
+        entry[2] += span['self_seconds']
+    return [{'stage': stage, 'carrier': carrier, 'count': count, 'seconds': round(seconds, 6),
+             'self_seconds': round(self_seconds, 6)}
+            for (stage, carrier), (count, seconds, self_seconds) in sorted(totals.items())]
+
+
+def _labels(labels: Dict) -> str:
+    def escape(value) -> str:
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def prometheus_text(run: Dict) -> str:
+    """Prometheus text exposition of one run"""
+    # 'job' is Prometheus's own scrape label
+    base = {'run': run['job'], **run['labels']}
+    lines = []
+
+    def series(name: str, help_text: str, rows):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(f"{name}{_labels({**base, **labels})} {value}" for labels, value in rows)
+
+    stages = run['stages']
+    series('commission_stage_seconds', 'Wall time spent in a stage during the last run',
+           [({'stage': s['stage'], 'carrier': s['carrier']}, s['seconds']) for s in stages])
+    series('commission_stage_self_seconds', 'Stage time excluding nested stages during the last run',
+           [({'stage': s['stage'], 'carrier': s['carrier']}, s['self_seconds']) for s in stages])
+    series('commission_stage_calls', 'Times a stage ran during the last run',
+           [({'stage': s['stage'], 'carrier': s['carrier']}, s['count']) for s in stages])
+    series('commission_statement_seconds', 'Time to extract each statement in the last run',
+           [({'carrier': span['tags'].get('carrier', ''), 'file': span['tags'].get('file', '')}, span['seconds'])
+            for span in run['spans'] if span['name'] == _FILE_SERIES_SPAN])
+
+    counters: Dict[str, Dict] = {}
+    for counter in run['counters']:
+        tags = {name: value for name, value in counter['tags'].items() if name != 'file'}
+        counters.setdefault(counter['name'], {}).setdefault(tuple(sorted(tags.items())), 0)
+        counters[counter['name']][tuple(sorted(tags.items()))] += counter['value']
+    for name, rows in sorted(counters.items()):
+        series(f"commission_{name}", f"{name.replace('_', ' ').capitalize()} in the last run",
+               [(dict(tags), value) for tags, value in sorted(rows.items())])
+
+    peaks: Dict[str, Dict] = {}
+    for peak in run.get('peaks', []):
+        tags = tuple(sorted((name, value) for name, value in peak['tags'].items() if name != 'file'))
+        rows = peaks.setdefault(peak['name'], {})
+        rows[tags] = max(rows.get(tags, peak['value']), peak['value'])
+    for name, rows in sorted(peaks.items()):
+        series(f"commission_{name}", f"Largest {name.replace('_', ' ')} in the last run",
+               [(dict(tags), value) for tags, value in sorted(rows.items())])
+
+    series('commission_run_seconds', 'Wall time of the last run', [({}, run['wall_seconds'])])
+    series('commission_run_finished_timestamp_seconds', 'When the last run finished',
+           [({}, round(datetime.fromisoformat(run['finished_at']).timestamp()))])
+    return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry used by the pipeline scripts
+METRICS = Metrics()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Pipelined Sync and Extraction
+Starts extracting each commission statement as soon as Drive sync has it on
+disk, so downloading and parsing overlap instead of running back to back.
+
+The sync's download threads hand finished files to a pool of extraction
+processes; unchanged statements already on disk are queued straight away.
+Once the sync is done, statements that are only on disk (portal uploads,
+local copies of files removed from Drive without --prune) are queued too.
+Outputs are the same as running sync_from_drive.sh then extract_commissions.py.
+
+Statements whose size and mtime match the last run's extraction_state.json
+reuse its entries instead of being extracted again, the same as
+extract_commissions.py --if-changed would skip an unchanged month; --full
+re-extracts everything.
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from drive_sync import DEFAULT_WORKERS, DRIVE_API_BASE, SHARED_DRIVE_ID, DriveClient, DriveSync
+from extract_commissions import CommissionExtractor, file_signature
+from lazy_imports import HEAVY_MODULES
+from log_config import DEFAULT_FORMAT, DEFAULT_LEVEL, add_logging_arguments, configure_logging
+from metrics import METRICS
+from statement_triage import StatementTriage, statement_pdfs
+
+BASE_DATA_DIR = "/home/sam/commission_automator/data/mbh"
+BASE_OUTPUT_DIR = "/home/sam/chatbot-platform/mbh/commission-automator/output"
+LOG_DIR = "/home/sam/chatbot-platform/mbh/commission-automator/logs"
+MASTER_CSV_NAME = "mbh master contacts list.csv"
+
+# Extractor owned by each pool process
+_worker_extractor = None
+
+
+def _init_worker(pdf_dir: str, master_csv: str, output_dir: str, log_dir: str, api_key: Optional[str],
+                 log_level: str, log_format: str):
+    global _worker_extractor
+    configure_logging(level=log_level, fmt=log_format)
+    _worker_extractor = CommissionExtractor(pdf_dir, master_csv, output_dir, log_dir,
+                                            claude_api_key=api_key, configure_logging=False)
+
+
+def _extract_in_worker(pdf_path: str):
+    started = time.time()
+    entries, review = _worker_extractor.extract_file(Path(pdf_path))
+    # Stage timings go back with the results; the parent writes metrics for the whole run
+    return entries, review, time.time() - started, METRICS.drain()
+
+
+class StatementPipeline:
+    """Runs a month's Drive sync with extraction workers consuming its output"""
+
+    def __init__(self, month: str, base_dir: str = BASE_DATA_DIR, output_dir: Optional[str] = None,
+                 log_dir: str = LOG_DIR, sync: Optional[DriveSync] = None, extract_workers: Optional[int] = None,
+                 log_level: str = DEFAULT_LEVEL, log_format: str = DEFAULT_FORMAT, full: bool = False):
+        self.month = month
+        self.base_dir = Path(base_dir)
+        self.pdf_dir = self.base_dir / month / 'commission_statements'
+        self.master_csv = self.base_dir / 'master_data' / MASTER_CSV_NAME
+        self.output_dir = Path(output_dir or f"{BASE_OUTPUT_DIR}/{month}")
+        self.log_dir = Path(log_dir)
+        self.sync = sync or DriveSync(DriveClient(), str(self.base_dir))
+        self.extract_workers = extract_workers or os.cpu_count() or 2
+        self.api_key = os.getenv('ANTHROPIC_API_KEY')
+        self.log_level = log_level
+        self.log_format = log_format
+        self.full = full
+
+        self.pool = None
+        self.extractor = None
+        self._waiting = []                  # statements that landed before the master CSV
+        self._futures: Dict[Path, Future] = {}
+        self.triage = StatementTriage(self.pdf_dir)
+        self._by_hash: Dict[str, Path] = {}     # content hash -> statement extracted for it
+        self._previous: Dict[str, tuple] = {}   # last run's (signature, entries, review) per statement
+        self.failed: List[str] = []             # statements whose extraction raised
+        self.pool_broken = False                # a worker died, taking every unfinished statement with it
+
+    def _is_statement(self, path: Path) -> bool:
+        return path.suffix.lower() == '.pdf' and self.pdf_dir in path.parents
+
+    def _on_file(self, path: Path):
+        if path == self.master_csv:
+            self._start_extraction()
+        elif self._is_statement(path):
+            if self.pool is None:
+                self._waiting.append(path)
+            else:
+                self._submit(path)
+
+    def _submit(self, path: Path):
+        # Extract one copy of each statement; if a copy nearer the folder root turns up
+        # later, extract that one instead so results match a sequential run
+        digest = self.triage.hash(path)
+        extracted = self._by_hash.get(digest)
+        if extracted is not None:
+            if self.triage.preferred(extracted, path) == extracted:
+                return
+            self._futures.pop(extracted).cancel()
+        self._by_hash[digest] = path
+
+        saved = self._previous.get(self.extractor._relative(path))
+        if saved is not None and saved[0] == file_signature(path):
+            # Unchanged since the last run
+            future = Future()
+            future.set_result((saved[1], saved[2], 0.0, {}))
+            self._futures[path] = future
+            return
+        self._futures[path] = self.pool.submit(_extract_in_worker, str(path))
+
+    def _submit_local(self):
+        """Queue statements the sync didn't report: local-only uploads and unpruned copies of deleted files"""
+        for path in statement_pdfs(self.pdf_dir):
+            if path not in self._futures:
+                self._submit(path)
+
+    def _start_extraction(self):
+        """Bring up the extraction pool once the master contacts list is on disk"""
+        if self.pool is not None:
+            return
+
+        self.extractor = CommissionExtractor(str(self.pdf_dir), str(self.master_csv), str(self.output_dir),
+                                             str(self.log_dir), claude_api_key=self.api_key,
+                                             log_level=self.log_level, log_format=self.log_format)
+        # load_state() refuses results made with a different master contacts list
+        if not self.full and self.extractor.load_state():
+            self._previous = self.extractor.file_results
+        self.extractor.file_results = {}
+        # Sync threads are already running, so pool processes come from a forkserver
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(list(HEAVY_MODULES) + ['extract_commissions'])
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.extract_workers, mp_context=context, initializer=_init_worker,
+            initargs=(str(self.pdf_dir), str(self.master_csv), str(self.output_dir), str(self.log_dir), self.api_key,
+                      self.log_level, self.log_format))
+
+        for path in self._waiting:
+            self._submit(path)
+        self._waiting = []
+
+    def _collect(self) -> float:
+        """Add every statement's results in path order; returns total extraction seconds"""
+        busy = 0.0
+        for path in sorted(self._futures):
+            try:
+                entries, review, seconds, metrics = self._futures[path].result()
+            except BrokenProcessPool as e:
+                self.pool_broken = True
+                self.failed.append(path.name)
+                self.extractor.logger.error(f"Extraction worker died before finishing {path.name}: {e}")
+                continue
+            except Exception as e:
+                # One statement's error, as extract_commissions.py would skip it
+                self.failed.append(path.name)
+                self.extractor.logger.error(f"Error processing {path.name}: {e}")
+                continue
+            METRICS.merge(metrics)
+            self.extractor.add_file_results(entries, review, pdf_path=path)
+            busy += seconds
+        return busy
+
+    def run(self) -> int:
+        """Sync and extract; returns a process exit code"""
+        started = time.time()
+        METRICS.reset()
+        try:
+            with METRICS.span('drive_sync'):
+                summary = self.sync.sync_month(self.month, on_file=self._on_file)
+            sync_seconds = time.time() - started
+
+            if summary is None:
+                print(f"ERROR: Month folder '{self.month}' not found in shared Drive")
+                return 1
+            print(f"\n✓ Sync: {summary.report()}")
+            if summary.failed:
+                print("ERROR: Some downloads failed; not writing outputs from a partial month")
+                return 1
+
+            # The master CSV wasn't on Drive - fall back to the local copy
+            if self.pool is None:
+                if not self.master_csv.exists():
+                    print(f"ERROR: Master contacts CSV not found: {self.master_csv}")
+                    return 1
+                self._start_extraction()
+
+            self._submit_local()
+            busy = self._collect()
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown(cancel_futures=True)
+
+        if self.pool_broken:
+            print(f"ERROR: An extraction worker died (killed or crashed); {len(self.failed)} statement(s) were not "
+                  f"extracted. Not writing outputs from a partial month")
+            return 1
+
+        # Report the copies that were skipped along with the outputs
+        self.extractor.triage.hashes = self.triage.hashes
+        self.extractor.last_triage = self.triage.triage(self.extractor._pdf_files())
+        self.extractor.save_results()
+        self.extractor.save_state()
+        self.extractor.save_metrics()
+        wall = time.time() - started
+        print(f"✓ Extraction: {len(self._futures)} statements, {len(self.extractor.results)} entries, "
+              f"{len(self.extractor.review_items)} need review"
+              + (f", {len(self.failed)} failed: {', '.join(self.failed)}" if self.failed else ''))
+        print(f"✓ Wall time {wall:.1f}s (sync {sync_seconds:.1f}s, extraction {busy:.1f}s "
+              f"across {self.extract_workers} workers)")
+        return 0
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    import argparse
+    from datetime import datetime
+
+    parser = argparse.ArgumentParser(description='Sync a month from Google Drive, extracting statements as they arrive')
+    parser.add_argument('--month', type=str, default=datetime.now().strftime('%Y-%m'),
+                        help='Month to process in YYYY-MM format (e.g., 2025-08)')
+    parser.add_argument('--base-dir', type=str, default=BASE_DATA_DIR, help='Local data directory')
+    parser.add_argument('--output-dir', type=str, help='Output directory (default: output/<month>)')
+    parser.add_argument('--sync-workers', type=int, default=DEFAULT_WORKERS, help='Concurrent downloads')
+    parser.add_argument('--extract-workers', type=int, default=os.cpu_count() or 2,
+                        help='Extraction processes')
+    parser.add_argument('--api-base', type=str, default=DRIVE_API_BASE,
+                        help='Drive API base URL (point at fake_drive.py for local testing)')
+    parser.add_argument('--drive-id', type=str, default=SHARED_DRIVE_ID, help='Shared drive ID')
+    parser.add_argument('--prune', action='store_true', help='Delete local copies of files removed from Drive')
+    parser.add_argument('--full', action='store_true',
+                        help='Re-extract every statement, even those unchanged since the last run')
+    add_logging_arguments(parser)
+    args = parser.parse_args(argv)
+
+    try:
+        datetime.strptime(args.month, '%Y-%m')
+    except ValueError:
+        print(f"ERROR: Invalid month format '{args.month}'. Use YYYY-MM (e.g., 2025-08)")
+        sys.exit(1)
+
+    client = DriveClient(args.api_base, pool_size=args.sync_workers)
+    sync = DriveSync(client, args.base_dir, args.drive_id, workers=args.sync_workers, prune=args.prune)
+    pipeline = StatementPipeline(args.month, args.base_dir, args.output_dir, sync=sync,
+                                 extract_workers=args.extract_workers, log_level=args.log_level,
+                                 log_format=args.log_format, full=args.full)
+    sys.exit(pipeline.run())
+
+
+if __name__ == "__main__":
+    main()
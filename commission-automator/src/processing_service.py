@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Resident Processing Service
+Long-lived process that serves interactive sessions from one warm copy of the
+master contacts, the learning database and the extraction cache
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from commission_entry import CommissionEntry
+from extract_commissions import CommissionExtractor
+from lazy_imports import preload
+
+# Configuration
+BASE_DATA_DIR = "/home/sam/commission_automator/data/mbh"
+MASTER_CSV = f"{BASE_DATA_DIR}/master_data/mbh master contacts list.csv"
+OUTPUT_DIR = "/home/sam/chatbot-platform/mbh/commission-automator/output"
+LOG_DIR = "/home/sam/chatbot-platform/mbh/commission-automator/logs"
+LEARNING_DB_PATH = Path.home() / '.commission_learning.json'
+
+
+class LearningStore:
+    """User corrections shared by every session, reloaded only when the file changes"""
+
+    def __init__(self, path: Path = LEARNING_DB_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._db = {}
+        self.refresh()
+
+    def refresh(self):
+        """Pick up corrections written by another process (e.g. the upload portal)"""
+        with self._lock:
+            mtime = self.path.stat().st_mtime_ns if self.path.exists() else None
+            if mtime == self._mtime:
+                return
+            if mtime is None:
+                self._db = {}
+            else:
+                with open(self.path) as f:
+                    self._db = json.load(f)
+            self._mtime = mtime
+
+    def get(self, group_name: str) -> Optional[str]:
+        return self._db.get(group_name)
+
+    def __contains__(self, group_name: str) -> bool:
+        return group_name in self._db
+
+    def __getitem__(self, group_name: str) -> str:
+        return self._db[group_name]
+
+    def __len__(self) -> int:
+        return len(self._db)
+
+    def remember(self, group_name: str, state: str):
+        """Save a correction and write the database through to disk"""
+        with self._lock:
+            db = dict(self._db)
+            db[group_name] = state
+
+            tmp_path = self.path.with_suffix('.json.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(db, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+            self._db = db
+            self._mtime = self.path.stat().st_mtime_ns
+
+
+class ExtractionCache:
+    """Extracted entries per PDF, keyed on path, size and modification time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    @staticmethod
+    def _key(pdf_path: Path) -> Tuple[str, int, int]:
+        stat = pdf_path.stat()
+        return str(pdf_path.resolve()), stat.st_size, stat.st_mtime_ns
+
+    def get(self, pdf_path: Path) -> Optional[List[Dict]]:
+        with self._lock:
+            entries = self._entries.get(self._key(pdf_path))
+        # Callers add state assignments to entries, so hand out copies
+        return [dict(entry) for entry in entries] if entries is not None else None
+
+    def put(self, pdf_path: Path, entries: List[CommissionEntry]):
+        with self._lock:
+            self._entries[self._key(pdf_path)] = [CommissionEntry.from_dict(entry) for entry in entries]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ProcessingService:
+    """Shared warm state for every interactive session in this process"""
+
+    def __init__(self, master_csv: str = MASTER_CSV, log_dir: str = LOG_DIR,
+                 learning_path: Path = LEARNING_DB_PATH):
+        self.master_csv = master_csv
+        self.log_dir = log_dir
+        self.learning = LearningStore(learning_path)
+        self.cache = ExtractionCache()
+        self.sessions = {}
+
+        self._extractor = None
+        self._extractor_lock = threading.Lock()
+        self._master_mtime = None
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def extractor(self) -> CommissionExtractor:
+        """Extractor holding the master contacts, rebuilt only if the master CSV changes"""
+        mtime = Path(self.master_csv).stat().st_mtime_ns
+        if self._extractor is None or mtime != self._master_mtime:
+            with self._extractor_lock:
+                if self._extractor is None or mtime != self._master_mtime:
+                    self._extractor = CommissionExtractor(
+                        BASE_DATA_DIR, self.master_csv, OUTPUT_DIR, self.log_dir,
+                        claude_api_key=os.getenv('ANTHROPIC_API_KEY')
+                    )
+                    self._master_mtime = mtime
+        return self._extractor
+
+    def warm(self):
+        """Load everything up front so the first session doesn't pay for it"""
+        preload()
+        contacts = len(self.extractor.master_contacts)
+        self.logger.info(f"Processing service warm: {contacts} master contacts, {len(self.learning)} learned corrections")
+
+    def extract(self, pdf_path: Path) -> List[Dict]:
+        """Extract one PDF, reusing earlier results for unchanged files"""
+        entries = self.cache.get(pdf_path)
+        if entries is None:
+            entries = self.extractor.process_pdf(pdf_path)
+            self.cache.put(pdf_path, entries)
+            entries = [dict(entry) for entry in entries]
+        return entries
+
+    def match_state(self, group_name: str) -> Dict:
+        """Best master-contact match, following the same WA rules as batch extraction"""
+        if not group_name:
+            return {'state': 'WA', 'confidence': 100, 'matched_name': ''}
+
+        result = self.extractor.master_contacts.match(group_name)
+        if not result:
+            return {'state': 'WA', 'confidence': 0, 'matched_name': ''}
+
+        matched_name, state, score = result
+        return {'state': state or 'WA', 'confidence': score, 'matched_name': matched_name}
+
+    def alternatives(self, group_name: str, limit: int = 3) -> List[Dict]:
+        """Runner-up master-contact matches to offer the reviewer"""
+        if not group_name:
+            return []
+
+        matches = self.extractor.master_contacts.best_matches(group_name, limit + 1)
+        return [
+            {'state': state or 'WA', 'confidence': score, 'name': name}
+            for name, state, score in matches[1:]
+        ]
+
+    async def handle(self, websocket, month: str, files: List[str], session_id: Optional[str] = None):
+        """Run one interactive session against the shared state"""
+        # Imported here - interactive_processor imports this module for the default service
+        from interactive_processor import handle_processing
+
+        self.learning.refresh()
+        await handle_processing(websocket, month, files, session_id=session_id, service=self)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_service() -> ProcessingService:
+    """Process-wide service instance"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = ProcessingService()
+    return _service
+
+
+async def serve(host: str, port: int):
+    """Accept websocket sessions; the client's first message says what to process"""
+    import websockets
+
+    service = get_service()
+    service.warm()
+
+    async def on_connect(websocket):
+        message = json.loads(await websocket.recv())
+        if message.get('type') != 'start_processing':
+            await websocket.send(json.dumps({'type': 'error', 'message': 'Expected start_processing'}))
+            return
+
+        await service.handle(websocket, message['month'], message.get('files', []),
+                             session_id=message.get('session_id'))
+
+    async with websockets.serve(on_connect, host, port):
+        service.logger.info(f"Processing service listening on ws://{host}:{port}")
+        await asyncio.Future()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run the resident interactive processing service')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Interface to listen on')
+    parser.add_argument('--port', type=int, default=8765, help='Websocket port')
+    args = parser.parse_args()
+
+    asyncio.run(serve(args.host, args.port))
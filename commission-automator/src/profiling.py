@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Run Profiling
+Opt-in (--profile) profiles of an extraction or report run, one per document
+plus a combined one for the run.
+
+Two profilers run together:
+- cProfile gives exact call counts and times per function. It writes <doc>.prof
+  and run.prof, which open in snakeviz or `python -m pstats`.
+- A stack sampler captures the running thread's stack every few milliseconds. It
+  writes collapsed stacks (<doc>.collapsed, run.collapsed) for flamegraph.pl or
+  speedscope. Each stack in run.collapsed starts with its document name, so one
+  flame graph shows which statement the time went to.
+
+The run log ends with the hottest functions by own time.
+"""
+
+import cProfile
+import io
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+PROFILE_DIR = "/home/sam/chatbot-platform/mbh/commission-automator/logs/profiles"
+SAMPLE_INTERVAL = 0.005
+TOP_FUNCTIONS = 20
+RUN_FRAME = '(run)'         # root frame for samples taken outside any document
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    path = Path(code.co_filename)
+    module = path.parent.name if path.stem == '__init__' else path.stem
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class StackSampler:
+    """Samples one thread's stack on a background thread, counting collapsed stacks per document"""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.document = RUN_FRAME
+        self.samples: Dict[str, Counter] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples.setdefault(self.document, Counter())[';'.join(reversed(stack))] += 1
+
+
+def write_collapsed(path: Path, samples: Counter):
+    """Brendan Gregg's collapsed stack format: 'frame;frame;frame count' per line"""
+    with open(path, 'w') as f:
+        for stack, count in sorted(samples.items()):
+            f.write(f"{stack} {count}\n")
+
+
+def top_functions(stats: pstats.Stats, limit: int = TOP_FUNCTIONS) -> List[Dict]:
+    """Functions with the most own time"""
+    rows = []
+    for (filename, line, function), (_, calls, own, cumulative, _) in stats.stats.items():
+        rows.append({'function': f"{Path(filename).name}:{line}({function})", 'calls': calls,
+                     'own_seconds': own, 'cumulative_seconds': cumulative})
+    return sorted(rows, key=lambda row: -row['own_seconds'])[:limit]
+
+
+class RunProfiler:
+    """cProfile and stack samples for a run, split by document"""
+
+    def __init__(self, job: str, profile_dir: str = PROFILE_DIR, top: int = TOP_FUNCTIONS,
+                 interval: float = SAMPLE_INTERVAL):
+        self.job = job
+        self.top = top
+        self.out_dir = Path(profile_dir) / f"{job}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.interval = interval
+        self._run_profile = cProfile.Profile()
+        self._documents: Dict[str, cProfile.Profile] = {}
+        self._file_stems: Dict[str, str] = {}       # document name -> its .prof/.collapsed file name
+        self._doc_seconds: Dict[str, float] = {}
+        self._sampler = None
+
+    def start(self):
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self._sampler = StackSampler(threading.get_ident(), self.interval)
+        self._sampler.start()
+        self._run_profile.enable()
+
+    def _document_name(self, name: str) -> str:
+        # Flame graph frames are ';'-separated; the same file name can come up twice (subfolders, --watch)
+        name = name.replace(';', '_')
+        base_stem = re.sub(r'[^\w.#-]+', '_', Path(name).stem)
+        unique, stem, n = name, base_stem, 1
+        # Different names can still share a stem ("a.pdf" and "a.PDF", "a b.pdf" and "a_b.pdf")
+        while unique in self._documents or stem in self._file_stems.values():
+            n += 1
+            unique, stem = f"{name} #{n}", f"{base_stem}_#{n}"
+        self._file_stems[unique] = stem
+        return unique
+
+    @contextmanager
+    def document(self, name: str):
+        """Profile one document separately (cProfile allows one active profiler per thread)"""
+        name = self._document_name(name)
+        profile = cProfile.Profile()
+        self._documents[name] = profile
+        self._run_profile.disable()
+        self._sampler.document = name
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._doc_seconds[name] = time.perf_counter() - started
+            self._sampler.document = RUN_FRAME
+            self._run_profile.enable()
+
+    def finish(self, logger) -> Path:
+        """Write every profile and log the hottest functions; returns the profile directory"""
+        self._run_profile.disable()
+        self._sampler.stop()
+
+        combined = pstats.Stats(self._run_profile, stream=io.StringIO())
+        run_samples = Counter()
+        for name, profile in self._documents.items():
+            stem = self._file_stems[name]
+            profile.dump_stats(str(self.out_dir / f"{stem}.prof"))
+            samples = self._sampler.samples.get(name, Counter())
+            write_collapsed(self.out_dir / f"{stem}.collapsed", samples)
+            run_samples.update({f"{name};{stack}": count for stack, count in samples.items()})
+            combined.add(profile)
+        run_samples.update({f"{RUN_FRAME};{stack}": count
+                            for stack, count in self._sampler.samples.get(RUN_FRAME, Counter()).items()})
+
+        combined.dump_stats(str(self.out_dir / 'run.prof'))
+        write_collapsed(self.out_dir / 'run.collapsed', run_samples)
+
+        slowest = sorted(self._doc_seconds.items(), key=lambda item: -item[1])[:5]
+        logger.info(f"Profile written to {self.out_dir} ({len(self._documents)} documents, "
+                    f"{sum(run_samples.values())} stack samples)")
+        for name, seconds in slowest:
+            logger.info(f"  slowest document: {name} {seconds:.2f}s")
+        logger.info(f"Top {self.top} functions by own time:")
+        logger.info(f"  {'own s':>8} {'cum s':>8} {'calls':>9}  function")
+        for row in top_functions(combined, self.top):
+            logger.info(f"  {row['own_seconds']:>8.3f} {row['cumulative_seconds']:>8.3f} {row['calls']:>9}  "
+                        f"{row['function']}")
+        return self.out_dir
+
+
+def add_profile_arguments(parser):
+    """--profile and --profile-dir for a script's argument parser"""
+    parser.add_argument('--profile', action='store_true',
+                        help='Profile the run: per-document and combined cProfile output, collapsed stacks '
+                             'for flame graphs, and the hottest functions at the end of the log')
+    parser.add_argument('--profile-dir', type=str, default=PROFILE_DIR,
+                        help=f'Where --profile writes its output (default: {PROFILE_DIR})')
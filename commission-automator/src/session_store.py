@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Interactive Session Checkpoints
+Persists extraction output and review progress so a dropped connection can resume
+"""
+
+import json
+import os
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+DEFAULT_SESSION_DIR = Path.home() / '.commission_sessions'
+
+
+@dataclass
+class SessionCheckpoint:
+    """Saved state of one interactive processing session"""
+    session_id: str
+    month: str
+    phase: str = 'extraction'          # extraction -> review -> report -> complete
+    files: List[str] = field(default_factory=list)
+    entries: List[Dict] = field(default_factory=list)
+    high_confidence: List[Dict] = field(default_factory=list)
+    review_queue: List[Dict] = field(default_factory=list)
+    reviewed: List[Dict] = field(default_factory=list)
+    review_position: int = 0           # index of the next unreviewed item
+    report_path: str = ''
+    updated_at: str = ''
+
+
+class SessionStore:
+    """One JSON checkpoint file per session id"""
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root) if root else DEFAULT_SESSION_DIR
+
+    def _path(self, session_id: str) -> Path:
+        # Session ids come from the client - keep them inside the store directory
+        safe_id = ''.join(c for c in session_id if c.isalnum() or c in '-_')
+        if not safe_id:
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        return self.root / f"{safe_id}.json"
+
+    def load(self, session_id: str) -> Optional[SessionCheckpoint]:
+        """Return the checkpoint for a session, or None if there isn't one"""
+        path = self._path(session_id)
+        if not path.exists():
+            return None
+
+        try:
+            with open(path) as f:
+                return SessionCheckpoint(**json.load(f))
+        except (json.JSONDecodeError, TypeError):
+            # A corrupt checkpoint is treated as no checkpoint - the session starts over
+            return None
+
+    def save(self, checkpoint: SessionCheckpoint):
+        """Write the checkpoint atomically so a crash never leaves a half-written file"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        checkpoint.updated_at = datetime.now().isoformat(timespec='seconds')
+
+        path = self._path(checkpoint.session_id)
+        tmp_path = path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(asdict(checkpoint), f, indent=2, default=str)
+        os.replace(tmp_path, path)
+
+    def delete(self, session_id: str):
+        """Remove a session checkpoint"""
+        path = self._path(session_id)
+        if path.exists():
+            path.unlink()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Statement Triage
+Finds duplicate commission statements before they are extracted.
+
+The same statement often lands in a month's folder twice - once in the root and
+again in a carrier subfolder like MyAccess. Exact copies (same SHA-256) are
+collapsed to one file so they are parsed and summed once. Statements that
+differ byte-for-byte but extract to the same carrier, entry count and total
+(a re-downloaded or re-printed PDF) are kept, but flagged for a person to check.
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+HASH_CHUNK_SIZE = 1024 * 1024
+TRIAGE_REPORT_FILE = 'statement_triage.json'
+
+
+def statement_pdfs(pdf_dir: Path) -> List[Path]:
+    """Every PDF under pdf_dir, whatever the case of its extension, each listed once"""
+    return sorted(path for path in Path(pdf_dir).rglob('*')
+                  if path.suffix.lower() == '.pdf' and path.is_file())
+
+
+def content_hash(path: Path) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class TriageResult:
+    """Statements to extract, and the exact copies left out"""
+    unique: List[Path] = field(default_factory=list)
+    duplicates: Dict[Path, Path] = field(default_factory=dict)     # copy -> statement kept instead
+
+
+class StatementTriage:
+    """Content hashes for a folder's statements, reused while a file's size and mtime are unchanged"""
+
+    def __init__(self, base_dir: Optional[Path] = None):
+        self.base_dir = Path(base_dir) if base_dir else None
+        self.hashes: Dict[str, list] = {}      # relative path -> [size, mtime_ns, sha256]
+
+    def relative(self, path: Path) -> str:
+        path = Path(path)
+        if self.base_dir is not None and self.base_dir in path.parents:
+            return path.relative_to(self.base_dir).as_posix()
+        return str(path)
+
+    def hash(self, path: Path) -> str:
+        stat = Path(path).stat()
+        relative = self.relative(path)
+        cached = self.hashes.get(relative)
+        if cached and cached[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return cached[2]
+
+        digest = content_hash(path)
+        self.hashes[relative] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    def _preference(self, path: Path) -> Tuple[int, str]:
+        # Keep the copy nearest the folder root (the carrier subfolders hold re-uploads)
+        relative = self.relative(path)
+        return relative.count('/'), relative
+
+    def preferred(self, a: Path, b: Path) -> Path:
+        """Which of two identical statements to keep"""
+        return min(a, b, key=self._preference)
+
+    def triage(self, paths: Iterable[Path]) -> TriageResult:
+        """Collapse exact copies; files that vanish mid-scan are left out"""
+        kept: Dict[str, Path] = {}
+        copies: List[Tuple[Path, str]] = []
+        for path in sorted(set(paths), key=self._preference):
+            try:
+                digest = self.hash(path)
+            except FileNotFoundError:
+                continue
+            if digest in kept:
+                copies.append((path, digest))
+            else:
+                kept[digest] = path
+
+        # Forget hashes for files no longer present
+        present = {self.relative(path) for path in kept.values()} | {self.relative(path) for path, _ in copies}
+        self.hashes = {relative: entry for relative, entry in self.hashes.items() if relative in present}
+
+        return TriageResult(unique=sorted(kept.values()),
+                            duplicates={path: kept[digest] for path, digest in copies})
+
+
+def find_near_duplicates(file_entries: Dict[str, List[Dict]]) -> List[Dict]:
+    """
+    Groups of different statements that extracted to the same carrier, entry count and total
+
+    file_entries maps each statement to its extracted entries. Statements with
+    no entries aren't compared - they have nothing to double-count.
+    """
+    groups: Dict[Tuple, List[str]] = {}
+    for name, entries in file_entries.items():
+        if not entries:
+            continue
+        carriers = tuple(sorted({entry['carrier'] for entry in entries}))
+        total = round(sum(entry['commission'] for entry in entries), 2)
+        groups.setdefault((carriers, len(entries), total), []).append(name)
+
+    return [
+        {'files': sorted(names), 'carrier': ', '.join(carriers), 'entries': count, 'total': total}
+        for (carriers, count, total), names in sorted(groups.items(), key=lambda item: sorted(item[1]))
+        if len(names) > 1
+    ]
+
+
+def save_triage_report(output_dir: Path, duplicates: Dict[str, str], near_duplicates: List[Dict]) -> Path:
+    """Write statement_triage.json; duplicates maps each skipped copy to the statement kept"""
+    report = {
+        'duplicates': [{'file': copy, 'duplicate_of': kept} for copy, kept in sorted(duplicates.items())],
+        'near_duplicates': near_duplicates,
+    }
+    report_path = Path(output_dir) / TRIAGE_REPORT_FILE
+    tmp_path = report_path.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, report_path)
+    return report_path
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Synthetic Carrier Statements
+Generates fake statements in every supported carrier layout, for benchmarks and
+checks that can't use client PDFs.
+
+Each layout writes a PDF with the same text lines its extractor reads, and
+records the entries the extractor should find. Callers can then check the
+results as well as time them. Output is deterministic for a given seed.
+
+Usage:
+    python synthetic_statements.py --out /tmp/statements --pages 50
+    python synthetic_statements.py --out /tmp/statements --layout beam --pages 1000
+"""
+
+import csv
+import json
+import random
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+LINES_PER_PAGE = 60
+MAX_PAGES = 1000
+STATES = ['WA', 'OR', 'CA', 'ID', 'NV', 'AZ', 'HI', 'MO', 'NM', 'TX']
+
+# Words chosen to stay clear of the tokens extractors strip or route on
+# (Select, Plus, Choice, MAC, OON, beam, allied, guardian, ...)
+NAME_WORDS = ['Harbor', 'Summit', 'Cascade', 'Evergreen', 'Pioneer', 'Redwood', 'Lakeside', 'Northwind',
+              'Granite', 'Willow', 'Meridian', 'Coastal', 'Juniper', 'Riverside', 'Alder', 'Falcon',
+              'Orchard', 'Sterling', 'Timber', 'Bayview', 'Cedar', 'Hawthorne', 'Kestrel', 'Larkspur']
+NAME_TRADES = ['Dental', 'Logistics', 'Bakery', 'Builders', 'Consulting', 'Landscaping', 'Auto Repair',
+               'Family Clinic', 'Coffee', 'Design', 'Plumbing', 'Realty', 'Brewing', 'Veterinary', 'Printing']
+NAME_SUFFIXES = ['LLC', 'Inc', 'Co', 'Group', 'PLLC', 'Partners']
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+
+@dataclass
+class SyntheticStatement:
+    """A generated PDF and the entries its extractor should return"""
+    layout: str
+    path: Path
+    pages: int
+    expected: List[Dict] = field(default_factory=list)     # [{'group_name', 'commission'}]
+
+    @property
+    def total(self) -> float:
+        return round(sum(entry['commission'] for entry in self.expected), 2)
+
+
+class _Statement:
+    """Lines for one statement, paged with a header and footer on every page"""
+
+    def __init__(self, rng: random.Random, pages: int, header: List[str], footer: Callable[[int], List[str]]):
+        self.rng = rng
+        self.pages = pages
+        self.header = header
+        self.footer = footer
+        self.space = LINES_PER_PAGE - len(header) - len(footer(1))
+        self.done: List[List[str]] = []
+        self.current: List[str] = []
+        self.entries: Dict[str, float] = {}
+        self.rows: List[Dict] = []
+
+    def room(self, lines: int, reserve: int = 0) -> bool:
+        """Whether a block of `lines` lines fits, leaving `reserve` lines free at the end"""
+        if len(self.done) + 1 < self.pages:
+            return True
+        return len(self.current) + lines + reserve <= self.space
+
+    def place(self, block: List[str]):
+        """Add a block of lines, starting a new page rather than splitting it"""
+        if self.current and len(self.current) + len(block) > self.space:
+            self.done.append(self.current)
+            self.current = []
+        self.current.extend(block)
+
+    def page_lines(self) -> List[List[str]]:
+        pages = self.done + [self.current]
+        return [self.header + page + self.footer(number) for number, page in enumerate(pages, 1)]
+
+    def company(self, upper: bool = False) -> str:
+        name = f"{self.rng.choice(NAME_WORDS)} {self.rng.choice(NAME_TRADES)} {self.rng.choice(NAME_SUFFIXES)}"
+        return name.upper() if upper else name
+
+    def amount(self, low: float = 1, high: float = 900) -> float:
+        return round(self.rng.uniform(low, high), 2)
+
+    def add(self, group_name: str, commission: float):
+        """An entry the extractor sums by group name"""
+        self.entries[group_name] = self.entries.get(group_name, 0) + commission
+
+    def add_row(self, group_name: str, commission: float):
+        """An entry the extractor returns as its own row"""
+        self.rows.append({'group_name': group_name, 'commission': commission})
+
+    def expected(self) -> List[Dict]:
+        return self.rows + [{'group_name': name, 'commission': commission} for name, commission in self.entries.items()]
+
+
+def _money(value: float) -> str:
+    return f"{value:,.2f}"
+
+
+def _allied(rng: random.Random, pages: int) -> Tuple[List[List[str]], List[Dict]]:
+    statement = _Statement(rng, pages, ['Allied National Commission Statement',
+                                        'Group Name Billed Paid Premium Received Rate Lives Commission'],
+                           lambda n: [f'Page {n}'])
+    while statement.room(1):
+        name, premium = statement.company(), statement.amount(200, 20000)
+        rate = rng.choice([5.0, 7.5, 10.0])
+        commission = round(premium * rate / 100, 2)
+        statement.place([f"{rng.choice('ABG')}{rng.randint(1000, 99999)} {name} 09/01/2025 09/30/2025 "
+                         f"${_money(premium)} ${_money(premium)} {rate}% x {rng.randint(1, 60)} ${_money(commission)}"])
+        statement.add_row(name, commission)
+    return statement.page_lines(), statement.expected()
+
+
+def _beam(rng: random.Random, pages: int) -> Tuple[List[List[str]], List[Dict]]:
+    # Two trailing lines per page: the extractor never starts an entry on a page's last two lines
+    statement = _Statement(rng, pages, ['Commission statement', 'Company name Product Policy Amount Paid'],
+                           lambda n: ['Commission summary', f'Page {n}'])
+    while statement.room(3):
+        name, commission = statement.company(), statement.amount()
+        policy = f"{rng.choice(['BD', 'BV', 'BL'])}{rng.randint(10000, 99999)}"
+        if rng.random() < 0.8:
+            # Pattern 1: policy code and amount on the line after the company
+            statement.place([f"{name} SmartPremium Dental", f"{policy} ${_money(commission)} 09/15/2025"])
+        else:
+            # Pattern 2: location and amount, then the policy code on its own line
+            city = rng.choice(['Seattle, WA', 'Portland, OR', 'Boise, ID'])
+            statement.place([f"{name} VSP Choice Plan", f"{city} ${_money(commission)} 09/15/2025", policy])
+        statement.add(name, commission)
+    return statement.page_lines(), statement.expected()
+
+
+def _guardian(rng: random.Random, pages: int) -> Tuple[List[List[str]], List[Dict]]:
+    statement = _Statement(rng, pages, ['Guardian Commission Statement'], lambda n: [f'Page {n}'])
+    statement.place(['Guardian Life Total'])      # filled in once the plans are summed
+    total = 0.0
+    while statement.room(1):
+        commission = statement.amount(1, 200)
+        total += commission
+        statement.place([f"Plan {rng.randint(100000, 999999)} {statement.company()} Dental "
+                         f"Premium ${_money(commission * 10)} Commission ${_money(commission)}"])
+    total = round(total, 2)
+    page_lines = statement.page_lines()
+    page_lines[0][1] = f"Guardian Life Total ${_money(total * 10)} ${_money(total * 10)} ${_money(total)}"
+    statement.add_row('', total)
+    return page_lines, statement.expected()
+
+
+def _american_heritage(rng: random.Random, pages: int) -> Tuple[List[List[str]], List[Dict]]:
+    statement = _Statement(rng, pages, ['American Heritage Life Insurance Company Earned Commission Statement',
+                                        'Case Name Premium Rate Commission'],
+                           lambda n: [f'Page {n}'])
+    due = 0.0
+    # The totals the extractor reads are on the last page, so keep room for them
+    while statement.room(1, reserve=2):
+        if rng.random() < 0.75:
+            name = statement.company(upper=True)
+            premium, commission = statement.amount(50, 5000), statement.amount(1, 400)
+            statement.place([f"Case {rng.choice('ABCDEFGH')}{rng.randint(1000, 9999)} {name} "
+                             f"{_money(premium)} {rng.choice(['5.00', '10.00', '12.50'])} {_money(commission)}"])
+            statement.add(name, commission)
+        else:
+            # Individual plans carry no group name; they make up the blank-group remainder
+            commission = statement.amount(1, 100)
+            statement.place([f"Policy {rng.randint(10000000, 99999999)} Individual Accident {_money(commission)}"])
+        due += commission
+    groups = sum(statement.entries.values())
+    due = round(due, 2)
+    statement.place([f"Total Commissions Earned {_money(due)}CR", f"Commissions Due {_money(due)}"])
+    if due - groups > 0.01:
+        statement.add('', due - groups)
+    return statement.page_lines(), statement.expected()
+
+
+def _choice_builder(rng: random.Random, pages: int) -> Tuple[List[List[str]], List[Dict]]:
+    statement = _Statement(rng, pages, ['Choice Builder Commission Statement',
+                                        'CompanyName PaidMonth Product Comm Amount ADJCD'],
+                           lambda n: [f'Page {n}'])
+    while statement.room(6):
+        name = statement.company()
+        block = [f"Policy Number: {rng.choice('BCD')}{rng.randint(10000, 99999)}"]
+        products = rng.sample(['Dental', 'Vision', 'Life', 'Chiropractic', 'Medical'], rng.randint(1, 4))
+        same_line = rng.random() < 0.5
+        if not same_line:
+            block.append(name)
+        for i, product in enumerate(products):
+            commission = statement.amount(0.5, 60)
+            amount = f"${_money(commission)}"
+            if rng.random() < 0.1:
+                commission, amount = -commission, f"(${_money(commission)})"
+            prefix = f"{name} " if same_line and i == 0 else ''
+            block.append(f"{prefix}{rng.choice(['Jul', 'Aug', 'Sep'])} 2025 {product} {amount}")
+            statement.add(name, commission)
+        statement.place(block)
+    return statement.page_lines(), statement.expected()
+
+
+def _cal_choice(rng: random.Random, pages: int) -> Tuple[List[List[str]], List[Dict]]:
+    statement = _Statement(rng, pages, ['CHOICE ADMINISTRATORS Cal Choice Commission Statement',
+                                        'Group Name Month Product Premium Rate Commission'],
+                           lambda n: [f'Page {n}'])
+    while statement.room(4):
+        name = statement.company(upper=True)
+        block = []
+        for i in range(rng.randint(1, 4)):
+            premium, rate = statement.amount(100, 9000), rng.choice([1, 1.5, 2])
+            commission = round(premium * rate / 100, 2)
+            if rng.random() < 0.05:
+                commission = -commission
+            line = (f"{rng.randint(20, 25)}-{rng.choice(MONTHS)} {rng.choice(['Medical', 'Dental', 'Vision', 'Life'])} "
+                    f"{premium:.2f} {rate:g} {commission:.2f}")
+            block.append(f"{rng.randint(10000, 99999)} {name} {line}" if i == 0 else line)
+            statement.add(name, commission)
+        statement.place(block)
+    return statement.page_lines(), statement.expected()
+
+
+def _vsp_vision(rng: random.Random, pages: int) -> Tuple[List[List[str]], List[Dict]]:
+    statement = _Statement(rng, pages, ['VSP Vision Care Producer Commission Statement'], lambda n: [f'Page {n}'])
+    statement.place(['Sum total'])      # filled in once the members are summed
+    total = 0.0
+    while statement.room(1):
+        commission = statement.amount(1, 80)
+        total += commission
+        statement.place([f"{statement.company()} Member {rng.randint(100000, 999999)} Paid {_money(commission)}"])
+    total = round(total, 2)
+    page_lines = statement.page_lines()
+    page_lines[0][1] = f"Sum total {_money(total)}"
+    statement.add_row('VSP Vision Total', total)
+    return page_lines, statement.expected()
+
+
+def _us_bank(rng: random.Random, pages: int) -> Tuple[List[List[str]], List[Dict]]:
+    statement = _Statement(rng, pages, ['U.S. Bank Business Checking Statement', 'Date Description Amount'],
+                           lambda n: [f'Page {n}'])
+    payers = ['Guardian Life In', 'AMERICAN HERITAG', 'AHL INS CO', 'BeamInsAdmin', 'CHOICE ADMINISTR',
+              'Ameritas Life In', 'ALLIED NATIONAL', 'VSP VISION CARE']
+    while statement.room(1):
+        day = f"09/{rng.randint(1, 30):02d}"
+        if rng.random() < 0.7:
+            payer, amount = rng.choice(payers), statement.amount(10, 9000)
+            statement.place([f"{day} Electronic Deposit From {payer} {_money(amount)}"])
+            statement.add(payer, amount)
+        else:
+            statement.place([f"{day} Card Withdrawal {statement.company()} {_money(statement.amount(5, 500))}"])
+    return statement.page_lines(), statement.expected()
+
+
+# Layout -> (file name, generator); file names route to the right extractor
+LAYOUTS: Dict[str, Tuple[str, Callable]] = {
+    'allied': ('Allied National {n}.pdf', _allied),
+    'beam': ('Beam Dental {n}.pdf', _beam),
+    'guardian': ('Guardian {n}.pdf', _guardian),
+    'american_heritage': ('AHL Earned Commissions {n}.pdf', _american_heritage),
+    'choice_builder': ('Choice Builder {n}.pdf', _choice_builder),
+    'cal_choice': ('Cal Choice {n}.pdf', _cal_choice),
+    'vsp_vision': ('VSP Vision {n}.pdf', _vsp_vision),
+    'us_bank': ('US Bank Statement {n}.pdf', _us_bank),
+}
+STATEMENT_LAYOUTS = [layout for layout in LAYOUTS if layout != 'us_bank']
+
+
+def _pdf_string(text: str) -> str:
+    return '(' + text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)') + ')'
+
+
+def write_pdf(path: Path, pages: List[List[str]]):
+    """Minimal text-only PDF: one Helvetica line per string, top to bottom"""
+    page_count = len(pages)
+    # Objects: 1 catalog, 2 page tree, 3 font, then a page and its content stream per page
+    objects = ['<< /Type /Catalog /Pages 2 0 R >>',
+               '<< /Type /Pages /Kids [' + ' '.join(f'{4 + 2 * i} 0 R' for i in range(page_count)) +
+               f'] /Count {page_count} >>',
+               '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    for i, lines in enumerate(pages):
+        content = 'BT /F1 8 Tf 20 770 Td 12 TL ' + ' '.join(f"{_pdf_string(line)} '" for line in lines) + ' ET'
+        objects.append('<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                       f'/Contents {5 + 2 * i} 0 R /Resources << /Font << /F1 3 0 R >> >> >>')
+        objects.append(f'<< /Length {len(content)} >>\nstream\n{content}\nendstream')
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f'{number} 0 obj\n{body}\nendobj\n'.encode('latin-1')
+    xref = len(out)
+    out += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode()
+    out += b''.join(f'{offset:010d} 00000 n \n'.encode() for offset in offsets)
+    out += f'trailer << /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode()
+    Path(path).write_bytes(bytes(out))
+
+
+def generate(layout: str, out_dir: Path, pages: int = 10, seed: int = 0, index: int = 1) -> SyntheticStatement:
+    """Write one synthetic statement of `pages` pages"""
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout: {layout} (expected one of {', '.join(LAYOUTS)})")
+    if not 1 <= pages <= MAX_PAGES:
+        raise ValueError(f"pages must be between 1 and {MAX_PAGES}")
+
+    file_name, build = LAYOUTS[layout]
+    rng = random.Random(f"{layout}:{seed}:{index}:{pages}")
+    page_lines, expected = build(rng, pages)
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / file_name.format(n=index)
+    write_pdf(path, page_lines)
+    return SyntheticStatement(layout, path, len(page_lines), expected)
+
+
+def write_master_contacts(path: Path, statements: List[SyntheticStatement], seed: int = 0):
+    """A master contacts CSV covering the statements' group names, as state matching expects"""
+    rng = random.Random(seed)
+    names = sorted({entry['group_name'] for statement in statements if statement.layout != 'us_bank'
+                    for entry in statement.expected if entry['group_name']})
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['Card Name', 'State'])
+        writer.writeheader()
+        for name in names:
+            writer.writerow({'Card Name': name, 'State': rng.choice(STATES)})
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Generate synthetic carrier statements')
+    parser.add_argument('--out', type=str, required=True, help='Directory to write PDFs to')
+    parser.add_argument('--layout', choices=list(LAYOUTS), action='append',
+                        help='Layout to generate (repeatable; default: all)')
+    parser.add_argument('--pages', type=int, default=10, help=f'Pages per statement (1-{MAX_PAGES})')
+    parser.add_argument('--count', type=int, default=1, help='Statements per layout')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    args = parser.parse_args(argv)
+
+    if not 1 <= args.pages <= MAX_PAGES:
+        print(f"ERROR: --pages must be between 1 and {MAX_PAGES}")
+        sys.exit(1)
+
+    out_dir = Path(args.out)
+    statements = [generate(layout, out_dir, args.pages, args.seed, index)
+                  for layout in args.layout or list(LAYOUTS) for index in range(1, args.count + 1)]
+    write_master_contacts(out_dir / 'master contacts.csv', statements, args.seed)
+
+    expected = {statement.path.name: {'layout': statement.layout, 'pages': statement.pages,
+                                      'entries': len(statement.expected), 'total': statement.total}
+                for statement in statements}
+    with open(out_dir / 'expected.json', 'w') as f:
+        json.dump(expected, f, indent=2)
+
+    for statement in statements:
+        print(f"✓ {statement.path.name}: {statement.pages} pages, {len(statement.expected)} entries, "
+              f"${statement.total:,.2f}")
+
+
+if __name__ == "__main__":
+    main()
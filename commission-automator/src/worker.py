@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Warm Python Worker
+Runs pipeline scripts in a long-lived process for the upload portal.
+
+Speaks line-delimited JSON-RPC 2.0 on stdin/stdout. One request per line:
+
+    {"jsonrpc": "2.0", "id": 1, "method": "run",
+     "params": {"script": "extract_commissions.py", "args": ["--month", "2025-10"]}}
+
+Script output that would have gone to stdout is returned in the result, and
+log output goes to stderr, so the portal sees the same thing it did when it
+spawned a process per script - without paying interpreter startup, the
+pdfplumber/anthropic imports or the master CSV load on every upload.
+
+Runs go through a JobQueue: at most --workers execute at once (each in its own
+warm process), one per month, and duplicate submissions share a run. Add
+"priority": "interactive" | "normal" | "backfill" to the run params to order
+them; the "metrics" method reports queue depth and wait times.
+"""
+
+import io
+import json
+import logging
+import multiprocessing
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import extract_commissions
+import generate_report
+import generate_state_summary
+from job_queue import Job, JobQueue, month_inputs_fingerprint
+from lazy_imports import HEAVY_MODULES
+from log_config import stop_logging
+
+BASE_DATA_DIR = "/home/sam/commission_automator/data/mbh"
+
+SCRIPTS = {
+    'extract_commissions.py': extract_commissions.main,
+    'generate_state_summary.py': generate_state_summary.main,
+    'generate_report.py': generate_report.main,
+}
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SCRIPT_ERROR = -32000
+
+
+class RPCError(Exception):
+    def __init__(self, code: int, message: str, data=None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+
+def _reset_logging():
+    """Drop the previous run's handlers so each run gets its own log file"""
+    stop_logging()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+
+
+def execute_script(script: str, args: List[str]) -> Dict:
+    """Run one script's main() in this process, capturing what it prints"""
+    _reset_logging()
+    stdout = io.StringIO()
+    exit_code = 0
+    error = None
+    started = time.time()
+
+    with redirect_stdout(stdout):
+        try:
+            SCRIPTS[script](list(args))
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except Exception as e:
+            logging.getLogger(__name__).error(f"{script} failed: {e}", exc_info=True)
+            exit_code = 1
+            error = f"Script {script} failed: {e}"
+
+    return {
+        'exit_code': exit_code,
+        'stdout': stdout.getvalue(),
+        'duration': round(time.time() - started, 3),
+        'error': error
+    }
+
+
+def job_month(args: List[str]) -> str:
+    """The --month a script run targets (scripts default to the current month)"""
+    for i, arg in enumerate(args):
+        if arg == '--month' and i + 1 < len(args):
+            return args[i + 1]
+        if arg.startswith('--month='):
+            return arg.split('=', 1)[1]
+    return time.strftime('%Y-%m')
+
+
+class Worker:
+    """Dispatches JSON-RPC requests to the pipeline scripts"""
+
+    def __init__(self, workers: int = 2, stdout=None):
+        self.started = time.time()
+        self.stdout = stdout or sys.stdout
+        self._write_lock = threading.Lock()
+
+        # Each pool process imports the scripts once and stays warm between runs.
+        # Forking from a process that already has queue threads can deadlock, so
+        # pool processes come from a forkserver with the scripts preloaded. The
+        # scripts import their heavy dependencies lazily, so load those first.
+        self.workers = workers
+        self._context = multiprocessing.get_context('forkserver')
+        self._context.set_forkserver_preload(list(HEAVY_MODULES) + [module.__name__ for module in
+                                                  (extract_commissions, generate_state_summary, generate_report)])
+        self._pool_lock = threading.Lock()
+        self.pool = self._new_pool()
+        self.queue = JobQueue(self._run_job, workers=workers)
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=self._context)
+
+    def _run_job(self, job: Job) -> Dict:
+        pool = self.pool
+        try:
+            return pool.submit(execute_script, job.script, job.args).result()
+        except BrokenProcessPool:
+            # A pool process died (e.g. OOM-killed); every later submit() would fail, so start a fresh pool.
+            # The job fails rather than retrying - it may well be the one that took the process down.
+            with self._pool_lock:
+                if self.pool is pool:
+                    logging.getLogger(__name__).error(f"Worker pool broke running {job.script} for {job.month}; "
+                                                      f"starting a new pool")
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    self.pool = self._new_pool()
+            raise
+
+    def _fingerprint(self, month: str) -> str:
+        if not re.match(r'^\d{4}-\d{2}$', month):
+            return ''
+        return (month_inputs_fingerprint(Path(BASE_DATA_DIR) / month) +
+                month_inputs_fingerprint(Path(BASE_DATA_DIR) / 'master_data'))
+
+    def _respond(self, response: Dict):
+        with self._write_lock:
+            self.stdout.write(json.dumps(response, default=str) + '\n')
+            self.stdout.flush()
+
+    def ping(self) -> Dict:
+        return {
+            'pid': os.getpid(),
+            'uptime': round(time.time() - self.started, 1),
+            'jobs_run': self.queue.completed + self.queue.failed
+        }
+
+    def submit_run(self, request_id, script: str, args: Optional[List[str]] = None, priority: str = 'normal'):
+        """Queue a script run; the response is written when the run finishes"""
+        if script not in SCRIPTS:
+            raise RPCError(INVALID_PARAMS, f"Unknown script: {script}")
+        if priority not in ('interactive', 'normal', 'backfill'):
+            raise RPCError(INVALID_PARAMS, f"Unknown priority: {priority}")
+
+        args = list(args or [])
+        month = job_month(args)
+
+        def on_done(job: Job):
+            self._respond(self._job_response(request_id, job))
+
+        self.queue.submit(month, script, args, priority=priority,
+                          fingerprint=self._fingerprint(month), on_done=on_done)
+
+    def _job_response(self, request_id, job: Job) -> Dict:
+        result = job.result
+        if job.error is not None:
+            error = {'code': SCRIPT_ERROR, 'message': f"Script {job.script} failed: {job.error}",
+                     'data': {'exit_code': 1, 'stdout': ''}}
+            return {'jsonrpc': '2.0', 'id': request_id, 'error': error}
+
+        result = {**result, 'job_id': job.id, 'wait': round(job.started_at - job.submitted_at, 3)}
+        if result['exit_code'] != 0:
+            message = result.pop('error') or f"Script {job.script} exited with code {result['exit_code']}"
+            error = {'code': SCRIPT_ERROR, 'message': message, 'data': result}
+            return {'jsonrpc': '2.0', 'id': request_id, 'error': error}
+
+        result.pop('error')
+        return {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+
+    def handle(self, line: str) -> Optional[Dict]:
+        """Process one request line; returns the response, or None if it will be sent later"""
+        request_id = None
+        try:
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise RPCError(PARSE_ERROR, f"Parse error: {e}")
+
+            if not isinstance(request, dict) or 'method' not in request:
+                raise RPCError(INVALID_REQUEST, "Invalid request")
+
+            request_id = request.get('id')
+            params = request.get('params') or {}
+
+            if request['method'] == 'ping':
+                result = self.ping()
+            elif request['method'] == 'metrics':
+                result = self.queue.metrics()
+            elif request['method'] == 'run':
+                if not isinstance(params, dict) or 'script' not in params:
+                    raise RPCError(INVALID_PARAMS, "run requires a 'script' parameter")
+                self.submit_run(request_id, params['script'], params.get('args'),
+                                params.get('priority', 'normal'))
+                return None
+            else:
+                raise RPCError(METHOD_NOT_FOUND, f"Method not found: {request['method']}")
+
+            return {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+
+        except RPCError as e:
+            error = {'code': e.code, 'message': e.message}
+            if e.data is not None:
+                error['data'] = e.data
+            return {'jsonrpc': '2.0', 'id': request_id, 'error': error}
+
+    def serve(self, stdin=None):
+        """Read requests until stdin closes, then finish queued runs"""
+        stdin = stdin or sys.stdin
+
+        for line in stdin:
+            if not line.strip():
+                continue
+            response = self.handle(line)
+            if response is not None:
+                self._respond(response)
+
+        self.queue.shutdown()
+        self.pool.shutdown()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Warm JSON-RPC worker for the upload portal')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('COMMISSION_WORKERS', '2')),
+                        help='Maximum number of runs executing at once')
+    args = parser.parse_args()
+
+    Worker(workers=args.workers).serve()
@@ -0,0 +1,83 @@
+#!/bin/bash
+
+# Test Drive sync against a local fake Drive server - no credentials needed
+# Usage: ./test_drive_sync.sh [number_of_statements]
+
+COUNT=${1:-60}
+MONTH="2025-10"
+PORT=8089
+PYTHON=${PYTHON:-python3}
+SRC_DIR="$(cd "$(dirname "$0")" && pwd)/src"
+WORK_DIR=$(mktemp -d)
+
+FAKE_ROOT="$WORK_DIR/drive"
+SYNC_DIR="$WORK_DIR/synced"
+
+echo "Testing Drive sync with $COUNT statements"
+echo "==========================================="
+
+# Build a fake shared drive
+mkdir -p "$FAKE_ROOT/$MONTH/commission_statements/MyAccess/Archive" "$FAKE_ROOT/$MONTH/bank_statement" "$FAKE_ROOT/master_data"
+for i in $(seq 1 "$COUNT"); do
+    head -c 200000 /dev/urandom > "$FAKE_ROOT/$MONTH/commission_statements/Statement $i.pdf"
+done
+head -c 50000 /dev/urandom > "$FAKE_ROOT/$MONTH/commission_statements/MyAccess/MyAccess 1.pdf"
+head -c 50000 /dev/urandom > "$FAKE_ROOT/$MONTH/commission_statements/MyAccess/Archive/MyAccess 0.pdf"
+head -c 50000 /dev/urandom > "$FAKE_ROOT/$MONTH/bank_statement/US Bank.pdf"
+printf 'Card Name,State\nAcme,WA\n' > "$FAKE_ROOT/master_data/mbh master contacts list.csv"
+
+# Start the fake Drive server (small pages, so listings must follow nextPageToken, and
+# dropped connections, so downloads must resume)
+$PYTHON "$SRC_DIR/fake_drive.py" --root "$FAKE_ROOT" --port $PORT --max-page-size 25 --drop-after 65536 &
+SERVER_PID=$!
+trap 'kill $SERVER_PID 2>/dev/null; rm -rf "$WORK_DIR"' EXIT
+sleep 1
+
+# Sync
+$PYTHON "$SRC_DIR/drive_sync.py" --month "$MONTH" --base-dir "$SYNC_DIR" --api-base "http://127.0.0.1:$PORT"
+
+compare() {
+    if diff -r -x sync_changes.json "$FAKE_ROOT/$MONTH" "$SYNC_DIR/$MONTH" > /dev/null && \
+       diff -r "$FAKE_ROOT/master_data" "$SYNC_DIR/master_data" > /dev/null; then
+        echo "✅ Synced files match the fake Drive"
+    else
+        echo "❌ Synced files differ from the fake Drive"
+        diff -rq -x sync_changes.json -x .sync_manifest.json "$FAKE_ROOT" "$SYNC_DIR"
+        exit 1
+    fi
+}
+
+changes() {
+    $PYTHON -c "import json, sys; c = json.load(open(sys.argv[1])); print(len(c['new']), len(c['changed']), len(c['deleted']))" \
+        "$SYNC_DIR/$MONTH/sync_changes.json"
+}
+
+expect_changes() {
+    local actual=$(changes)
+    if [ "$actual" = "$1" ]; then
+        echo "✅ new/changed/deleted: $actual"
+    else
+        echo "❌ Expected new/changed/deleted $1, got $actual"
+        exit 1
+    fi
+}
+
+echo ""
+compare
+expect_changes "$((COUNT + 4)) 0 0"
+
+# A repeat sync downloads nothing
+echo ""
+echo "Re-syncing unchanged Drive..."
+$PYTHON "$SRC_DIR/drive_sync.py" --month "$MONTH" --base-dir "$SYNC_DIR" --api-base "http://127.0.0.1:$PORT"
+expect_changes "0 0 0"
+
+# Change one statement, add one and remove one
+echo ""
+echo "Re-syncing after edits on Drive..."
+head -c 100000 /dev/urandom > "$FAKE_ROOT/$MONTH/commission_statements/Statement 1.pdf"
+head -c 100000 /dev/urandom > "$FAKE_ROOT/$MONTH/commission_statements/New Statement.pdf"
+rm "$FAKE_ROOT/$MONTH/commission_statements/Statement 2.pdf"
+$PYTHON "$SRC_DIR/drive_sync.py" --month "$MONTH" --base-dir "$SYNC_DIR" --api-base "http://127.0.0.1:$PORT" --prune
+expect_changes "1 1 1"
+compare
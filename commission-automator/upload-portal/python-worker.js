@@ -0,0 +1,104 @@
+/**
+ * Warm Python Worker Client
+ *
+ * Keeps one long-lived `src/worker.py` process and submits pipeline scripts to it
+ * as line-delimited JSON-RPC, instead of spawning a fresh interpreter per request.
+ * The worker is restarted automatically if it exits.
+ */
+
+import { spawn } from 'child_process';
+import { join } from 'path';
+import readline from 'readline';
+
+export class PythonWorker {
+  constructor(pythonPath, scriptsDir) {
+    this.pythonPath = pythonPath;
+    this.scriptsDir = scriptsDir;
+    this.proc = null;
+    this.nextId = 1;
+    this.pending = new Map();
+  }
+
+  start() {
+    if (this.proc) return;
+
+    this.proc = spawn(this.pythonPath, [join(this.scriptsDir, 'worker.py')], {
+      cwd: this.scriptsDir
+    });
+
+    readline.createInterface({ input: this.proc.stdout }).on('line', (line) => {
+      let response;
+      try {
+        response = JSON.parse(line);
+      } catch (err) {
+        console.error('Invalid worker response:', line);
+        return;
+      }
+
+      const request = this.pending.get(response.id);
+      if (!request) return;
+      this.pending.delete(response.id);
+
+      if (response.error) {
+        const data = response.error.data || {};
+        const error = new Error(response.error.message);
+        error.stdout = data.stdout || '';
+        error.stderr = '';
+        request.reject(error);
+      } else {
+        request.resolve(response.result);
+      }
+    });
+
+    // Log output from the scripts arrives on stderr
+    this.proc.stderr.on('data', (data) => {
+      console.error(data.toString().trim());
+    });
+
+    this.proc.on('exit', (code) => {
+      console.error(`🐍 Python worker exited with code ${code}`);
+      this.proc = null;
+      for (const request of this.pending.values()) {
+        request.reject(new Error(`Python worker exited with code ${code}`));
+      }
+      this.pending.clear();
+    });
+
+    this.proc.on('error', (err) => {
+      console.error('Failed to start Python worker:', err);
+    });
+  }
+
+  call(method, params = {}) {
+    this.start();
+
+    return new Promise((resolve, reject) => {
+      const id = this.nextId++;
+      this.pending.set(id, { resolve, reject });
+      this.proc.stdin.write(JSON.stringify({ jsonrpc: '2.0', id, method, params }) + '\n');
+    });
+  }
+
+  /**
+   * Run a pipeline script - resolves with { stdout, stderr } like a spawned process
+   *
+   * Portal requests default to 'interactive' priority so a reviewer waiting on a
+   * report is served before 'backfill' runs.
+   */
+  async runScript(scriptName, args = [], { priority = 'interactive' } = {}) {
+    const result = await this.call('run', { script: scriptName, args, priority });
+    if (result.stdout) console.log(result.stdout.trim());
+    return { stdout: result.stdout || '', stderr: '' };
+  }
+
+  /**
+   * Queue depth, running months and wait-time statistics
+   */
+  metrics() {
+    return this.call('metrics');
+  }
+
+  stop() {
+    if (this.proc) this.proc.stdin.end();
+  }
+}
@@ -10,7 +10,6 @@
 import express from 'express';
 import multer from 'multer';
 import cors from 'cors';
-import { spawn } from 'child_process';
 import { fileURLToPath } from 'url';
 import { dirname, join } from 'path';
 import { existsSync, mkdirSync, readFileSync, writeFileSync, unlinkSync, readdirSync } from 'fs';
@@ -19,6 +18,7 @@ import dotenv from 'dotenv';
 import { WebSocketServer } from 'ws';
 import http from 'http';
 import { randomUUID } from 'crypto';
+import { PythonWorker } from './python-worker.js';
 
 // ES module compatibility
 const __filename = fileURLToPath(import.meta.url);
@@ -63,6 +63,9 @@ const CONFIG = {
   ]
 };
 
+// Warm Python worker - scripts run in one long-lived process instead of spawn-per-request
+const pythonWorker = new PythonWorker(CONFIG.commission.pythonPath, CONFIG.commission.scriptsDir);
+
 // Create temp directory for deduction reports
 if (!existsSync(CONFIG.deduction.tempDir)) {
   mkdirSync(CONFIG.deduction.tempDir, { recursive: true });
@@ -587,21 +590,7 @@ function saveLearningDB() {
 }
 
 function runPythonScript(scriptName, args = []) {
-  return new Promise((resolve, reject) => {
-    const scriptPath = join(CONFIG.commission.scriptsDir, scriptName);
-    const proc = spawn(CONFIG.commission.pythonPath, [scriptPath, ...args]);
-
-    let stdout = '', stderr = '';
-    proc.stdout.on('data', d => { stdout += d; console.log(d.toString().trim()); });
-    proc.stderr.on('data', d => { stderr += d; console.error(d.toString().trim()); });
-
-    proc.on('close', code => {
-      if (code === 0) resolve({ stdout, stderr });
-      else reject(new Error(`Script ${scriptName} exited with code ${code}`));
-    });
-
-    proc.on('error', reject);
-  });
+  return pythonWorker.runScript(scriptName, args);
 }
 
 // ============================================
@@ -1998,6 +1987,15 @@ app.get('/health', (req, res) => {
   });
 });
 
+// Processing queue metrics from the Python worker
+app.get('/api/stats/jobs', authMiddleware, async (req, res) => {
+  try {
+    res.json(await pythonWorker.metrics());
+  } catch (err) {
+    res.status(503).json({ error: err.message });
+  }
+});
+
 app.get('/api/stats/learning', authMiddleware, (req, res) => {
   res.json({
     total: Object.keys(learningDB).length,
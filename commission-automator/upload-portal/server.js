@@ -9,13 +9,13 @@
 
 import express from 'express';
 import multer from 'multer';
-import { spawn } from 'child_process';
 import { fileURLToPath } from 'url';
 import { dirname, join } from 'path';
 import { existsSync, mkdirSync, readFileSync, writeFileSync } from 'fs';
 import dotenv from 'dotenv';
 import { WebSocketServer } from 'ws';
 import http from 'http';
+import { PythonWorker } from './python-worker.js';
 
 // ES module compatibility
 const __filename = fileURLToPath(import.meta.url);
@@ -39,6 +39,9 @@ const wss = new WebSocketServer({ server });
 // Active processing sessions
 const activeSessions = new Map();
 
+// Warm Python worker - scripts run in one long-lived process instead of spawn-per-request
+const pythonWorker = new PythonWorker(PYTHON_PATH, SCRIPTS_DIR);
+
 // Learning database for corrections
 let learningDB = {};
 try {
@@ -594,43 +597,10 @@ app.post('/upload', upload.fields([
 });
 
 /**
- * Run a Python script and return a promise
+ * Run a Python script on the warm worker and return a promise
  */
 function runPythonScript(scriptName, args = []) {
-  return new Promise((resolve, reject) => {
-    const scriptPath = join(SCRIPTS_DIR, scriptName);
-    const process = spawn(PYTHON_PATH, [scriptPath, ...args]);
-
-    let stdout = '';
-    let stderr = '';
-
-    process.stdout.on('data', (data) => {
-      const output = data.toString();
-      stdout += output;
-      console.log(output.trim());
-    });
-
-    process.stderr.on('data', (data) => {
-      const output = data.toString();
-      stderr += output;
-      console.error(output.trim());
-    });
-
-    process.on('close', (code) => {
-      if (code === 0) {
-        resolve({ stdout, stderr });
-      } else {
-        const error = new Error(`Script ${scriptName} exited with code ${code}`);
-        error.stdout = stdout;
-        error.stderr = stderr;
-        reject(error);
-      }
-    });
-
-    process.on('error', (err) => {
-      reject(err);
-    });
-  });
+  return pythonWorker.runScript(scriptName, args);
 }
 
 // Health check endpoint
@@ -644,6 +614,15 @@ app.get('/health', (req, res) => {
   });
 });
 
+// Processing queue metrics from the Python worker
+app.get('/stats/jobs', async (req, res) => {
+  try {
+    res.json(await pythonWorker.metrics());
+  } catch (err) {
+    res.status(503).json({ error: err.message });
+  }
+});
+
 // Get learning statistics
 app.get('/stats/learning', (req, res) => {
   res.json({